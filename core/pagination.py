@@ -1,6 +1,180 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
 
 class LargeResultsSetPagination(PageNumberPagination):
     page_size = 50
     page_size_query_param = 'page_size'
-    max_page_size = 999999
\ No newline at end of file
+    max_page_size = 999999
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination keyed on (ordering_field, id), newest first.
+
+    Pages are fetched with a range condition on the key instead of OFFSET,
+    so deep pages cost the same as the first one. The total count can be
+    skipped with ?count=false.
+
+    A request asking for another order through ?ordering=, or for a page
+    number through ?page=, is paged by LargeResultsSetPagination instead
+    with its response shape and page size limit, so existing page-number
+    clients keep working. Cursor pages are capped at max_page_size.
+    """
+    ordering_field = 'created_at'
+    cursor_query_param = 'cursor'
+    page_query_param = LargeResultsSetPagination.page_query_param
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    count_query_param = 'count'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_number_pagination = None
+        if request.query_params.get(api_settings.ORDERING_PARAM) or self.page_query_param in request.query_params:
+            self.page_number_pagination = LargeResultsSetPagination()
+            return self.page_number_pagination.paginate_queryset(queryset, request, view)
+
+        self.page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request, queryset.model)
+        self.count = queryset.count() if self.wants_count(request) else None
+        self.has_cursor = cursor is not None
+        self.is_previous = False
+
+        field = self.ordering_field
+        if cursor is None:
+            queryset = queryset.order_by(f'-{field}', '-id')
+        else:
+            value, pk, self.is_previous = cursor
+            if self.is_previous:
+                queryset = queryset.filter(
+                    Q(**{f'{field}__gt': value}) | Q(**{field: value, 'id__gt': pk})
+                ).order_by(field, 'id')
+            else:
+                queryset = queryset.filter(
+                    Q(**{f'{field}__lt': value}) | Q(**{field: value, 'id__lt': pk})
+                ).order_by(f'-{field}', '-id')
+
+        # Fetch one extra row to know whether there is another page
+        results = list(queryset[:self.page_size + 1])
+        self.has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if self.is_previous:
+            results.reverse()
+
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        if self.page_number_pagination is not None:
+            return self.page_number_pagination.get_paginated_response(data)
+
+        response = {}
+        if self.count is not None:
+            response['count'] = self.count
+        response['next'] = self.get_next_link()
+        response['previous'] = self.get_previous_link()
+        response['results'] = data
+        return Response(response)
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+            if page_size > 0:
+                return min(page_size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    def wants_count(self, request):
+        return request.query_params.get(self.count_query_param, '').lower() not in ('0', 'false')
+
+    def get_next_link(self):
+        # Coming back from a later page there is always a next one
+        has_next = self.is_previous or self.has_more
+        if not self.page or not has_next:
+            return None
+        return self.encode_cursor(self.page[-1], is_previous=False)
+
+    def get_previous_link(self):
+        has_previous = self.has_more if self.is_previous else self.has_cursor
+        if not self.page or not has_previous:
+            return None
+        return self.encode_cursor(self.page[0], is_previous=True)
+
+    def encode_cursor(self, obj, is_previous):
+        direction = 'p' if is_previous else 'n'
+        raw = f"{direction}|{getattr(obj, self.ordering_field).isoformat()}|{obj.pk}"
+        cursor = base64.urlsafe_b64encode(raw.encode()).decode()
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            raw = base64.urlsafe_b64decode(encoded.encode()).decode()
+            direction, value, pk = raw.split('|')
+            value = parse_datetime(value)
+            pk = model._meta.pk.to_python(pk)
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if direction not in ('n', 'p') or value is None:
+            raise NotFound(self.invalid_cursor_message)
+        return value, pk, direction == 'p'
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'count': {'type': 'integer', 'description': 'Left out when ?count=false'},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'The pagination cursor value.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Page number; pages by number instead of cursor.',
+                'schema': {'type': 'integer'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Number of results to return per page.',
+                'schema': {'type': 'integer'},
+            },
+            {
+                'name': self.count_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Pass false to skip the total count (extra COUNT query).',
+                'schema': {'type': 'boolean'},
+            },
+        ]
@@ -0,0 +1,98 @@
+import csv
+from django.db import connection
+from django.http import StreamingHttpResponse
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.encoders import JSONEncoder
+
+STREAM_QUERY_PARAM = 'stream'
+STREAM_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+STREAM_CHUNK_SIZE = 2000
+
+STREAM_PARAMETER = OpenApiParameter(
+    name=STREAM_QUERY_PARAM,
+    type=OpenApiTypes.STR,
+    location=OpenApiParameter.QUERY,
+    required=False,
+    enum=list(STREAM_FORMATS),
+    description='Stream all rows as NDJSON or CSV instead of a JSON array',
+)
+
+
+def get_stream_format(request):
+    """Return the requested stream format, or None for a regular JSON response"""
+    stream_format = request.query_params.get(STREAM_QUERY_PARAM)
+    if not stream_format:
+        return None
+    if stream_format not in STREAM_FORMATS:
+        raise ValidationError({
+            STREAM_QUERY_PARAM: f"Unsupported format '{stream_format}'. "
+                                f"Allowed: {', '.join(STREAM_FORMATS)}"
+        })
+    return stream_format
+
+
+def iter_query_chunks(query, params, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Run a raw query on a server-side cursor and yield (columns, rows) chunks,
+    so only `chunk_size` rows are held in memory at a time.
+    """
+    with connection.chunked_cursor() as cursor:
+        cursor.execute(query, params)
+        # Named cursors only expose the description after the first fetch
+        rows = cursor.fetchmany(chunk_size)
+        columns = [col[0] for col in cursor.description]
+        yield columns, rows
+
+        while rows:
+            rows = cursor.fetchmany(chunk_size)
+            if rows:
+                yield columns, rows
+
+
+class _Echo:
+    """File-like object handing csv.writer output straight back"""
+
+    def write(self, value):
+        return value
+
+
+def _ndjson_lines(chunks):
+    encoder = JSONEncoder()
+    for columns, rows in chunks:
+        yield ''.join(encoder.encode(dict(zip(columns, row))) + '\n' for row in rows)
+
+
+def _csv_lines(chunks):
+    writer = csv.writer(_Echo())
+    header_written = False
+    for columns, rows in chunks:
+        if not header_written:
+            header_written = True
+            yield writer.writerow(columns)
+        yield ''.join(
+            writer.writerow(['' if value is None else value for value in row])
+            for row in rows
+        )
+
+
+def stream_query_response(query, params, stream_format, filename):
+    """
+    Build a StreamingHttpResponse writing the query result row by row.
+
+    Args:
+        query: Raw SQL, without a trailing semicolon (it is wrapped in DECLARE CURSOR)
+        params: Query params
+        stream_format: One of STREAM_FORMATS, see get_stream_format()
+        filename: Download name without extension
+    """
+    chunks = iter_query_chunks(query, params)
+    lines = _csv_lines(chunks) if stream_format == 'csv' else _ndjson_lines(chunks)
+
+    response = StreamingHttpResponse(lines, content_type=STREAM_FORMATS[stream_format])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{stream_format}"'
+    return response
@@ -1,3 +1,99 @@
-from django.test import TestCase
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from django.test import SimpleTestCase, TestCase
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from core.pagination import KeysetPagination
+from fleet.models import Trip
+from process.models import Process
 
-# Create your tests here.
+
+class KeysetPaginationCursorTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.paginator = KeysetPagination()
+
+    def request(self, **params):
+        return Request(self.factory.get('/trips/', params))
+
+    def cursor_from_link(self, link):
+        return link.split('cursor=')[1].split('&')[0]
+
+    def test_encode_decode_round_trip(self):
+        obj = SimpleNamespace(
+            created_at=datetime(2025, 3, 1, 8, 30, 15, 123456, tzinfo=timezone.utc),
+            pk=uuid.uuid4()
+        )
+        self.paginator.request = self.request()
+
+        for is_previous in (False, True):
+            link = self.paginator.encode_cursor(obj, is_previous=is_previous)
+            request = self.request(cursor=self.cursor_from_link(link))
+
+            value, pk, previous = self.paginator.decode_cursor(request, Trip)
+
+            self.assertEqual(value, obj.created_at)
+            self.assertEqual(pk, obj.pk)
+            self.assertEqual(previous, is_previous)
+
+    def test_no_cursor(self):
+        self.assertIsNone(self.paginator.decode_cursor(self.request(), Trip))
+
+    def test_malformed_cursors_are_not_found(self):
+        import base64
+
+        def encode(raw):
+            return base64.urlsafe_b64encode(raw.encode()).decode()
+
+        cursors = [
+            'not-base64!!',
+            encode('n|2025-03-01T08:30:15+00:00'),
+            encode('x|2025-03-01T08:30:15+00:00|' + str(uuid.uuid4())),
+            encode('n|yesterday|' + str(uuid.uuid4())),
+            encode('n|2025-03-01T08:30:15+00:00|garbage'),
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor), self.assertRaises(NotFound):
+                self.paginator.decode_cursor(self.request(cursor=cursor), Trip)
+
+    def test_count_is_included_unless_disabled(self):
+        self.assertTrue(self.paginator.wants_count(self.request()))
+        self.assertTrue(self.paginator.wants_count(self.request(count='true')))
+        self.assertFalse(self.paginator.wants_count(self.request(count='false')))
+        self.assertFalse(self.paginator.wants_count(self.request(count='0')))
+
+    def test_page_size_is_capped(self):
+        self.assertEqual(self.paginator.get_page_size(self.request(page_size='10')), 10)
+        self.assertEqual(self.paginator.get_page_size(self.request(page_size='100000')), 500)
+        self.assertEqual(self.paginator.get_page_size(self.request(page_size='abc')), 50)
+
+
+class KeysetPaginationPageNumberTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.processes = [
+            Process.objects.create(name=f'Process {i}', version='1', prefix='PR', is_active=True)
+            for i in range(5)
+        ]
+
+    def paginate(self, **params):
+        paginator = KeysetPagination()
+        request = Request(APIRequestFactory().get('/processes/', params))
+        return paginator, paginator.paginate_queryset(Process.objects.order_by('created_at', 'id'), request)
+
+    def test_page_param_returns_that_page(self):
+        paginator, page = self.paginate(page='2', page_size='2')
+
+        expected = list(Process.objects.order_by('created_at', 'id'))[2:4]
+        self.assertEqual(page, expected)
+        response = paginator.get_paginated_response([])
+        self.assertEqual(response.data['count'], 5)
+        self.assertIn('page=3', response.data['next'])
+
+    def test_page_size_is_not_capped_when_paging_by_number(self):
+        paginator, page = self.paginate(page='1', page_size='1000')
+
+        self.assertEqual(len(page), 5)
+        self.assertEqual(paginator.page_number_pagination.get_page_size(paginator.request), 1000)
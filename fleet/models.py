@@ -16,6 +16,9 @@ class Trip(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id']),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=['license_plate', 'driver', 'date'], 
@@ -7,11 +7,14 @@
 from .models import Trip, Stop
 from .serializers import TripSerializer, StopSerializer, TripLogSerializer
 from datetime import datetime
+from core.pagination import KeysetPagination
+from core.streaming import STREAM_PARAMETER, get_stream_format, stream_query_response
 
 class TripViewSet(viewsets.ModelViewSet):
     
     queryset = Trip.objects.all()
     serializer_class = TripSerializer
+    pagination_class = KeysetPagination
     
     filterset_fields = {
         'license_plate': ['exact', 'icontains'],
@@ -116,9 +119,11 @@ def perform_destroy(self, instance):
 class TripLogView(APIView):
     
     @extend_schema(
+        parameters=[STREAM_PARAMETER],
         responses=TripLogSerializer(many=True),
     )
     def get(self, request):
+        stream_format = get_stream_format(request)
         now = datetime.now()
         month = request.query_params.get('month', now.month)
         year = request.query_params.get('year', now.year)
@@ -153,56 +158,61 @@ def get(self, request):
         
         where_clause = " AND ".join(where_conditions)
 
-        with connection.cursor() as cursor:
-            cursor.execute(f"""
-                WITH trip_data AS (
-                    SELECT 
-                        ft.id AS trip_id, 
-                        ft."date", 
-                        ft.license_plate, 
-                        fst."order" AS stop_order, 
-                        fst."location", 
-                        fst.odometer, 
-                        fst.created_at, 
-                        fst.toll_station, 
-                        uu.username
-                    FROM fleet_stop fst
-                    JOIN fleet_trip ft ON fst.trip_id = ft.id
-                    JOIN user_user uu ON ft.driver_id = uu.id
-                ),
-                trip_segments AS (
-                    SELECT
-                        trip_id,
-                        date,
-                        license_plate,
-                        location AS start_loc,
-                        LEAD(location) OVER (PARTITION BY trip_id ORDER BY stop_order) AS end_loc,
-                        odometer AS start_odometer,
-                        LEAD(odometer) OVER (PARTITION BY trip_id ORDER BY stop_order) AS end_odometer,
-                        created_at AS start_time,
-                        LEAD(created_at) OVER (PARTITION BY trip_id ORDER BY stop_order) AS end_time,
-                        LEAD(toll_station) OVER (PARTITION BY trip_id ORDER BY stop_order) AS toll_station,
-                        username
-                    FROM trip_data
-                )
+        query = f"""
+            WITH trip_data AS (
+                SELECT 
+                    ft.id AS trip_id, 
+                    ft."date", 
+                    ft.license_plate, 
+                    fst."order" AS stop_order, 
+                    fst."location", 
+                    fst.odometer, 
+                    fst.created_at, 
+                    fst.toll_station, 
+                    uu.username
+                FROM fleet_stop fst
+                JOIN fleet_trip ft ON fst.trip_id = ft.id
+                JOIN user_user uu ON ft.driver_id = uu.id
+            ),
+            trip_segments AS (
                 SELECT
                     trip_id,
                     date,
                     license_plate,
-                    start_loc,
-                    end_loc,
-                    start_odometer,
-                    end_odometer,
-                    start_time,
-                    end_time,
-                    toll_station,
-                    username,
-                    (end_odometer - start_odometer) AS distance,
-                    (end_time - start_time) AS duration
-                FROM trip_segments
-                WHERE {where_clause}
-                ORDER BY date, license_plate, username, start_time;
-            """, query_params)
+                    location AS start_loc,
+                    LEAD(location) OVER (PARTITION BY trip_id ORDER BY stop_order) AS end_loc,
+                    odometer AS start_odometer,
+                    LEAD(odometer) OVER (PARTITION BY trip_id ORDER BY stop_order) AS end_odometer,
+                    created_at AS start_time,
+                    LEAD(created_at) OVER (PARTITION BY trip_id ORDER BY stop_order) AS end_time,
+                    LEAD(toll_station) OVER (PARTITION BY trip_id ORDER BY stop_order) AS toll_station,
+                    username
+                FROM trip_data
+            )
+            SELECT
+                trip_id,
+                date,
+                license_plate,
+                start_loc,
+                end_loc,
+                start_odometer,
+                end_odometer,
+                start_time,
+                end_time,
+                toll_station,
+                username,
+                (end_odometer - start_odometer) AS distance,
+                (end_time - start_time) AS duration
+            FROM trip_segments
+            WHERE {where_clause}
+            ORDER BY date, license_plate, username, start_time
+        """
+
+        if stream_format:
+            return stream_query_response(query, query_params, stream_format, 'trip-log')
+
+        with connection.cursor() as cursor:
+            cursor.execute(query, query_params)
             columns = [col[0] for col in cursor.description]
             results = [dict(zip(columns, row)) for row in cursor.fetchall()]
 
@@ -8,7 +8,7 @@ class ProcessFieldInline(TranslationTabularInline):
     model = ProcessField
     extra = 0
     ordering = ['order']
-    fields = ('name', 'description', 'field_type', 'order', 'required', 'options',)
+    fields = ('name', 'description', 'field_type', 'order', 'required', 'options', 'promoted_key',)
     show_change_link = True
 
 
@@ -148,7 +148,7 @@ class FieldConditionAdmin(admin.ModelAdmin):
 
 
 class ProcessFieldAdmin(TranslationAdmin):
-    list_display = ('name', 'process', 'field_type', 'order', 'required')
+    list_display = ('name', 'process', 'field_type', 'order', 'required', 'promoted_key')
     list_filter = ('process',)
     ordering = ('process', 'order',)
     inlines = [FieldConditionInline]
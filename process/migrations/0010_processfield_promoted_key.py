@@ -0,0 +1,33 @@
+from django.db import migrations, models
+
+
+PROMOTED_FIELDS = {
+    'Finishing code': 'finishing_code',
+    "Customer's color name": 'customer_color_name',
+}
+
+
+def promote_sample_request_fields(apps, schema_editor):
+    ProcessField = apps.get_model('process', 'ProcessField')
+    for name, key in PROMOTED_FIELDS.items():
+        ProcessField.objects.filter(process__prefix='SP', name=name).update(promoted_key=key)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('process', '0009_alter_fieldcondition_operator'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='processfield',
+            name='promoted_key',
+            field=models.CharField(blank=True, help_text="Copy this field's value onto the task under this key for list endpoints", max_length=50, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='processfield',
+            constraint=models.UniqueConstraint(fields=('process', 'promoted_key'), name='unique_process_promoted_key'),
+        ),
+        migrations.RunPython(promote_sample_request_fields, migrations.RunPython.noop),
+    ]
@@ -146,6 +146,10 @@ class ProcessField(models.Model):
     order = models.PositiveSmallIntegerField()
     required = models.BooleanField()
     options = models.JSONField(blank=True, null=True)
+    promoted_key = models.CharField(
+        max_length=50, blank=True, null=True,
+        help_text="Copy this field's value onto the task under this key for list endpoints"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -153,6 +157,9 @@ class ProcessField(models.Model):
     class Meta:
         unique_together = [('process', 'name')]
         ordering = ['order']
+        constraints = [
+            models.UniqueConstraint(fields=['process', 'promoted_key'], name='unique_process_promoted_key')
+        ]
     
     def clean(self):
         if self.field_type not in (FieldType.SELECT, FieldType.MULTISELECT) and self.options:
@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sheet', '0008_alter_formulartemplate_viscosity'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='finishingsheet',
+            index=models.Index(fields=['-created_at', '-id'], name='sheet_finis_created_0cb09a_idx'),
+        ),
+    ]
@@ -86,6 +86,9 @@ class FinishingSheet(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id']),
+        ]
     
     def __str__(self):
         return self.finishing_code
@@ -1,5 +1,6 @@
 from rest_framework import viewsets, generics
 from .models import FinishingSheet, StepTemplate, FormularTemplate, SheetBlueprint
+from core.pagination import KeysetPagination
 from .serializers import FinishingSheetSerializer, StepTemplateSerializer, FormularTemplateSerializer, SheetBlueprintSerializer
 
 class StepTemplateListView(generics.ListAPIView):
@@ -17,6 +18,7 @@ class FormularTemplateListView(generics.ListAPIView):
 class FinishingSheetViewSet(viewsets.ModelViewSet):
     queryset = FinishingSheet.objects.all()
     serializer_class = FinishingSheetSerializer
+    pagination_class = KeysetPagination
     
     # Add filtering, searching, and ordering
     filterset_fields = ['task', 'created_by']
@@ -4,3 +4,7 @@
 class TaskConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'task'
+
+    def ready(self):
+        import task.signals
+        import task.subscribers
@@ -0,0 +1,145 @@
+import hashlib
+import mimetypes
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.db import transaction
+from django.db.models import F
+from rest_framework import serializers
+from core.constants import MAX_FILE_SIZE
+from .models import FileBlob
+from .tasks import generate_blob_renditions
+
+# Names written to storage by acquire_blob in the innermost blob_atomic block
+_stored_names = ContextVar('stored_blob_names', default=None)
+
+
+def hash_file(file, max_size=MAX_FILE_SIZE):
+    """
+    SHA-256 and size of the file in one streaming pass, enforcing the size
+    limit from FileValidator as the bytes go by instead of trusting file.size.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in file.chunks():
+        size += len(chunk)
+        if size > max_size:
+            raise serializers.ValidationError(
+                {"non_field_errors": [
+                    f"File size exceeds maximum allowed size of {max_size / (1024 * 1024)}MB."
+                ]}
+            )
+        digest.update(chunk)
+    return digest.hexdigest(), size
+
+
+@contextmanager
+def blob_atomic():
+    """
+    transaction.atomic() for inserting rows that reference blobs.
+
+    acquire_blob must run inside it, together with the insert of the row
+    taking the reference, so both are rolled back together. Content newly
+    written to storage within the block is deleted again when the block
+    fails, since the FileBlob rows pointing at it are gone too.
+    """
+    parent = _stored_names.get()
+    stored = []
+    token = _stored_names.set(stored)
+    try:
+        with transaction.atomic():
+            yield
+    except BaseException:
+        storage = FileBlob._meta.get_field('file').storage
+        for name in stored:
+            storage.delete(name)
+        raise
+    else:
+        if parent is not None:
+            # Still at stake until the enclosing block succeeds
+            parent.extend(stored)
+    finally:
+        _stored_names.reset(token)
+
+
+def acquire_blob(file):
+    """
+    Return the FileBlob holding the file's content and take a reference to it.
+
+    Content already stored is not written again. Must be called inside
+    blob_atomic(); the caller must point its FileField at `blob.file.name`
+    and save the row, keeping the blob in its `blob` field so the reference
+    is released when the row is deleted.
+    """
+    stored = _stored_names.get()
+    if stored is None:
+        raise RuntimeError("acquire_blob() must be called inside blob_atomic()")
+
+    sha256, size = hash_file(file)
+    storage = FileBlob._meta.get_field('file').storage
+
+    with transaction.atomic():
+        blob = FileBlob.objects.select_for_update().filter(sha256=sha256).first()
+        if blob is None:
+            extension = os.path.splitext(file.name or '')[1].lower()
+            name = storage.save(f"blobs/{sha256[:2]}/{sha256}{extension}", file)
+            blob, created = FileBlob.objects.get_or_create(sha256=sha256, defaults={
+                'file': name,
+                'size': size,
+                'mime_type': getattr(file, 'content_type', '') or 'application/octet-stream',
+            })
+            if not created:
+                # Lost a race with a concurrent upload of the same content
+                storage.delete(name)
+            else:
+                stored.append(name)
+                if blob.mime_type.startswith('image/'):
+                    generate_blob_renditions.delay_on_commit(blob.pk)
+
+        FileBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+
+    return blob
+
+
+def adopt_stored_file(file, mime_type=''):
+    """
+    Return the FileBlob for content already in storage under a name given
+    before deduplication, and take a reference to it.
+
+    The stored file becomes the blob's file as is, nothing is copied. When
+    the content already has a blob, that blob is returned and `file` is a
+    duplicate the caller may delete once its row points at the blob. Call
+    inside the transaction updating the row.
+    """
+    with file.open('rb'):
+        sha256, size = hash_file(file, max_size=float('inf'))
+
+    blob, created = FileBlob.objects.get_or_create(sha256=sha256, defaults={
+        'file': file.name,
+        'size': size,
+        'mime_type': mime_type or mimetypes.guess_type(file.name)[0] or 'application/octet-stream',
+    })
+    FileBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+    return blob
+
+
+def release_blob(blob_id):
+    """Drop a reference; the stored content is deleted with the last one"""
+    with transaction.atomic():
+        blob = FileBlob.objects.select_for_update().filter(pk=blob_id).first()
+        if blob is None:
+            return
+
+        if blob.ref_count > 1:
+            FileBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') - 1)
+            return
+
+        storage = blob.file.storage
+        names = [field.name for field in (blob.file, blob.thumbnail, blob.preview) if field]
+        blob.delete()
+
+        def delete_files():
+            for name in names:
+                storage.delete(name)
+
+        transaction.on_commit(delete_files)
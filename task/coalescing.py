@@ -0,0 +1,101 @@
+import logging
+from django.conf import settings
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+from .models import NotificationPreference, Task, TaskInboxEntry
+from .notifications import NotificationDispatcher, build_task_message
+
+logger = logging.getLogger(__name__)
+
+# Task ids waiting to be notified to one user
+BUFFER_KEY = 'notify_buffer:{user_id}'
+# Set while a flush of the user's buffer is scheduled
+PENDING_KEY = 'notify_pending:{user_id}'
+
+
+def _connection():
+    return get_redis_connection('default')
+
+
+def buffer_task_events(task_ids, exclude_user_id):
+    """
+    Add changed tasks to the buffers of the users who can now act on them.
+
+    The first event in a user's buffer schedules a flush after
+    NOTIFICATION_COALESCE_WINDOW seconds, so every task arriving in the
+    meantime goes out in the same push. Users with a digest preference are
+    only buffered; their buffer is flushed by send_notification_digests.
+    Returns the number of recipients.
+    """
+    from .tasks import flush_task_notifications
+
+    tasks_by_user = {}
+    for user_id, task_id in TaskInboxEntry.objects.filter(
+        task_id__in=task_ids
+    ).exclude(user_id=exclude_user_id).values_list('user_id', 'task_id').distinct():
+        tasks_by_user.setdefault(str(user_id), set()).add(str(task_id))
+    if not tasks_by_user:
+        return 0
+
+    digest_users = {
+        str(user_id) for user_id in NotificationPreference.objects.filter(
+            user_id__in=list(tasks_by_user)
+        ).exclude(digest=NotificationPreference.Digest.OFF).values_list('user_id', flat=True)
+    }
+    window = settings.NOTIFICATION_COALESCE_WINDOW
+
+    try:
+        connection = _connection()
+        pipeline = connection.pipeline(transaction=False)
+        immediate = [user_id for user_id in tasks_by_user if user_id not in digest_users]
+        for user_id, user_task_ids in tasks_by_user.items():
+            pipeline.sadd(BUFFER_KEY.format(user_id=user_id), *user_task_ids)
+        for user_id in immediate:
+            # Expires on its own should the scheduled flush be lost
+            pipeline.set(PENDING_KEY.format(user_id=user_id), 1, nx=True, ex=max(window, 1) * 10)
+        scheduled = pipeline.execute()[len(tasks_by_user):]
+    except RedisError as e:
+        logger.warning(f"Notification buffer unavailable, sending directly - {str(e)}")
+        for user_id, user_task_ids in tasks_by_user.items():
+            send_task_summary(user_id, user_task_ids)
+        return len(tasks_by_user)
+
+    for user_id, is_first in zip(immediate, scheduled):
+        if is_first:
+            flush_task_notifications.apply_async(args=[user_id], countdown=window)
+    return len(tasks_by_user)
+
+
+def flush_buffer(user_id):
+    """Send one push for everything buffered for the user and empty the buffer"""
+    connection = _connection()
+    # Clear the flag first: an event arriving from here on schedules a new
+    # flush instead of being left behind in an already read buffer
+    connection.delete(PENDING_KEY.format(user_id=user_id))
+
+    buffer_key = BUFFER_KEY.format(user_id=user_id)
+    pipeline = connection.pipeline()
+    pipeline.smembers(buffer_key)
+    pipeline.delete(buffer_key)
+    task_ids, _ = pipeline.execute()
+
+    return send_task_summary(user_id, [task_id.decode() for task_id in task_ids])
+
+
+def send_task_summary(user_id, task_ids):
+    """
+    Notify the user of the tasks they can still act on, one push in all.
+    Tasks that moved on while buffered are left out.
+    """
+    actionable = TaskInboxEntry.objects.filter(
+        user_id=user_id, task_id__in=task_ids
+    ).values('task_id')
+    tasks = list(Task.objects.filter(id__in=actionable).select_related('state').order_by('-created_at'))
+    if not tasks:
+        return None
+
+    dispatcher = NotificationDispatcher()
+    devices = dispatcher.load_devices([user_id])
+    if not devices:
+        return None
+    return dispatcher.dispatch(devices, build_task_message(tasks))
@@ -0,0 +1,209 @@
+import logging
+from collections import Counter
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+from workflow_engine.models import State
+from .models import Task, TaskInboxEntry
+
+logger = logging.getLogger(__name__)
+
+COUNTS_KEY = 'task_counts:{user_id}'
+COUNTS_TIMEOUT = 60 * 60 * 24 * 7
+RECONCILE_BATCH_SIZE = 500
+
+# Hash fields of one user's counters
+RECEIVED = 'received'
+RECEIVED_PROCESS = 'received:process:{prefix}'
+SENT = 'sent'
+SENT_STATE_TYPE = 'sent:state_type:{state_type}'
+SENT_PROCESS = 'sent:process:{prefix}'
+RECONCILED_AT = 'reconciled_at'
+
+# Increments are only applied to counters that already exist; a missing hash
+# is rebuilt from the database on the next read instead of starting from zero
+_INCREMENT_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    for i = 1, #ARGV, 2 do
+        redis.call('HINCRBY', KEYS[1], ARGV[i], ARGV[i + 1])
+    end
+end
+"""
+
+
+def _connection():
+    return get_redis_connection('default')
+
+
+def _key(user_id):
+    return COUNTS_KEY.format(user_id=user_id)
+
+
+def _apply(deltas):
+    """Apply {user_id: Counter(field -> delta)} to the stored counters"""
+    deltas = {user_id: fields for user_id, fields in deltas.items() if any(fields.values())}
+    if not deltas:
+        return
+
+    try:
+        connection = _connection()
+        increment = connection.register_script(_INCREMENT_SCRIPT)
+        pipeline = connection.pipeline(transaction=False)
+        for user_id, fields in deltas.items():
+            args = []
+            for field, delta in fields.items():
+                if delta:
+                    args.extend([field, delta])
+            increment(keys=[_key(user_id)], args=args, client=pipeline)
+        pipeline.execute()
+    except RedisError as e:
+        # Counters drift until the next reconcile instead of failing the request
+        logger.warning(f"Task counters: increment failed for {len(deltas)} users - {str(e)}")
+
+
+def _apply_on_commit(deltas):
+    transaction.on_commit(lambda: _apply(deltas))
+
+
+def record_inbox_changes(removed, added, prefixes):
+    """
+    Adjust received counters for (user_id, task_id) pairs that left or
+    entered users' inboxes. `prefixes` maps task id -> process prefix.
+    """
+    deltas = {}
+    for pairs, sign in ((removed, -1), (added, 1)):
+        for user_id, task_id in pairs:
+            fields = deltas.setdefault(user_id, Counter())
+            fields[RECEIVED] += sign
+            fields[RECEIVED_PROCESS.format(prefix=prefixes.get(task_id))] += sign
+    _apply_on_commit(deltas)
+
+
+def record_tasks_created(tasks):
+    """Count new tasks in their creators' sent counters"""
+    deltas = {}
+    for task in tasks:
+        fields = deltas.setdefault(task.created_by_id, Counter())
+        fields[SENT] += 1
+        fields[SENT_STATE_TYPE.format(state_type=task.state.state_type)] += 1
+        fields[SENT_PROCESS.format(prefix=task.process.prefix)] += 1
+    _apply_on_commit(deltas)
+
+
+def record_tasks_transitioned(transitions):
+    """
+    Move tasks between their creators' sent state_type counters.
+    `transitions` is a list of (task, previous_state_id); task.state_id holds
+    the new state.
+    """
+    state_ids = {str(state_id) for task, previous in transitions for state_id in (previous, task.state_id)}
+    state_types = {
+        str(state_id): state_type
+        for state_id, state_type in State.objects.filter(id__in=state_ids).values_list('id', 'state_type')
+    }
+
+    deltas = {}
+    for task, previous_state_id in transitions:
+        fields = deltas.setdefault(task.created_by_id, Counter())
+        fields[SENT_STATE_TYPE.format(state_type=state_types.get(str(previous_state_id)))] -= 1
+        fields[SENT_STATE_TYPE.format(state_type=state_types.get(str(task.state_id)))] += 1
+    _apply_on_commit(deltas)
+
+
+def compute_counts(user_ids):
+    """Counter hashes for the given users, computed from the database"""
+    counts = {
+        str(user_id): {RECEIVED: 0, SENT: 0, RECONCILED_AT: timezone.now().isoformat()}
+        for user_id in user_ids
+    }
+
+    received = TaskInboxEntry.objects.filter(user_id__in=user_ids).values(
+        'user_id', 'task__process__prefix'
+    ).annotate(total=Count('task_id', distinct=True))
+    for row in received:
+        fields = counts[str(row['user_id'])]
+        fields[RECEIVED] += row['total']
+        fields[RECEIVED_PROCESS.format(prefix=row['task__process__prefix'])] = row['total']
+
+    sent = Task.objects.filter(created_by_id__in=user_ids).values(
+        'created_by_id', 'state__state_type', 'process__prefix'
+    ).annotate(total=Count('id'))
+    for row in sent:
+        fields = counts[str(row['created_by_id'])]
+        fields[SENT] += row['total']
+        state_field = SENT_STATE_TYPE.format(state_type=row['state__state_type'])
+        process_field = SENT_PROCESS.format(prefix=row['process__prefix'])
+        fields[state_field] = fields.get(state_field, 0) + row['total']
+        fields[process_field] = fields.get(process_field, 0) + row['total']
+
+    return counts
+
+
+def store_counts(counts):
+    """Replace the stored hashes with freshly computed ones"""
+    pipeline = _connection().pipeline()
+    for user_id, fields in counts.items():
+        key = _key(user_id)
+        pipeline.delete(key)
+        pipeline.hset(key, mapping=fields)
+        pipeline.expire(key, COUNTS_TIMEOUT)
+    pipeline.execute()
+
+
+def get_counts(user):
+    """
+    Badge counts of the user, rebuilt from the database when the stored
+    counters are missing or Redis is unavailable.
+    """
+    try:
+        connection = _connection()
+        stored = connection.hgetall(_key(user.pk))
+        if stored:
+            fields = {field.decode(): value.decode() for field, value in stored.items()}
+        else:
+            fields = compute_counts([user.pk])[str(user.pk)]
+            store_counts({user.pk: fields})
+    except RedisError as e:
+        logger.warning(f"Task counters: read failed for user {user.pk} - {str(e)}")
+        fields = compute_counts([user.pk])[str(user.pk)]
+
+    result = {
+        'received': 0,
+        'received_by_process': {},
+        'sent': 0,
+        'sent_by_state_type': {},
+        'sent_by_process': {},
+        'reconciled_at': fields.get(RECONCILED_AT),
+    }
+    for field, value in fields.items():
+        if field == RECONCILED_AT:
+            continue
+        value = int(value)
+        name, _, key = field.partition(':')
+        if not key:
+            result[name] = value
+            continue
+        group, _, label = key.partition(':')
+        # Zeroed counters stay in the hash after decrements; leave them out
+        if value:
+            result[f'{name}_by_{group}'][label] = value
+    return result
+
+
+def reconcile_counts():
+    """
+    Rebuild every stored counter hash from the database, correcting drift
+    from lost increments. Only users whose counters are cached are touched.
+    Returns the number of users reconciled.
+    """
+    connection = _connection()
+    user_ids = [
+        key.decode().rsplit(':', 1)[1]
+        for key in connection.scan_iter(match=COUNTS_KEY.format(user_id='*'), count=1000)
+    ]
+
+    for start in range(0, len(user_ids), RECONCILE_BATCH_SIZE):
+        store_counts(compute_counts(user_ids[start:start + RECONCILE_BATCH_SIZE]))
+    return len(user_ids)
@@ -0,0 +1,77 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+from task.blobs import adopt_stored_file
+from task.models import FileBlob, TaskActionLog, TaskFileData
+from task.tasks import generate_blob_renditions
+
+# Attachment model -> its FileField
+ATTACHMENTS = [
+    (TaskFileData, 'uploaded_file'),
+    (TaskActionLog, 'file'),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Link attachments stored before deduplication to FileBlobs, then queue "
+        "renditions for every image blob still missing them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows read per query (default 500)')
+        parser.add_argument('--renditions-only', action='store_true',
+                            help='Skip linking attachments and only queue missing renditions')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+
+        if not options['renditions_only']:
+            for model, field_name in ATTACHMENTS:
+                self._link_attachments(model, field_name, options['batch_size'])
+
+        queued = 0
+        for blob_id in FileBlob.objects.filter(mime_type__startswith='image/').filter(
+            Q(thumbnail__isnull=True) | Q(thumbnail='') | Q(preview__isnull=True) | Q(preview='')
+        ).values_list('pk', flat=True).iterator(chunk_size=options['batch_size']):
+            generate_blob_renditions.delay(blob_id)
+            queued += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Queued renditions for {queued} blobs'))
+
+    def _link_attachments(self, model, field_name, batch_size):
+        linked = duplicates = missing = 0
+        rows = model.objects.filter(blob__isnull=True).exclude(
+            **{f'{field_name}__isnull': True}
+        ).exclude(**{field_name: ''}).order_by('pk')
+
+        for row in rows.iterator(chunk_size=batch_size):
+            stored = getattr(row, field_name)
+            try:
+                with transaction.atomic():
+                    blob = adopt_stored_file(stored, getattr(row, 'mime_type', ''))
+                    row.blob = blob
+                    setattr(row, field_name, blob.file.name)
+                    row.save(update_fields=['blob', field_name])
+
+                    if blob.file.name != stored.name:
+                        duplicates += 1
+                        transaction.on_commit(lambda name=stored.name: self._delete_if_unused(name))
+            except OSError:
+                missing += 1
+                continue
+            linked += 1
+
+        self.stdout.write(
+            f'{model.__name__}: {linked} linked, {duplicates} duplicates dropped, {missing} missing files'
+        )
+
+    @staticmethod
+    def _delete_if_unused(name):
+        referenced = (
+            FileBlob.objects.filter(file=name).exists()
+            or any(model.objects.filter(**{field_name: name}).exists() for model, field_name in ATTACHMENTS)
+        )
+        if not referenced:
+            FileBlob._meta.get_field('file').storage.delete(name)
@@ -0,0 +1,155 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from process.models import Process
+from task.models import Task
+from task.permission_service import PermissionService
+from task.permission_sync import iter_task_id_chunks
+from task.tasks import recompute_task_permissions
+
+
+def _recompute_chunk(task_ids):
+    """Process pool entry point; each worker opens its own DB connection"""
+    return PermissionService.recompute_permissions(task_ids)
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute TaskPermission rows for existing tasks in keyset-ordered chunks. "
+        "Progress is checkpointed so an interrupted run can be resumed with --resume."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--process', help='Only backfill tasks of this process id')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Tasks per chunk (default 500)')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Recompute chunks in a pool of N processes (default 1, inline)')
+        parser.add_argument('--celery', action='store_true',
+                            help='Run each chunk as a Celery task instead of running it here')
+        parser.add_argument('--in-flight', type=int, default=8,
+                            help='Chunks enqueued at once with --celery (default 8)')
+        parser.add_argument('--checkpoint', default='backfill_task_permissions.checkpoint',
+                            help='File storing the last completed task id')
+        parser.add_argument('--resume', action='store_true', help='Continue after the checkpointed task id')
+
+    def handle(self, *args, **options):
+        self.chunk_size = options['chunk_size']
+        self.checkpoint = options['checkpoint']
+        process_id = options['process']
+
+        if self.chunk_size < 1:
+            raise CommandError('--chunk-size must be positive')
+        if options['celery'] and options['workers'] > 1:
+            raise CommandError('--celery and --workers are mutually exclusive')
+        if options['in_flight'] < 1:
+            raise CommandError('--in-flight must be positive')
+
+        queryset = Task.objects.all()
+        if process_id:
+            if not Process.objects.filter(id=process_id).exists():
+                raise CommandError(f'Process {process_id} not found')
+            queryset = queryset.filter(process_id=process_id)
+
+        state = self._load_checkpoint(process_id) if options['resume'] else None
+        last_id = state['last_id'] if state else None
+        self.totals = {
+            'tasks': state['tasks'] if state else 0,
+            'deleted': state['deleted'] if state else 0,
+            'created': state['created'] if state else 0,
+        }
+        if last_id:
+            self.stdout.write(f'Resuming after task {last_id} ({self.totals["tasks"]} tasks already done)')
+
+        self.started = time.monotonic()
+        self.started_tasks = self.totals['tasks']
+        chunks = iter_task_id_chunks(queryset, self.chunk_size, last_id)
+
+        if options['celery']:
+            self._run_celery(chunks, options['in_flight'], process_id)
+        elif options['workers'] > 1:
+            self._run_pool(chunks, options['workers'], process_id)
+        else:
+            for task_ids in chunks:
+                self._chunk_done(task_ids, PermissionService.recompute_permissions(task_ids), process_id)
+
+        self._report(final=True)
+
+    def _run_pool(self, chunks, workers, process_id):
+        # Forked workers must not share the parent's connection
+        connections.close_all()
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = []
+            for task_ids in chunks:
+                pending.append((task_ids, executor.submit(_recompute_chunk, task_ids)))
+
+                # Bound in-flight chunks, and only checkpoint a chunk once every
+                # chunk before it has finished so a resume never skips work
+                if len(pending) >= workers * 2:
+                    head_ids, future = pending.pop(0)
+                    self._chunk_done(head_ids, future.result(), process_id)
+
+            for task_ids, future in pending:
+                self._chunk_done(task_ids, future.result(), process_id)
+
+    def _run_celery(self, chunks, in_flight, process_id):
+        pending = []
+        for task_ids in chunks:
+            pending.append((task_ids, recompute_task_permissions.delay([str(task_id) for task_id in task_ids])))
+
+            # Same ordering rule as the pool: a chunk is checkpointed only once
+            # it and every chunk before it have finished on a worker
+            if len(pending) >= in_flight:
+                head_ids, result = pending.pop(0)
+                self._celery_chunk_done(head_ids, result, process_id)
+
+        for task_ids, result in pending:
+            self._celery_chunk_done(task_ids, result, process_id)
+
+    def _celery_chunk_done(self, task_ids, result, process_id):
+        # Raises if the worker failed, leaving the checkpoint before this chunk
+        totals = result.get()
+        self._chunk_done(task_ids, (totals['deleted'], totals['created']), process_id)
+
+    def _chunk_done(self, task_ids, result, process_id):
+        deleted, created = result
+        self.totals['tasks'] += len(task_ids)
+        self.totals['deleted'] += deleted
+        self.totals['created'] += created
+        self._save_checkpoint(task_ids[-1], process_id)
+        self._report()
+
+    def _report(self, final=False):
+        elapsed = time.monotonic() - self.started
+        done = self.totals['tasks'] - self.started_tasks
+        rate = done / elapsed if elapsed else 0
+        message = (
+            f"{self.totals['tasks']} tasks, {self.totals['deleted']} deleted, "
+            f"{self.totals['created']} created permissions | {rate:.1f} tasks/s, {elapsed:.1f}s"
+        )
+        if final:
+            self.stdout.write(self.style.SUCCESS(f'Backfill complete: {message}'))
+        else:
+            self.stdout.write(message)
+
+    def _load_checkpoint(self, process_id):
+        if not os.path.exists(self.checkpoint):
+            return None
+        with open(self.checkpoint) as f:
+            state = json.load(f)
+        if state.get('process_id') != process_id:
+            raise CommandError(
+                f"Checkpoint {self.checkpoint} belongs to process {state.get('process_id')!r}, "
+                f"remove it or pass the matching --process"
+            )
+        return state
+
+    def _save_checkpoint(self, last_id, process_id):
+        state = dict(self.totals, last_id=str(last_id), process_id=process_id)
+        tmp_path = f'{self.checkpoint}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.checkpoint)
@@ -0,0 +1,37 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task', '0008_alter_task_title'),
+        ('process', '0010_processfield_promoted_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskPromotedValue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=50)),
+                ('value', models.CharField(blank=True, max_length=255, null=True)),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='promoted_values', to='task.task')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['key', 'value'], name='task_taskpr_key_98b60b_idx')],
+                'constraints': [models.UniqueConstraint(fields=('task', 'key'), name='unique_task_promoted_key')],
+            },
+        ),
+        migrations.RunSQL(
+            """
+            INSERT INTO task_taskpromotedvalue (task_id, "key", value)
+            SELECT ttd.task_id, ppf.promoted_key, LEFT(ttd.value, 255)
+            FROM task_taskdata ttd
+                JOIN process_processfield ppf ON ttd.field_id = ppf.id
+            WHERE ppf.promoted_key IS NOT NULL
+            ON CONFLICT DO NOTHING
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,40 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task', '0009_taskpromotedvalue'),
+        ('process', '0010_processfield_promoted_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskSnapshot',
+            fields=[
+                ('task', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='snapshot', serialize=False, to='task.task')),
+                ('data', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('process', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='process.process')),
+            ],
+        ),
+        migrations.RunSQL(
+            """
+            INSERT INTO task_tasksnapshot (task_id, process_id, data, updated_at)
+            SELECT
+                tt.id,
+                tt.process_id,
+                COALESCE(
+                    jsonb_object_agg(ppf.name, ttd.value) FILTER (WHERE ppf.id IS NOT NULL),
+                    '{}'::jsonb
+                ),
+                NOW()
+            FROM task_task tt
+                LEFT JOIN task_taskdata ttd ON tt.id = ttd.task_id
+                LEFT JOIN process_processfield ppf ON ttd.field_id = ppf.id
+            GROUP BY tt.id, tt.process_id
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task', '0011_task_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskTitleSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(max_length=10)),
+                ('year_month', models.CharField(max_length=4)),
+                ('last_value', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('prefix', 'year_month'), name='unique_title_sequence')],
+            },
+        ),
+        # Seed the counters from existing titles (<prefix><yymm><number>)
+        migrations.RunSQL(
+            """
+            INSERT INTO task_tasktitlesequence (prefix, year_month, last_value)
+            SELECT
+                pp.prefix,
+                SUBSTRING(tt.title FROM CHAR_LENGTH(pp.prefix) + 1 FOR 4),
+                MAX(SUBSTRING(tt.title FROM CHAR_LENGTH(pp.prefix) + 5)::integer)
+            FROM task_task tt
+                JOIN process_process pp ON tt.process_id = pp.id
+            WHERE LEFT(tt.title, CHAR_LENGTH(pp.prefix)) = pp.prefix
+                AND SUBSTRING(tt.title FROM CHAR_LENGTH(pp.prefix) + 1) ~ '^[0-9]{7,}$'
+            GROUP BY 1, 2
+            ON CONFLICT (prefix, year_month)
+            DO UPDATE SET last_value = GREATEST(task_tasktitlesequence.last_value, EXCLUDED.last_value)
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task', '0014_fileblob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fileblob',
+            name='thumbnail',
+            field=models.FileField(blank=True, null=True, upload_to='renditions/'),
+        ),
+        migrations.AddField(
+            model_name='fileblob',
+            name='preview',
+            field=models.FileField(blank=True, null=True, upload_to='renditions/'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task', '0015_fileblob_renditions'),
+        ('process', '0010_processfield_promoted_key'),
+        ('workflow_engine', '0003_alter_state_state_type'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskInboxEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('state_entered_at', models.DateTimeField()),
+                ('action', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='process.action')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inbox_entries', to='task.task')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-state_entered_at'], name='task_taskin_user_id_864730_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'task', 'action'), name='unique_inbox_entry')],
+            },
+        ),
+        migrations.RunSQL(
+            """
+            INSERT INTO task_taskinboxentry (user_id, task_id, action_id, state_entered_at)
+            SELECT DISTINCT ON (tp.user_id, tp.task_id, tp.action_id)
+                tp.user_id,
+                tp.task_id,
+                tp.action_id,
+                COALESCE(
+                    (SELECT MAX(ttal.created_at) FROM task_taskactionlog ttal WHERE ttal.task_id = tt.id),
+                    tt.created_at
+                )
+            FROM task_task tt
+                JOIN task_taskpermission tp ON tp.task_id = tt.id
+                JOIN process_action pa ON tp.action_id = pa.id AND pa.process_id = tt.process_id
+                JOIN workflow_engine_actiontransition wat ON wat.action_id = tp.action_id
+                JOIN workflow_engine_transition wt ON wat.transition_id = wt.id
+                    AND wt.current_state_id = tt.state_id
+            ORDER BY tp.user_id, tp.task_id, tp.action_id, tp.id
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
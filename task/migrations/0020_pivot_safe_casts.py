@@ -0,0 +1,29 @@
+from django.db import migrations
+
+
+SAFE_CAST = """
+    CREATE OR REPLACE FUNCTION pivot_safe_{name}(value text) RETURNS {type} AS $$
+    BEGIN
+        RETURN value::{type};
+    EXCEPTION WHEN others THEN
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql IMMUTABLE;
+"""
+
+CASTS = {'date': 'date', 'time': 'time', 'integer': 'integer'}
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task', '0019_outboxevent'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            SAFE_CAST.format(name=name, type=type_),
+            f"DROP FUNCTION IF EXISTS pivot_safe_{name}(text);",
+        )
+        for name, type_ in CASTS.items()
+    ]
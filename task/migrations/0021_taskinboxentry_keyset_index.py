@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task', '0020_pivot_safe_casts'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='taskinboxentry',
+            name='task_taskin_user_id_864730_idx',
+        ),
+        migrations.AddIndex(
+            model_name='taskinboxentry',
+            index=models.Index(fields=['user', '-state_entered_at', '-id'], name='task_taskin_user_id_5aa03d_idx'),
+        ),
+    ]
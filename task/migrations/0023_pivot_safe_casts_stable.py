@@ -0,0 +1,59 @@
+from django.db import migrations
+
+
+# Values are validated with a pattern before being converted, so nothing
+# raises and no per-call subtransaction is needed. Dates are built with
+# make_date instead of a text cast, which would depend on DateStyle.
+SAFE_CASTS = {
+    'date': r"""
+        CREATE OR REPLACE FUNCTION pivot_safe_date(value text) RETURNS date AS $$
+            SELECT CASE WHEN value ~ '^\d{4}-(0[1-9]|1[0-2])-(0[1-9]|[12]\d|3[01])$' THEN
+                CASE WHEN substr(value, 1, 4)::int > 0
+                    AND substr(value, 9, 2)::int <= extract(day from
+                        make_date(greatest(substr(value, 1, 4)::int, 1), substr(value, 6, 2)::int, 1)
+                        + interval '1 month - 1 day'
+                    )
+                THEN make_date(substr(value, 1, 4)::int, substr(value, 6, 2)::int, substr(value, 9, 2)::int)
+                END
+            END
+        $$ LANGUAGE sql STABLE;
+    """,
+    'time': r"""
+        CREATE OR REPLACE FUNCTION pivot_safe_time(value text) RETURNS time AS $$
+            SELECT CASE WHEN value ~ '^([01]?\d|2[0-3]):[0-5]\d(:[0-5]\d)?$' THEN value::time END
+        $$ LANGUAGE sql STABLE;
+    """,
+    'integer': r"""
+        CREATE OR REPLACE FUNCTION pivot_safe_integer(value text) RETURNS integer AS $$
+            SELECT CASE WHEN value ~ '^\s*-?\d{1,10}\s*$' THEN
+                CASE WHEN trim(value)::bigint BETWEEN -2147483648 AND 2147483647 THEN trim(value)::integer END
+            END
+        $$ LANGUAGE sql STABLE;
+    """,
+}
+
+# Definitions from 0020, restored on reverse
+PREVIOUS_SAFE_CAST = """
+    CREATE OR REPLACE FUNCTION pivot_safe_{name}(value text) RETURNS {name} AS $$
+    BEGIN
+        RETURN value::{name};
+    EXCEPTION WHEN others THEN
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql IMMUTABLE;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task', '0022_outboxevent_next_attempt_at'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql,
+            PREVIOUS_SAFE_CAST.format(name=name),
+        )
+        for name, sql in SAFE_CASTS.items()
+    ]
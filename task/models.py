@@ -1,24 +1,56 @@
 import uuid
-from django.db import models
+from django.db import connection, models
 from user.models import User
 from process.models import Process, Action, ProcessField
 from workflow_engine.models import State
 from django.utils.timezone import now
-from django.core.validators import FileExtensionValidator
+from django.core.validators import FileExtensionValidator, MaxValueValidator
 
-def generate_task_title(process: Process) -> str:
+def allocate_task_titles(process: Process, count: int) -> list:
+    """
+    Allocate `count` consecutive title numbers for the process prefix in the
+    current month.
+
+    The counter row is bumped with a single atomic upsert, so concurrent creates
+    never share a number. Call it outside the task's transaction to release the
+    row lock right away; numbers of rolled back creates are simply skipped.
+    """
     prefix = process.prefix or "XX"
-    current_time = now()
-    year_month = current_time.strftime('%y%m')
+    year_month = now().strftime('%y%m')
+
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO task_tasktitlesequence (prefix, year_month, last_value)
+            VALUES (%s, %s, %s)
+            ON CONFLICT (prefix, year_month)
+            DO UPDATE SET last_value = task_tasktitlesequence.last_value + EXCLUDED.last_value
+            RETURNING last_value
+        """, [prefix, year_month, count])
+        last_value = cursor.fetchone()[0]
+
+    return [
+        f"{prefix}{year_month}{task_count:03d}"
+        for task_count in range(last_value - count + 1, last_value + 1)
+    ]
+
+
+def generate_task_title(process: Process) -> str:
+    return allocate_task_titles(process, 1)[0]
+
 
-    # Count tasks from ALL processes with same prefix in same month
-    task_count = Task.objects.filter(
-        process__prefix=prefix,
-        created_at__year=current_time.year,
-        created_at__month=current_time.month
-    ).count() + 1
+class TaskTitleSequence(models.Model):
+    """Last task title number handed out per prefix and month"""
+    prefix = models.CharField(max_length=10)
+    year_month = models.CharField(max_length=4)  # yymm
+    last_value = models.PositiveIntegerField(default=0)
 
-    return f"{prefix}{year_month}{task_count:03d}"
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['prefix', 'year_month'], name='unique_title_sequence')
+        ]
+
+    def __str__(self):
+        return f"{self.prefix}{self.year_month}: {self.last_value}"
 
 
 class Task(models.Model):
@@ -32,6 +64,11 @@ class Task(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of the sent/received task lists
+            models.Index(fields=['created_by', '-created_at', '-id']),
+            models.Index(fields=['-created_at', '-id']),
+        ]
     
     def __str__(self):
         return self.title
@@ -76,6 +113,35 @@ def save_with_history(self, user, new_value=None, commit=True):
         return self
 
 
+class TaskPromotedValue(models.Model):
+    """Denormalized copy of TaskData values whose field has a promoted_key"""
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='promoted_values')
+    key = models.CharField(max_length=50)
+    value = models.CharField(max_length=255, blank=True, null=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['task', 'key'], name='unique_task_promoted_key')
+        ]
+        indexes = [
+            models.Index(fields=['key', 'value']),
+        ]
+    
+    def __str__(self):
+        return f"{self.task} - {self.key}"
+
+
+class TaskSnapshot(models.Model):
+    """Wide per-task projection of TaskData (field name -> value) read by the reports"""
+    task = models.OneToOneField(Task, on_delete=models.CASCADE, primary_key=True, related_name='snapshot')
+    process = models.ForeignKey(Process, on_delete=models.CASCADE)
+    data = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.task}"
+
+
 class TaskDataHistory(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     task_data = models.ForeignKey(TaskData, on_delete=models.CASCADE, related_name='history')
@@ -90,11 +156,31 @@ def __str__(self):
         return f"{self.task_data} - {self.updated_at}"
 
 
+class FileBlob(models.Model):
+    """
+    Attachment content stored once per SHA-256 and shared by every
+    TaskFileData / TaskActionLog row uploading the same bytes.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    file = models.FileField(upload_to='blobs/')
+    size = models.BigIntegerField()
+    mime_type = models.CharField(max_length=100, blank=True)
+    ref_count = models.PositiveIntegerField(default=0)
+    # Image renditions, see task.renditions
+    thumbnail = models.FileField(upload_to='renditions/', null=True, blank=True)
+    preview = models.FileField(upload_to='renditions/', null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sha256} ({self.ref_count} refs)"
+
+
 class TaskFileData(models.Model):
     task_data = models.ForeignKey(TaskData, on_delete=models.CASCADE, related_name='files')
     uploaded_file = models.FileField(
         upload_to='uploads/task_data_files/'
     )
+    blob = models.ForeignKey(FileBlob, on_delete=models.PROTECT, null=True, blank=True)
     original_filename = models.CharField(max_length=255, blank=True)
     file_size = models.IntegerField(blank=True, null=True)
     mime_type = models.CharField(max_length=100, blank=True)
@@ -103,6 +189,24 @@ class TaskFileData(models.Model):
     class Meta:
         ordering = ['-uploaded_at']
 
+    @classmethod
+    def from_upload(cls, task_data, file):
+        """
+        Unsaved TaskFileData for an uploaded file. The content is stored (or
+        found already stored) as a FileBlob right away; the row only points at it.
+        """
+        from .blobs import acquire_blob
+
+        blob = acquire_blob(file)
+        return cls(
+            task_data=task_data,
+            uploaded_file=blob.file.name,
+            blob=blob,
+            original_filename=file.name or 'unknown',
+            file_size=blob.size,
+            mime_type=getattr(file, 'content_type', '') or blob.mime_type
+        )
+
 
 class TaskActionLog(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -116,6 +220,7 @@ class TaskActionLog(models.Model):
         null=True,
         blank=True
     )
+    blob = models.ForeignKey(FileBlob, on_delete=models.PROTECT, null=True, blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -125,8 +230,74 @@ class Meta:
 
     def __str__(self):
         return f"{self.task} - {self.user} - {self.action}"
+
+    def attach_file(self, file):
+        """Point `file` at the deduplicated FileBlob for the upload (unsaved)"""
+        from .blobs import acquire_blob
+
+        self.blob = acquire_blob(file)
+        self.file = self.blob.file.name
     
 
+class UploadSession(models.Model):
+    """
+    A resumable upload: chunks are appended to a partial file on disk and the
+    result is attached to its target (a TaskData file or a TaskActionLog) on completion.
+    """
+    class Status(models.TextChoices):
+        OPEN = 'open', 'Open'
+        COMPLETED = 'completed', 'Completed'
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions')
+    task_data = models.ForeignKey(TaskData, on_delete=models.CASCADE, null=True, blank=True)
+    action_log = models.ForeignKey(TaskActionLog, on_delete=models.CASCADE, null=True, blank=True)
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    size = models.BigIntegerField()
+    received = models.BigIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.OPEN)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(task_data__isnull=False, action_log__isnull=True)
+                | models.Q(task_data__isnull=True, action_log__isnull=False),
+                name='upload_session_single_target'
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size})"
+
+
+class TaskInboxEntry(models.Model):
+    """
+    Projection of TaskPermission onto the task's current state: one row per
+    action a user can take on a task right now. Maintained by
+    task.projections.refresh_task_inbox.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='inbox_entries')
+    action = models.ForeignKey(Action, on_delete=models.CASCADE)
+    state_entered_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'task', 'action'], name='unique_inbox_entry')
+        ]
+        indexes = [
+            # Keyset pagination of the received task list
+            models.Index(fields=['user', '-state_entered_at', '-id']),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.task} - {self.action}"
+
+
 class TaskPermission(models.Model):
     """Stores computed permissions when task is created"""
     task = models.ForeignKey(Task, on_delete=models.CASCADE, db_index=True)
@@ -143,4 +314,67 @@ class Meta:
         ]
         
     def __str__(self):
-        return f"{self.task} - {self.user} - {self.action}"
\ No newline at end of file
+        return f"{self.task} - {self.user} - {self.action}"
+
+class NotificationDelivery(models.Model):
+    """Outcome of sending one push message to one device"""
+    class Status(models.TextChoices):
+        SENT = 'sent', 'Sent'
+        RETRYING = 'retrying', 'Retrying'
+        FAILED = 'failed', 'Failed'
+        UNREGISTERED = 'unregistered', 'Unregistered'
+
+    device = models.ForeignKey('fcm_django.FCMDevice', on_delete=models.SET_NULL, null=True, blank=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    status = models.CharField(max_length=20, choices=Status.choices)
+    error_code = models.CharField(max_length=50, blank=True)
+    attempt = models.PositiveSmallIntegerField(default=1)
+    data = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.device_id} - {self.status} ({self.attempt})"
+
+
+class NotificationPreference(models.Model):
+    """How a user wants task notifications delivered"""
+    class Digest(models.TextChoices):
+        OFF = 'off', 'Off'
+        HOURLY = 'hourly', 'Hourly'
+        DAILY = 'daily', 'Daily'
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='notification_preference')
+    digest = models.CharField(max_length=20, choices=Digest.choices, default=Digest.OFF)
+    digest_hour = models.PositiveSmallIntegerField(default=8, validators=[MaxValueValidator(23)])
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user} - {self.digest}"
+
+
+class OutboxEvent(models.Model):
+    """
+    A workflow event written in the same transaction as the change it
+    describes, and handed to subscribers by the outbox relay.
+    """
+    event_type = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # A failed event is not retried before this time, see task.outbox.retry_delay
+    next_attempt_at = models.DateTimeField(default=now)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['id'], condition=models.Q(processed_at__isnull=True), name='outbox_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} #{self.pk}"
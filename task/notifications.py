@@ -0,0 +1,255 @@
+import logging
+import random
+from typing import NamedTuple
+import requests
+from django.conf import settings
+from django.utils.module_loading import import_string
+from fcm_django.models import FCMDevice
+from firebase_admin import exceptions, messaging
+from .models import NotificationDelivery
+
+logger = logging.getLogger(__name__)
+
+# FCM accepts at most 500 tokens per multicast request
+CHUNK_SIZE = 500
+
+# FCM v1 error codes
+UNREGISTERED_CODES = {'UNREGISTERED', 'SENDER_ID_MISMATCH'}
+TRANSIENT_CODES = {'UNAVAILABLE', 'INTERNAL', 'QUOTA_EXCEEDED', 'DEADLINE_EXCEEDED', 'RESOURCE_EXHAUSTED'}
+
+
+class SendResult(NamedTuple):
+    token: str
+    error: str = None
+    transient: bool = False
+    unregistered: bool = False
+
+
+class FirebaseTransport:
+    """Sends through the Firebase Admin SDK, one multicast request per chunk"""
+
+    def send(self, tokens, data):
+        try:
+            response = messaging.send_each_for_multicast(
+                messaging.MulticastMessage(tokens=tokens, data=data)
+            )
+        except exceptions.FirebaseError as e:
+            # The whole request failed; every token shares the outcome
+            transient = self._is_transient(e)
+            return [SendResult(token, e.code, transient=transient) for token in tokens]
+
+        results = []
+        for token, send_response in zip(tokens, response.responses):
+            e = send_response.exception
+            if e is None:
+                results.append(SendResult(token))
+            else:
+                results.append(SendResult(
+                    token,
+                    e.code,
+                    transient=self._is_transient(e),
+                    unregistered=isinstance(e, (messaging.UnregisteredError, messaging.SenderIdMismatchError)),
+                ))
+        return results
+
+    @staticmethod
+    def _is_transient(e):
+        return isinstance(e, (
+            exceptions.UnavailableError,
+            exceptions.InternalError,
+            exceptions.DeadlineExceededError,
+            exceptions.ResourceExhaustedError,
+        ))
+
+
+class StandInTransport:
+    """
+    Posts one `messages:sendMulticast` request per chunk to FCM_STANDIN_URL,
+    a local server mimicking FCM, and reads its per-token responses and
+    error bodies the way FCM returns them. For development and testing the
+    dispatcher without Firebase credentials.
+
+    The stand-in answers `{"responses": [...]}` with one entry per token, in
+    order: `{}` on success or `{"error": <FCM v1 error>}`.
+    """
+
+    def __init__(self, base_url=None, timeout=5):
+        self.url = f"{(base_url or settings.FCM_STANDIN_URL).rstrip('/')}/v1/projects/standin/messages:sendMulticast"
+        self.timeout = timeout
+
+    def send(self, tokens, data):
+        try:
+            response = requests.post(
+                self.url, json={'message': {'tokens': tokens, 'data': data}}, timeout=self.timeout
+            )
+        except requests.RequestException:
+            return [SendResult(token, 'UNAVAILABLE', transient=True) for token in tokens]
+
+        if not response.ok:
+            # The whole request failed; every token shares the outcome
+            code = self._error_code(self._error(response), response.status_code)
+            transient = code in TRANSIENT_CODES or response.status_code == 429 or response.status_code >= 500
+            return [SendResult(token, code, transient=transient) for token in tokens]
+
+        try:
+            responses = response.json().get('responses', [])
+        except ValueError:
+            responses = []
+        # Tokens the stand-in did not answer for are retried
+        responses += [{'error': {'status': 'INTERNAL'}}] * (len(tokens) - len(responses))
+
+        results = []
+        for token, send_response in zip(tokens, responses):
+            error = send_response.get('error')
+            if error is None:
+                results.append(SendResult(token))
+            else:
+                code = self._error_code(error, error.get('code'))
+                results.append(SendResult(
+                    token,
+                    code,
+                    transient=code in TRANSIENT_CODES,
+                    unregistered=code in UNREGISTERED_CODES,
+                ))
+        return results
+
+    @staticmethod
+    def _error(response):
+        try:
+            return response.json().get('error', {})
+        except ValueError:
+            return {}
+
+    @staticmethod
+    def _error_code(error, status_code):
+        for detail in error.get('details', []):
+            if detail.get('errorCode'):
+                return detail['errorCode']
+        return error.get('status') or str(status_code)
+
+
+def build_task_message(tasks):
+    """
+    Push payload for tasks awaiting one user: the task itself when there is
+    one, a count and the first titles otherwise.
+    """
+    if len(tasks) == 1:
+        task = tasks[0]
+        return {
+            'title': "TE-1 Viet Lien",
+            'body': f"{task.title} ({task.state.name}) cần thực hiện",
+            'task_id': str(task.id),
+            'task_ids': str(task.id),
+            'state_id': str(task.state_id),
+            'url': f"{settings.DOMAIN_URL}/task-management/tasks/{task.id}",
+        }
+
+    titles = ', '.join(task.title for task in tasks[:5])
+    more = '...' if len(tasks) > 5 else ''
+    return {
+        'title': "TE-1 Viet Lien",
+        'body': f"{len(tasks)} công việc cần thực hiện: {titles}{more}",
+        'task_ids': ','.join(str(task.id) for task in tasks),
+        'url': f"{settings.DOMAIN_URL}/task-management/tasks",
+    }
+
+
+def get_transport():
+    return import_string(settings.NOTIFICATION_TRANSPORT)()
+
+
+def retry_delay(attempt):
+    """Exponential backoff with jitter, in seconds, before the given attempt"""
+    base = settings.NOTIFICATION_RETRY_BASE_DELAY
+    return base * 2 ** (attempt - 2) + random.uniform(0, base)
+
+
+class NotificationDispatcher:
+    """
+    Sends one data message to a set of devices.
+
+    Active device tokens are loaded once and sent in chunks of CHUNK_SIZE.
+    Tokens FCM reports as unregistered are deactivated; tokens that failed
+    with a transient error are retried with exponential backoff through the
+    deliver_notification task. Every send is recorded as a
+    NotificationDelivery row.
+    """
+
+    def __init__(self, transport=None):
+        self.transport = transport or get_transport()
+
+    @staticmethod
+    def load_devices(user_ids):
+        """Active (device_id, user_id, token) triples of the users"""
+        return list(FCMDevice.objects.filter(
+            user_id__in=user_ids, active=True
+        ).values_list('id', 'user_id', 'registration_id'))
+
+    def send_to_users(self, user_ids, data):
+        return self.dispatch(self.load_devices(user_ids), data)
+
+    def send_to_devices(self, device_ids, data, attempt=1):
+        devices = list(FCMDevice.objects.filter(
+            id__in=device_ids, active=True
+        ).values_list('id', 'user_id', 'registration_id'))
+        return self.dispatch(devices, data, attempt)
+
+    def dispatch(self, devices, data, attempt=1):
+        """
+        Send to (device_id, user_id, token) triples and return a summary of
+        the outcome.
+        """
+        # FCM data payloads only carry strings
+        data = {key: str(value) for key, value in data.items() if value is not None}
+        by_token = {token: (device_id, user_id) for device_id, user_id, token in devices}
+        tokens = list(by_token)
+
+        results = []
+        for start in range(0, len(tokens), CHUNK_SIZE):
+            results.extend(self.transport.send(tokens[start:start + CHUNK_SIZE], data))
+
+        final_attempt = attempt >= settings.NOTIFICATION_MAX_ATTEMPTS
+        deliveries = []
+        unregistered = []
+        retry = []
+        for result in results:
+            device_id, user_id = by_token[result.token]
+            if result.error is None:
+                status = NotificationDelivery.Status.SENT
+            elif result.unregistered:
+                status = NotificationDelivery.Status.UNREGISTERED
+                unregistered.append(device_id)
+            elif result.transient and not final_attempt:
+                status = NotificationDelivery.Status.RETRYING
+                retry.append(device_id)
+            else:
+                status = NotificationDelivery.Status.FAILED
+            deliveries.append(NotificationDelivery(
+                device_id=device_id,
+                user_id=user_id,
+                status=status,
+                error_code=result.error or '',
+                attempt=attempt,
+                data=data,
+            ))
+
+        NotificationDelivery.objects.bulk_create(deliveries, batch_size=1000)
+        if unregistered:
+            FCMDevice.objects.filter(id__in=unregistered).update(active=False)
+        if retry:
+            from .tasks import deliver_notification
+            deliver_notification.apply_async(args=[retry, data, attempt + 1], countdown=retry_delay(attempt + 1))
+
+        summary = {
+            'devices_count': len(tokens),
+            'success_count': sum(1 for result in results if result.error is None),
+            'failure_count': sum(1 for result in results if result.error is not None),
+            'unregistered_count': len(unregistered),
+            'retry_count': len(retry),
+        }
+        logger.info(
+            f"Notification attempt {attempt}: {summary['devices_count']} devices, "
+            f"Success: {summary['success_count']}, Failed: {summary['failure_count']}, "
+            f"Deactivated: {summary['unregistered_count']}, Retrying: {summary['retry_count']}"
+        )
+        return summary
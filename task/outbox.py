@@ -0,0 +1,83 @@
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils.timezone import now
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+TASK_CREATED = 'task.created'
+TASK_TRANSITIONED = 'task.transitioned'
+
+# event_type -> handlers taking the event payload
+_subscribers = {}
+
+
+def subscriber(*event_types):
+    """Register the decorated function as a handler of the given event types"""
+    def register(handler):
+        for event_type in event_types:
+            _subscribers.setdefault(event_type, []).append(handler)
+        return handler
+    return register
+
+
+def publish(event_type, **payload):
+    """
+    Record an event. Call inside the transaction making the change so the
+    event exists exactly when the change is committed.
+    """
+    return OutboxEvent.objects.create(event_type=event_type, payload=payload)
+
+
+def retry_delay(attempts):
+    """Seconds to wait before retrying an event that failed `attempts` times"""
+    return min(settings.OUTBOX_RETRY_BASE_DELAY * 2 ** (attempts - 1), settings.OUTBOX_RETRY_MAX_DELAY)
+
+
+def relay_batch(batch_size=None):
+    """
+    Hand the oldest due events to their subscribers and return how many
+    were taken.
+
+    Rows are claimed with SKIP LOCKED so several relays can drain in
+    parallel. Each event's handlers run in their own savepoint, so a
+    database error in one does not abort the batch. An event whose handler
+    fails stays pending and is retried with exponential backoff until
+    OUTBOX_MAX_ATTEMPTS; handlers must tolerate seeing an event more than
+    once.
+    """
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+
+    with transaction.atomic():
+        events = list(OutboxEvent.objects.select_for_update(skip_locked=True).filter(
+            processed_at__isnull=True,
+            attempts__lt=settings.OUTBOX_MAX_ATTEMPTS,
+            next_attempt_at__lte=now()
+        ).order_by('id')[:batch_size])
+
+        for event in events:
+            event.attempts += 1
+            try:
+                with transaction.atomic():
+                    for handler in _subscribers.get(event.event_type, []):
+                        handler(event.payload)
+            except Exception as e:
+                event.last_error = f"{type(e).__name__}: {str(e)}"
+                event.next_attempt_at = now() + timedelta(seconds=retry_delay(event.attempts))
+                if event.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                    logger.error(
+                        f"Outbox event {event.pk} ({event.event_type}) dropped after {event.attempts} attempts - {str(e)}"
+                    )
+                else:
+                    logger.warning(
+                        f"Outbox event {event.pk} ({event.event_type}) failed, attempt {event.attempts} - {str(e)}"
+                    )
+            else:
+                event.processed_at = now()
+                event.last_error = ''
+
+        OutboxEvent.objects.bulk_update(events, ['attempts', 'processed_at', 'next_attempt_at', 'last_error'])
+
+    return len(events)
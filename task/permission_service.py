@@ -1,119 +1,213 @@
-from typing import List, Set
+import uuid
+from collections import defaultdict
+from typing import Dict, List, Set
+from django.db import transaction
+from django.db.models import F, Q
 from process.models import ProcessActionRole, RoleType, Action
-from task.models import Task, TaskPermission
+from task.models import Task, TaskData, TaskInboxEntry, TaskPermission
+from task.projections import refresh_task_inbox
 from user.models import User
-from workflow_engine.models import Transition
+from workflow_engine.graph import WorkflowGraph
 
 class PermissionService:
     
     @staticmethod
     def create_task_permissions(task: Task):
         """Calculate and store permissions once when task is created"""
-        actions = Action.objects.filter(processactionrole__process=task.process).distinct()
-        permissions = []
-        
-        for action in actions:
-            users_with_rules = PermissionService._resolve_users_for_action(task, action)
-            for user, role_type in users_with_rules:
-                permissions.append(TaskPermission(
-                    task=task,
-                    action=action,
-                    user=user,
-                    role_type=role_type
-                ))
-        
-        TaskPermission.objects.bulk_create(permissions, ignore_conflicts=True)
-    
+        PermissionService.create_permissions_for_tasks([task])
+
     @staticmethod
-    def _resolve_users_for_action(task: Task, action: Action) -> List[tuple]:
-        """Returns list of (user, role_type) tuples"""
-        users_with_rules = []
-        role_definitions = ProcessActionRole.objects.filter(
-            process=task.process,
-            action=action
-        ).select_related('specific_user', 'specific_role', 'specific_department')
+    def create_permissions_for_tasks(tasks) -> int:
+        """Calculate and store permissions for many tasks with one bulk insert"""
+        permissions = PermissionService.build_task_permissions(tasks)
+        TaskPermission.objects.bulk_create(permissions, ignore_conflicts=True, batch_size=1000)
+        refresh_task_inbox([task.pk for task in tasks])
+        return len(permissions)
 
-        for role_def in role_definitions:
-            users = PermissionService._resolve_users_for_role(task, role_def)
-            # Use the actual role_type enum value instead of constructing a string
-            users_with_rules.extend([(user, role_def.role_type) for user in users])
+    @staticmethod
+    def recompute_permissions(task_ids) -> tuple:
+        """
+        Replace the stored permissions of the given tasks with freshly resolved
+        ones in one transaction. Returns (deleted_count, created_count).
+        """
+        tasks = Task.objects.filter(id__in=task_ids).only('id', 'process_id', 'created_by_id')
+        with transaction.atomic():
+            deleted = TaskPermission.objects.filter(task_id__in=task_ids).delete()[0]
+            created = PermissionService.create_permissions_for_tasks(tasks)
+        return deleted, created
 
-        return users_with_rules
-    
     @staticmethod
-    def _resolve_users_for_role(task: Task, role_def: ProcessActionRole) -> List[User]:
-        """Your original logic - unchanged"""
-        users = []
-
-        if role_def.role_type == RoleType.REQUESTOR:
-            users.append(task.created_by)
-
-        elif role_def.role_type == RoleType.REQUESTOR_MANAGER:
-            if hasattr(task.created_by, 'supervisor') and task.created_by.supervisor:
-                users.append(task.created_by.supervisor)
-
-        elif role_def.role_type == RoleType.REQUESTOR_DEPARTMENT_HEAD:
-            if task.created_by.department:
-                dept_manager = PermissionService._get_department_manager(task.created_by.department)
-                if dept_manager:
-                    users.append(dept_manager)
-
-        elif role_def.role_type == RoleType.SPECIFIC_DEPARTMENT_HEAD:
-            if role_def.specific_department:
-                dept_manager = PermissionService._get_department_manager(role_def.specific_department)
-                if dept_manager:
-                    users.append(dept_manager)
-
-        elif role_def.role_type == RoleType.ASSIGNEE:
-            assignees = PermissionService._get_task_assignees(task)
-            users.extend(assignees)
-
-        elif role_def.role_type == RoleType.SPECIFIC_USER and role_def.specific_user:
-            users.append(role_def.specific_user)
-
-        elif role_def.role_type == RoleType.SPECIFIC_ROLE and role_def.specific_role:
-            users.extend(
-                User.objects.filter(role=role_def.specific_role, is_active=True)
-            )
+    def build_task_permissions(tasks) -> List[TaskPermission]:
+        """
+        Resolve the TaskPermission rows for the given tasks.
+
+        Role definitions for all involved processes are loaded once, and every
+        role type is resolved with bulk IN queries, so the number of queries
+        does not depend on the number of tasks, actions or roles.
+        """
+        tasks = list(tasks)
+        if not tasks:
+            return []
 
-        elif role_def.role_type == RoleType.SPECIFIC_DEPARTMENT and role_def.specific_department:
-            users.extend(
-                User.objects.filter(department=role_def.specific_department, is_active=True)
+        role_defs_by_process = defaultdict(list)
+        for role_def in ProcessActionRole.objects.filter(
+            process_id__in={task.process_id for task in tasks}
+        ).order_by('action_id', 'id'):
+            role_defs_by_process[role_def.process_id].append(role_def)
+
+        role_defs = [role_def for defs in role_defs_by_process.values() for role_def in defs]
+        if not role_defs:
+            return []
+        role_types = {role_def.role_type for role_def in role_defs}
+
+        requestors = {
+            user['id']: user for user in User.objects.filter(
+                id__in={task.created_by_id for task in tasks}
+            ).values('id', 'supervisor_id', 'department_id')
+        }
+
+        # Department heads for requestor and specific departments
+        head_departments = set()
+        if RoleType.REQUESTOR_DEPARTMENT_HEAD.value in role_types:
+            head_departments.update(user['department_id'] for user in requestors.values())
+        if RoleType.SPECIFIC_DEPARTMENT_HEAD.value in role_types:
+            head_departments.update(
+                role_def.specific_department_id for role_def in role_defs
+                if role_def.role_type == RoleType.SPECIFIC_DEPARTMENT_HEAD
             )
+        department_heads = PermissionService._get_department_managers(head_departments)
+
+        assignees = {}
+        if RoleType.ASSIGNEE.value in role_types:
+            assignees = PermissionService._get_task_assignees(tasks)
 
-        elif role_def.role_type == RoleType.SPECIFIC_ROLE_AND_DEPARTMENT:
-            if role_def.specific_role and role_def.specific_department:
-                users.extend(
-                    User.objects.filter(
-                        role=role_def.specific_role,
-                        department=role_def.specific_department,
-                        is_active=True
-                    )
+        members = PermissionService._get_role_members(role_defs)
+
+        permissions = {}
+        for task in tasks:
+            requestor = requestors.get(task.created_by_id, {})
+            for role_def in role_defs_by_process[task.process_id]:
+                user_ids = PermissionService._resolve_role_user_ids(
+                    task, role_def, requestor, department_heads, assignees, members
                 )
+                for user_id in user_ids:
+                    # First matching role wins, as with ignore_conflicts before
+                    permissions.setdefault((task.pk, role_def.action_id, user_id), TaskPermission(
+                        task_id=task.pk,
+                        action_id=role_def.action_id,
+                        user_id=user_id,
+                        role_type=role_def.role_type
+                    ))
 
-        return users
+        return list(permissions.values())
 
     @staticmethod
-    def _get_department_manager(department):
-        """Return department manager"""
-        if not department:
-            return None
-        return User.objects.filter(department=department, role__name_en='manager').first()
+    def _resolve_role_user_ids(task, role_def, requestor, department_heads, assignees, members) -> List:
+        """Resolve one role definition for one task against the preloaded lookups"""
+        role_type = role_def.role_type
+
+        if role_type == RoleType.REQUESTOR:
+            return [task.created_by_id]
+
+        if role_type == RoleType.REQUESTOR_MANAGER:
+            return [requestor['supervisor_id']] if requestor.get('supervisor_id') else []
+
+        if role_type == RoleType.REQUESTOR_DEPARTMENT_HEAD:
+            head = department_heads.get(requestor.get('department_id'))
+            return [head] if head else []
+
+        if role_type == RoleType.SPECIFIC_DEPARTMENT_HEAD:
+            head = department_heads.get(role_def.specific_department_id)
+            return [head] if head else []
+
+        if role_type == RoleType.ASSIGNEE:
+            return assignees.get(task.pk, [])
+
+        if role_type == RoleType.SPECIFIC_USER:
+            return [role_def.specific_user_id] if role_def.specific_user_id else []
+
+        if role_type == RoleType.SPECIFIC_ROLE:
+            return members['role'].get(role_def.specific_role_id, [])
+
+        if role_type == RoleType.SPECIFIC_DEPARTMENT:
+            return members['department'].get(role_def.specific_department_id, [])
+
+        if role_type == RoleType.SPECIFIC_ROLE_AND_DEPARTMENT:
+            return members['role_department'].get(
+                (role_def.specific_role_id, role_def.specific_department_id), []
+            )
+
+        return []
+
+    @staticmethod
+    def _get_department_managers(department_ids) -> Dict:
+        """Map department id -> id of its manager, one query for all departments"""
+        department_ids = {department_id for department_id in department_ids if department_id}
+        if not department_ids:
+            return {}
+
+        managers = User.objects.filter(
+            department_id__in=department_ids, role__name_en='manager'
+        ).order_by('department_id', 'id').distinct('department_id').values_list('department_id', 'id')
+        return dict(managers)
 
     @staticmethod
-    def _get_task_assignees(task: Task) -> List[User]:
-        """Get task assignees from task data"""
-        assignees = []
-        assignee_fields = task.data.filter(field__field_type='assignee')
+    def _get_task_assignees(tasks) -> Dict:
+        """Map task id -> ids of users picked in the task's assignee fields"""
+        values = TaskData.objects.filter(
+            task__in=tasks, field__field_type='assignee'
+        ).values_list('task_id', 'value')
 
-        for field in assignee_fields:
+        assignee_values = defaultdict(list)
+        for task_id, value in values:
             try:
-                user = User.objects.get(id=field.value)
-                assignees.append(user)
-            except (User.DoesNotExist, ValueError):
+                assignee_values[task_id].append(uuid.UUID(str(value)))
+            except ValueError:
                 continue
 
-        return assignees
+        existing = set(User.objects.filter(
+            id__in={user_id for ids in assignee_values.values() for user_id in ids}
+        ).values_list('id', flat=True))
+
+        return {
+            task_id: [user_id for user_id in ids if user_id in existing]
+            for task_id, ids in assignee_values.items()
+        }
+
+    @staticmethod
+    def _get_role_members(role_defs) -> Dict:
+        """
+        Active users grouped by role, department and (role, department) for
+        the SPECIFIC_ROLE / SPECIFIC_DEPARTMENT / SPECIFIC_ROLE_AND_DEPARTMENT
+        role definitions, loaded with a single query.
+        """
+        members = {'role': defaultdict(list), 'department': defaultdict(list), 'role_department': defaultdict(list)}
+        role_ids, department_ids, pairs = set(), set(), set()
+
+        for role_def in role_defs:
+            if role_def.role_type == RoleType.SPECIFIC_ROLE and role_def.specific_role_id:
+                role_ids.add(role_def.specific_role_id)
+            elif role_def.role_type == RoleType.SPECIFIC_DEPARTMENT and role_def.specific_department_id:
+                department_ids.add(role_def.specific_department_id)
+            elif (role_def.role_type == RoleType.SPECIFIC_ROLE_AND_DEPARTMENT
+                  and role_def.specific_role_id and role_def.specific_department_id):
+                pairs.add((role_def.specific_role_id, role_def.specific_department_id))
+
+        if not (role_ids or department_ids or pairs):
+            return members
+
+        condition = Q(role_id__in=role_ids | {role_id for role_id, _ in pairs}) | Q(department_id__in=department_ids)
+        users = User.objects.filter(condition, is_active=True).values_list('id', 'role_id', 'department_id')
+
+        for user_id, role_id, department_id in users:
+            if role_id in role_ids:
+                members['role'][role_id].append(user_id)
+            if department_id in department_ids:
+                members['department'][department_id].append(user_id)
+            if (role_id, department_id) in pairs:
+                members['role_department'][(role_id, department_id)].append(user_id)
+
+        return members
 
     # Fast lookup methods
     @staticmethod
@@ -125,6 +219,42 @@ def user_can_perform_action(user: User, task: Task, action: Action) -> bool:
             user=user
         ).exists()
     
+    @staticmethod
+    def get_available_actions(user: User, task: Task) -> List[Action]:
+        """Actions the user may perform from the task's current state, in one query"""
+        action_ids = WorkflowGraph.for_process(task.process_id).actions_from(task.state_id)
+        if not action_ids:
+            return []
+
+        return list(Action.objects.filter(
+            id__in=action_ids,
+            taskpermission__task=task,
+            taskpermission__user=user
+        ))
+
+    @staticmethod
+    def get_available_actions_for_tasks(user: User, task_ids) -> Dict:
+        """
+        Map task id -> actions the user may perform from each task's current
+        state. Two queries regardless of the number of tasks, and one graph
+        lookup per distinct process.
+        """
+        permitted = defaultdict(list)
+        for permission in TaskPermission.objects.filter(
+            task_id__in=task_ids, user=user
+        ).select_related('action'):
+            permitted[permission.task_id].append(permission.action)
+
+        rows = list(Task.objects.filter(id__in=task_ids).values_list('id', 'process_id', 'state_id'))
+        graphs = {process_id: WorkflowGraph.for_process(process_id) for process_id in {row[1] for row in rows}}
+
+        available = {}
+        for task_id, process_id, state_id in rows:
+            action_ids = graphs[process_id].actions_from(state_id)
+            available[task_id] = [action for action in permitted[task_id] if str(action.id) in action_ids]
+
+        return available
+
     @staticmethod
     def get_allowed_users_for_action(task: Task, action: Action) -> Set[User]:
         """Fast lookup of allowed users"""
@@ -135,6 +265,33 @@ def get_allowed_users_for_action(task: Task, action: Action) -> Set[User]:
         
         return {perm.user for perm in permissions}
     
+    @staticmethod
+    def get_recipients_for_tasks(tasks) -> Dict:
+        """
+        Map task id -> username of the first user who can act on the task's
+        current state. Resolves a whole page of tasks in a single query.
+        """
+        permissions = TaskPermission.objects.filter(
+            task__in=tasks,
+            action__actiontransition__transition__current_state=F('task__state'),
+            action__process=F('task__process')
+        ).select_related('user').order_by('task_id', 'id').distinct('task_id')
+
+        return {perm.task_id: perm.user.username for perm in permissions}
+
+    @staticmethod
+    def get_actions_for_tasks(user: User, tasks) -> Dict:
+        """
+        Map task id -> name of the first action the user can perform from the
+        task's current state, read from the user's inbox projection.
+        """
+        entries = TaskInboxEntry.objects.filter(
+            task__in=tasks,
+            user=user
+        ).select_related('action').order_by('task_id', 'id').distinct('task_id')
+
+        return {entry.task_id: entry.action.name for entry in entries}
+
     @staticmethod
     def get_users_for_state(task, state) -> Set[User]:
         """
@@ -143,21 +300,13 @@ def get_users_for_state(task, state) -> Set[User]:
         Returns a set of users who have TaskPermission entries for actions
         associated with transitions from the given state.
         """
-        # Get all transitions from the current state for this task's process
-        transitions = Transition.objects.filter(
-            process=task.process,
-            current_state=state
-        )
-        
-        # Get all actions associated with these transitions
-        actions = Action.objects.filter(
-            actiontransition__transition__in=transitions
-        ).distinct()
+        # Actions leaving the state, from the compiled workflow graph
+        action_ids = WorkflowGraph.for_process(task.process_id).actions_from(state.id)
         
         # Get all users with TaskPermission for these actions on this task
         users = User.objects.filter(
             taskpermission__task=task,
-            taskpermission__action__in=actions
+            taskpermission__action_id__in=action_ids
         ).distinct()
         
         return set(users)
\ No newline at end of file
@@ -0,0 +1,114 @@
+"""
+Works out which open tasks are affected by an org-chart or role definition
+change, so only their TaskPermission rows are recomputed.
+"""
+from django.db.models import Q
+from process.models import ProcessActionRole, RoleType
+from workflow_engine.models import StateType
+from .models import Task
+from .permission_service import PermissionService
+
+# Tasks in these states no longer accept actions
+FINISHED_STATE_TYPES = [StateType.CLOSED, StateType.CANCELED, StateType.DENIED]
+
+# User fields the role resolution depends on
+USER_PERMISSION_FIELDS = ['department_id', 'role_id', 'supervisor_id', 'is_active']
+
+DEPARTMENT_HEAD_ROLE = 'manager'
+
+
+def open_tasks():
+    return Task.objects.exclude(state__state_type__in=FINISHED_STATE_TYPES)
+
+
+def iter_task_id_chunks(queryset, chunk_size, last_id=None):
+    """Yield lists of task ids ordered by id, seeking past the previous chunk"""
+    queryset = queryset.order_by('id')
+    while True:
+        page = queryset.filter(id__gt=last_id) if last_id else queryset
+        task_ids = list(page.values_list('id', flat=True)[:chunk_size])
+        if not task_ids:
+            return
+        yield task_ids
+        last_id = task_ids[-1]
+
+
+def recompute_tasks(queryset, chunk_size=500):
+    """Recompute permissions for every task in the queryset, chunk by chunk"""
+    totals = {'tasks': 0, 'deleted': 0, 'created': 0}
+    for task_ids in iter_task_id_chunks(queryset.values('id').distinct(), chunk_size):
+        deleted, created = PermissionService.recompute_permissions(task_ids)
+        totals['tasks'] += len(task_ids)
+        totals['deleted'] += deleted
+        totals['created'] += created
+    return totals
+
+
+def _processes_with(role_type, **filters):
+    return ProcessActionRole.objects.filter(role_type=role_type, **filters).values('process_id')
+
+
+def affected_tasks_for_user(user_id, old, new):
+    """
+    Open tasks whose permissions may change when a user's department, role,
+    supervisor or active flag goes from `old` to `new` (dicts keyed by
+    USER_PERMISSION_FIELDS; `old` is empty for a new user).
+    """
+    departments = {values.get('department_id') for values in (old, new)} - {None}
+    roles = {values.get('role_id') for values in (old, new)} - {None}
+    condition = Q()
+
+    # Requestor based roles on the user's own tasks
+    if old.get('supervisor_id') != new.get('supervisor_id'):
+        condition |= Q(created_by_id=user_id, process__in=_processes_with(RoleType.REQUESTOR_MANAGER))
+    if old.get('department_id') != new.get('department_id'):
+        condition |= Q(created_by_id=user_id, process__in=_processes_with(RoleType.REQUESTOR_DEPARTMENT_HEAD))
+
+    # Membership based roles
+    membership_changed = any(
+        old.get(field) != new.get(field) for field in ('department_id', 'role_id', 'is_active')
+    )
+    if membership_changed:
+        condition |= Q(process__in=_processes_with(RoleType.SPECIFIC_ROLE, specific_role__in=roles))
+        condition |= Q(process__in=_processes_with(RoleType.SPECIFIC_DEPARTMENT, specific_department__in=departments))
+        condition |= Q(process__in=_processes_with(
+            RoleType.SPECIFIC_ROLE_AND_DEPARTMENT,
+            specific_role__in=roles,
+            specific_department__in=departments
+        ))
+
+        # The user may have become, or stopped being, a department head
+        condition |= _department_head_condition(departments)
+
+    if not condition:
+        return Task.objects.none()
+    return open_tasks().filter(condition)
+
+
+def affected_tasks_for_role(role_id):
+    """
+    Open tasks affected by a Role rename: its members may gain or lose
+    department head status, which is matched on the role name.
+    """
+    from user.models import User
+
+    departments = set(User.objects.filter(role_id=role_id).values_list('department_id', flat=True))
+    condition = _department_head_condition(departments)
+    if not condition:
+        return Task.objects.none()
+    return open_tasks().filter(condition)
+
+
+def affected_tasks_for_process(process_id):
+    """Open tasks of a process whose ProcessActionRole definitions changed"""
+    return open_tasks().filter(process_id=process_id)
+
+
+def _department_head_condition(departments):
+    if not departments:
+        return Q()
+    return (
+        Q(created_by__department__in=departments,
+          process__in=_processes_with(RoleType.REQUESTOR_DEPARTMENT_HEAD))
+        | Q(process__in=_processes_with(RoleType.SPECIFIC_DEPARTMENT_HEAD, specific_department__in=departments))
+    )
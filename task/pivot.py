@@ -0,0 +1,142 @@
+from django.db import connection
+from rest_framework.exceptions import ValidationError
+
+
+class ProcessPivot:
+    """
+    Builds a one-row-per-task pivot of TaskData for every process sharing a
+    prefix. Values are picked by field_id, resolved once per query from the
+    process's ProcessField list, instead of joining process_processfield and
+    comparing names on every row. Tasks holding none of the selected fields
+    are left out, as with the inner joins the reports used before.
+
+    `columns` maps an output alias to a ProcessField name, or to a
+    (name, cast) tuple where cast is one of CASTS:
+
+        ProcessPivot('DM', {
+            'factory_code': 'Name of customer',
+            'actual_date': ('Actual date', 'date'),
+        })
+    """
+
+    # Values that do not convert become NULL. The pivot_safe_* functions
+    # (migration task 0023) check the value before converting it, including
+    # ones that look right but are not, such as 2025-02-30 or 25:00.
+    CASTS = {
+        'date': 'pivot_safe_date(LEFT({value}, 10))',
+        'time': 'pivot_safe_time({value})',
+        'integer': 'pivot_safe_integer({value})',
+        'numeric': "CASE WHEN {value} ~ '^\\s*-?\\d+(\\.\\d+)?\\s*$' THEN {value}::numeric END",
+    }
+
+    def __init__(self, prefix, columns):
+        self.prefix = prefix
+        self.columns = {
+            alias: spec if isinstance(spec, tuple) else (spec, None)
+            for alias, spec in columns.items()
+        }
+        for alias, (name, cast) in self.columns.items():
+            if cast is not None and cast not in self.CASTS:
+                raise ValueError(f"Unsupported cast '{cast}' for pivot column '{alias}'")
+
+    def check_aliases(self, only, extra=()):
+        """
+        Raise ValidationError for requested aliases that are neither pivot
+        columns nor one of the report's `extra` columns
+        """
+        available = [*self.columns, *extra]
+        unknown = set(only or ()) - set(available)
+        if unknown:
+            raise ValidationError({'fields': [
+                f"Unknown fields: {', '.join(sorted(unknown))}. Available: {', '.join(available)}."
+            ]})
+
+    def aliases(self, only=None):
+        """Pivot aliases to project, keeping declaration order"""
+        if not only:
+            return list(self.columns)
+        return [alias for alias in self.columns if alias in only]
+
+    def sql(self, only=None, where='', param_prefix='pivot'):
+        """
+        Return (sql, params) selecting `task_id` plus the requested aliases.
+
+        Args:
+            only: Iterable of aliases to project; all columns when empty
+            where: Extra SQL conditions on `tt` (task_task), e.g. "AND tt.created_at >= %(start)s";
+                   its named params are supplied by the caller
+            param_prefix: Prefix for the generated named params
+        """
+        aliases = self.aliases(only)
+        field_ids, process_ids = self._resolve_fields({self.columns[alias][0] for alias in aliases})
+
+        params = {
+            f'{param_prefix}_process_ids': process_ids,
+            f'{param_prefix}_field_ids': [field_id for ids in field_ids.values() for field_id in ids],
+        }
+
+        pivot_columns = []
+        cast_columns = []
+        for alias in aliases:
+            name, cast = self.columns[alias]
+            param = f'{param_prefix}_{alias}'
+            params[param] = field_ids.get(name, [])
+            pivot_columns.append(
+                f"MAX(ttd.value) FILTER (WHERE ttd.field_id = ANY(%({param})s::uuid[])) AS {alias}"
+            )
+            cast_columns.append(f"{self._cast(alias, cast)} AS {alias}")
+
+        pivot_select = ''.join(f",\n                    {column}" for column in pivot_columns)
+        cast_select = ''.join(f",\n                {column}" for column in cast_columns)
+
+        sql = f"""
+            SELECT task_id{cast_select}
+            FROM (
+                SELECT tt.id AS task_id{pivot_select}
+                FROM task_task tt
+                    JOIN task_taskdata ttd ON tt.id = ttd.task_id
+                        AND ttd.field_id = ANY(%({param_prefix}_field_ids)s::uuid[])
+                WHERE tt.process_id = ANY(%({param_prefix}_process_ids)s::uuid[])
+                    {where}
+                GROUP BY tt.id
+            ) pivot
+        """
+        return sql, params
+
+    def _cast(self, alias, cast):
+        if cast is None:
+            return alias
+        return self.CASTS[cast].format(value=alias)
+
+    def _resolve_fields(self, names):
+        """Map field name -> [field ids] across all processes with this prefix"""
+        field_ids = {}
+        process_ids = set()
+
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT ppf.name, ppf.id::text, ppf.process_id::text
+                FROM process_processfield ppf
+                    JOIN process_process pp ON ppf.process_id = pp.id
+                WHERE pp.prefix = %s AND ppf.name = ANY(%s)
+            """, [self.prefix, list(names)])
+
+            for name, field_id, process_id in cursor.fetchall():
+                field_ids.setdefault(name, []).append(field_id)
+                process_ids.add(process_id)
+
+        return field_ids, list(process_ids)
+
+
+def parse_fields_param(request, pivot, extra=()):
+    """
+    Read the optional `fields` query param (comma separated aliases of the
+    pivot, or of `extra` columns the report adds); unknown aliases are
+    rejected with a 400.
+    """
+    fields = request.query_params.get('fields')
+    if not fields:
+        return None
+    only = {field.strip() for field in fields.split(',') if field.strip()}
+    pivot.check_aliases(only, extra)
+    return only
@@ -0,0 +1,131 @@
+from django.db import connection
+from . import counters
+from .models import Task, TaskPromotedValue
+
+
+def sync_promoted_values(task_data_list):
+    """
+    Upsert TaskPromotedValue rows for TaskData whose field has a promoted_key.
+    Expects `field` to be loaded on each TaskData to avoid extra queries.
+    """
+    promoted = [
+        TaskPromotedValue(
+            task_id=task_data.task_id,
+            key=task_data.field.promoted_key,
+            value=task_data.value[:255] if task_data.value else task_data.value
+        )
+        for task_data in task_data_list
+        if task_data.field.promoted_key
+    ]
+    if not promoted:
+        return
+
+    TaskPromotedValue.objects.bulk_create(
+        promoted,
+        update_conflicts=True,
+        unique_fields=['task', 'key'],
+        update_fields=['value']
+    )
+
+
+def refresh_task_snapshots(task_ids):
+    """Rebuild TaskSnapshot rows for the given tasks in a single upsert"""
+    task_ids = [str(task_id) for task_id in task_ids]
+    if not task_ids:
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO task_tasksnapshot (task_id, process_id, data, updated_at)
+            SELECT
+                tt.id,
+                tt.process_id,
+                COALESCE(
+                    jsonb_object_agg(ppf.name, ttd.value) FILTER (WHERE ppf.id IS NOT NULL),
+                    '{}'::jsonb
+                ),
+                NOW()
+            FROM task_task tt
+                LEFT JOIN task_taskdata ttd ON tt.id = ttd.task_id
+                LEFT JOIN process_processfield ppf ON ttd.field_id = ppf.id
+            WHERE tt.id = ANY(%s::uuid[])
+            GROUP BY tt.id, tt.process_id
+            ON CONFLICT (task_id) DO UPDATE
+                SET data = EXCLUDED.data, updated_at = EXCLUDED.updated_at
+        """, [task_ids])
+
+
+def set_snapshot_value(task_data):
+    """Write one TaskData value into its task's snapshot without re-aggregating the rest"""
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO task_tasksnapshot (task_id, process_id, data, updated_at)
+            SELECT tt.id, tt.process_id, jsonb_build_object(ppf.name, %(value)s::text), NOW()
+            FROM task_task tt, process_processfield ppf
+            WHERE tt.id = %(task_id)s AND ppf.id = %(field_id)s
+            ON CONFLICT (task_id) DO UPDATE
+                SET data = task_tasksnapshot.data || EXCLUDED.data, updated_at = EXCLUDED.updated_at
+        """, {'task_id': task_data.task_id, 'field_id': task_data.field_id, 'value': task_data.value})
+
+
+def remove_snapshot_value(task_data):
+    """Drop a deleted TaskData value from its task's snapshot and promoted values"""
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            UPDATE task_tasksnapshot ts
+            SET data = ts.data - ppf.name, updated_at = NOW()
+            FROM process_processfield ppf
+            WHERE ts.task_id = %(task_id)s AND ppf.id = %(field_id)s
+        """, {'task_id': task_data.task_id, 'field_id': task_data.field_id})
+        cursor.execute("""
+            DELETE FROM task_taskpromotedvalue tpv
+            USING process_processfield ppf
+            WHERE tpv.task_id = %(task_id)s AND ppf.id = %(field_id)s AND tpv.key = ppf.promoted_key
+        """, {'task_id': task_data.task_id, 'field_id': task_data.field_id})
+
+
+def refresh_task_inbox(task_ids):
+    """
+    Rebuild TaskInboxEntry rows for the given tasks from their permissions and
+    current state. Call after a task is created, transitions, or has its
+    permissions recomputed. Users whose inbox gained or lost a task have
+    their received counters adjusted.
+    """
+    task_ids = [str(task_id) for task_id in task_ids]
+    if not task_ids:
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "DELETE FROM task_taskinboxentry WHERE task_id = ANY(%s::uuid[]) RETURNING user_id, task_id",
+            [task_ids]
+        )
+        before = set(cursor.fetchall())
+        cursor.execute("""
+            INSERT INTO task_taskinboxentry (user_id, task_id, action_id, state_entered_at)
+            SELECT DISTINCT ON (tp.user_id, tp.task_id, tp.action_id)
+                tp.user_id,
+                tp.task_id,
+                tp.action_id,
+                COALESCE(
+                    (SELECT MAX(ttal.created_at) FROM task_taskactionlog ttal WHERE ttal.task_id = tt.id),
+                    tt.created_at
+                )
+            FROM task_task tt
+                JOIN task_taskpermission tp ON tp.task_id = tt.id
+                JOIN process_action pa ON tp.action_id = pa.id AND pa.process_id = tt.process_id
+                JOIN workflow_engine_actiontransition wat ON wat.action_id = tp.action_id
+                JOIN workflow_engine_transition wt ON wat.transition_id = wt.id
+                    AND wt.current_state_id = tt.state_id
+            WHERE tt.id = ANY(%s::uuid[])
+            ORDER BY tp.user_id, tp.task_id, tp.action_id, tp.id
+            RETURNING user_id, task_id
+        """, [task_ids])
+        after = set(cursor.fetchall())
+
+    removed, added = before - after, after - before
+    if removed or added:
+        prefixes = dict(Task.objects.filter(
+            id__in={task_id for user_id, task_id in removed | added}
+        ).values_list('id', 'process__prefix'))
+        counters.record_inbox_changes(removed, added, prefixes)
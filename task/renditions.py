@@ -0,0 +1,53 @@
+from io import BytesIO
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# Rendition name -> bounding box; each becomes a FileField on FileBlob
+RENDITIONS = {
+    'thumbnail': (320, 320),
+    'preview': (1280, 1280),
+}
+RENDITION_QUALITY = 80
+
+
+def needs_renditions(blob):
+    return blob.mime_type.startswith('image/') and any(
+        not getattr(blob, name) for name in RENDITIONS
+    )
+
+
+def generate_renditions(blob):
+    """
+    Write bounded-size JPEG renditions of an image blob. They are keyed by
+    the content hash, so every attachment sharing the blob shares them too.
+    Returns False when Pillow cannot decode the image (e.g. HEIC).
+    """
+    try:
+        with blob.file.open('rb') as source:
+            image = Image.open(source)
+            # Let the JPEG decoder downscale while reading instead of decoding full size
+            image.draft('RGB', max(RENDITIONS.values()))
+            image = ImageOps.exif_transpose(image).convert('RGB')
+    except (UnidentifiedImageError, OSError):
+        return False
+
+    update_fields = []
+    for name, size in RENDITIONS.items():
+        if getattr(blob, name):
+            continue
+
+        rendition = image.copy()
+        rendition.thumbnail(size, Image.Resampling.LANCZOS)
+        buffer = BytesIO()
+        rendition.save(buffer, 'JPEG', quality=RENDITION_QUALITY, optimize=True)
+
+        getattr(blob, name).save(
+            f"{blob.sha256[:2]}/{blob.sha256}_{name}.jpg",
+            ContentFile(buffer.getvalue()),
+            save=False
+        )
+        update_fields.append(name)
+
+    if update_fields:
+        blob.save(update_fields=update_fields)
+    return True
@@ -0,0 +1,109 @@
+import hashlib
+import json
+import logging
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import get_language
+from redis.exceptions import RedisError
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'report_data_version:{scope}'
+ENTRY_KEY = 'report:{name}:{language}:{versions}:{params}'
+LOCK_KEY = 'report_lock:{entry}'
+LOCK_POLL_INTERVAL = 0.05
+
+# Data scopes that are not process prefixes
+USER_FACTORY_ONSITE = 'user_factory_onsite'
+
+
+def _version(scope):
+    key = VERSION_KEY.format(scope=scope)
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock so entries cached under a lost counter are never reused
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_data_version(scopes):
+    """Invalidate every cached report reading the given scopes"""
+    for scope in set(scopes):
+        if not scope:
+            continue
+        key = VERSION_KEY.format(scope=scope)
+        try:
+            if not cache.add(key, int(time.time() * 1000), None):
+                try:
+                    cache.incr(key)
+                except ValueError:
+                    # Evicted between add and incr
+                    cache.set(key, int(time.time() * 1000), None)
+        except RedisError as e:
+            # Entries of the scope go stale until REPORT_CACHE_TIMEOUT instead of failing the write
+            logger.warning(f"Report cache: version bump failed for {scope} - {str(e)}")
+
+
+def bump_on_commit(scopes):
+    scopes = set(scopes)
+    transaction.on_commit(lambda: bump_data_version(scopes))
+
+
+def bump_for_tasks(task_ids):
+    """Invalidate reports over the processes of the given tasks, after commit"""
+    prefixes = Task.objects.filter(id__in=task_ids).values_list('process__prefix', flat=True).distinct()
+    bump_on_commit(prefixes)
+
+
+def cached_report(name, params, scopes, compute):
+    """
+    Result of `compute()` for a raw-SQL report, cached per (report, params,
+    language) until one of the data `scopes` changes or REPORT_CACHE_TIMEOUT
+    passes.
+
+    `params` must hold the effective parameters, defaults included. On a miss
+    only one caller computes; concurrent callers wait up to
+    REPORT_CACHE_LOCK_WAIT seconds for its result before computing themselves.
+    Without Redis every call computes.
+    """
+    try:
+        versions = '.'.join(str(_version(scope)) for scope in scopes)
+        digest = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+        key = ENTRY_KEY.format(name=name, language=get_language(), versions=versions, params=digest)
+
+        result = cache.get(key)
+        if result is not None:
+            return result
+
+        lock_key = LOCK_KEY.format(entry=key)
+        locked = cache.add(lock_key, 1, settings.REPORT_CACHE_LOCK_WAIT * 2)
+        if not locked:
+            deadline = time.monotonic() + settings.REPORT_CACHE_LOCK_WAIT
+            while time.monotonic() < deadline:
+                time.sleep(LOCK_POLL_INTERVAL)
+                result = cache.get(key)
+                if result is not None:
+                    return result
+    except RedisError as e:
+        logger.warning(f"Report cache unavailable, computing {name} directly - {str(e)}")
+        return compute()
+
+    if not locked:
+        return compute()
+
+    try:
+        result = compute()
+        cache.set(key, result, settings.REPORT_CACHE_TIMEOUT)
+    except RedisError as e:
+        logger.warning(f"Report cache: storing {name} failed - {str(e)}")
+    finally:
+        try:
+            cache.delete(lock_key)
+        except RedisError:
+            # Expires after REPORT_CACHE_LOCK_WAIT * 2
+            pass
+    return result
@@ -1,19 +1,33 @@
 from django.db import transaction
 from django.conf import settings
 from rest_framework import serializers
-from .models import Task, TaskData, TaskActionLog, generate_task_title, TaskFileData, TaskPermission, TaskDataHistory
-from process.models import ProcessField, Action, FieldType
+from .models import (Task, TaskData, TaskActionLog, allocate_task_titles, generate_task_title, TaskFileData,
+                     TaskPermission, TaskDataHistory, UploadSession, NotificationPreference)
+from process.models import Process, ProcessField, Action, FieldType
 from process.serializers import ProcessFieldSerializer, ProcessSerializer, ActionSerializer
-from workflow_engine.models import State, Transition
+from workflow_engine.graph import WorkflowGraph
+from workflow_engine.models import State
 from workflow_engine.serializers import StateSerializer
+from . import counters, outbox, report_cache
 from .permission_service import PermissionService
+from .projections import sync_promoted_values, refresh_task_snapshots, refresh_task_inbox
+from .blobs import blob_atomic
+from .uploads import validate_upload
 from user.serializers import UserSerializer
 from user.models import User
 from drf_spectacular.utils import extend_schema_field
 from core.utils import FileValidator
 import json
+import mimetypes
 from datetime import datetime
-from .tasks import send_task_notification
+
+
+def get_promoted_value(task, key):
+    """Read a promoted field value, using prefetched promoted_values when available"""
+    for promoted in task.promoted_values.all():
+        if promoted.key == key:
+            return promoted.value
+    return None
 
 
 class SentTaskSerializer(serializers.ModelSerializer):
@@ -31,39 +45,19 @@ class Meta:
 
     def get_recipient(self, obj) -> str | None:
         """
-        Single query optimization - get all permissions for this task at once.
+        Recipients are resolved for the whole page by the view and passed in
+        through context; fall back to a per-task lookup otherwise.
         """
-        # Get possible actions and their permissions in one query
-        permissions = TaskPermission.objects.filter(
-            task=obj,
-            action__actiontransition__transition__current_state=obj.state,
-            action__process=obj.process
-        ).select_related('user', 'action').distinct()
-        
-        # Return first available user
-        if permissions:
-            return permissions[0].user.username
-        return None
+        recipients = self.context.get('recipients')
+        if recipients is None:
+            recipients = PermissionService.get_recipients_for_tasks([obj])
+        return recipients.get(obj.id)
 
     def get_finishing_code(self, obj) -> str | None:
-        """Get finishing code for SP tasks only."""
-        if not obj.title.startswith('SP'):
-            return None
-        try:
-            task_data = obj.data.select_related('field').get(field__name='Finishing code')
-            return task_data.value
-        except:
-            return None
+        return get_promoted_value(obj, 'finishing_code')
 
     def get_customer_color_name(self, obj) -> str | None:
-        """Get customer color name for SP tasks only."""
-        if not obj.title.startswith('SP'):
-            return None
-        try:
-            task_data = obj.data.select_related('field').get(field__name="Customer's color name")
-            return task_data.value
-        except:
-            return None
+        return get_promoted_value(obj, 'customer_color_name')
 
 
 class ReceivedTaskSerializer(serializers.ModelSerializer):
@@ -82,50 +76,43 @@ class Meta:
 
     def get_action(self, obj) -> str | None:
         """
-        Single query optimization for current user's permissions.
+        Actions are resolved for the whole page by the view and passed in
+        through context; fall back to a per-task lookup otherwise.
         """
-        user = self.context['request'].user
-        
-        # Get user's permissions for current state actions in one query
-        permission = TaskPermission.objects.filter(
-            task=obj,
-            user=user,
-            action__actiontransition__transition__current_state=obj.state,
-            action__process=obj.process
-        ).select_related('action').first()
-        
-        return permission.action.name if permission else None
+        actions = self.context.get('actions')
+        if actions is None:
+            actions = PermissionService.get_actions_for_tasks(self.context['request'].user, [obj])
+        return actions.get(obj.id)
     
     def get_finishing_code(self, obj) -> str | None:
-        """Get finishing code for SP tasks only."""
-        if not obj.title.startswith('SP'):
-            return None
-        try:
-            task_data = obj.data.select_related('field').get(field__name='Finishing code')
-            return task_data.value
-        except:
-            return None
+        return get_promoted_value(obj, 'finishing_code')
 
     def get_customer_color_name(self, obj) -> str | None:
-        """Get customer color name for SP tasks only."""
-        if not obj.title.startswith('SP'):
-            return None
-        try:
-            task_data = obj.data.select_related('field').get(field__name="Customer's color name")
-            return task_data.value
-        except:
-            return None
+        return get_promoted_value(obj, 'customer_color_name')
      
         
 class TaskDataInputSerializer(serializers.Serializer):
     field_id = serializers.UUIDField()
     value = serializers.CharField(required=False, allow_blank=True, allow_null=True)
     files = serializers.ListField(
-        child=serializers.FileField(),
+        child=serializers.FileField(validators=[FileValidator()]),
         required=False,
         allow_empty=True
     )
 
+
+def get_start_state(process):
+    """State new tasks of the process start in"""
+    start_state = State.objects.filter(
+        state_type='start',
+        transitions_from__process=process
+    ).distinct().first()
+
+    if not start_state:
+        start_state = State.objects.get(state_type='static')
+    return start_state
+
+
 class TaskCreateSerializer(serializers.ModelSerializer):
     fields = TaskDataInputSerializer(many=True, write_only=True)
 
@@ -192,50 +179,159 @@ def create(self, validated_data):
         process = validated_data['process']
         field_data_list = validated_data.pop('fields')
 
-        start_state = State.objects.filter(
-            state_type='start',
-            transitions_from__process=process
-        ).distinct().first()
+        start_state = get_start_state(process)
 
-        if not start_state:
-            start_state = State.objects.get(state_type='static')
+        # Validate every submitted field against the process's fields in memory
+        process_fields = {field.id: field for field in ProcessField.objects.filter(process=process)}
+        for field_data in field_data_list:
+            field_id = field_data.get('field_id')
+            if field_id not in process_fields:
+                raise serializers.ValidationError(
+                    {"non_field_errors": [f"Field ID {field_id} is invalid for this process."]}
+                )
+            if field_data.get('files') and process_fields[field_id].field_type not in [FieldType.FILE, FieldType.MULTIFILE]:
+                raise serializers.ValidationError(
+                    {"non_field_errors": [f"Field ID {field_id} does not accept files."]}
+                )
 
-        with transaction.atomic():
+        # Allocated before the transaction so the counter row is not locked for its duration
+        title = generate_task_title(process)
+
+        with blob_atomic():
             task = Task.objects.create(
                 process=process,
                 created_by=user,
                 state=start_state,
-                title=generate_task_title(process)
+                title=title
             )
 
-            for field_data in field_data_list:
-                field_id = field_data.get('field_id')
-                try:
-                    field_obj = ProcessField.objects.get(id=field_id, process=process)
-                except ProcessField.DoesNotExist:
-                    raise serializers.ValidationError(
-                        {"non_field_errors": [f"Field ID {field_id} is invalid for this process."]}
-                    )
-
-                field_value = field_data.get('value')
-                
-                TaskData.objects.create(
+            task_data = TaskData.objects.bulk_create([
+                TaskData(
                     task=task,
-                    field=field_obj,
-                    value=field_value
+                    field=process_fields[field_data['field_id']],
+                    value=field_data.get('value')
                 )
+                for field_data in field_data_list
+            ])
+
+            # Attached files are written to storage as their rows are inserted
+            task_data_by_field = {data.field_id: data for data in task_data}
+            task_files = [
+                TaskFileData.from_upload(task_data_by_field[field_data['field_id']], file)
+                for field_data in field_data_list
+                for file in field_data.get('files') or []
+            ]
+            if task_files:
+                TaskFileData.objects.bulk_create(task_files)
+
+            # bulk_create does not send post_save, refresh the projections here
+            sync_promoted_values(task_data)
+            refresh_task_snapshots([task.id])
             
             PermissionService.create_task_permissions(task)
+            counters.record_tasks_created([task])
 
-            send_task_notification.delay_on_commit(
-                task_id=str(task.id),
-                state_id=str(start_state.id),
-                exclude_user_id=user.id
-            )
+            outbox.publish(outbox.TASK_CREATED, task_ids=[str(task.id)], user_id=str(user.id))
             
         return task
 
 
+class TaskBulkItemSerializer(serializers.Serializer):
+    fields = TaskDataInputSerializer(many=True, allow_empty=False)
+
+
+class TaskBulkCreateSerializer(serializers.Serializer):
+    """
+    Create many tasks of one process in a single transaction.
+
+    Items are validated one by one; invalid items are reported and skipped
+    while the valid ones are created. `save()` returns a result per item.
+    """
+    process = serializers.PrimaryKeyRelatedField(queryset=Process.objects.all())
+    tasks = serializers.ListField(child=serializers.DictField(), allow_empty=False, max_length=200)
+
+    def validate_process(self, process):
+        if not process.is_active:
+            raise serializers.ValidationError("This process is inactive.")
+        return process
+
+    def create(self, validated_data):
+        user = self.context['request'].user
+        process = validated_data['process']
+        process_fields = {field.id: field for field in ProcessField.objects.filter(process=process)}
+
+        results = []
+        valid_items = []
+        for index, item in enumerate(validated_data['tasks']):
+            item_serializer = TaskBulkItemSerializer(data=item)
+            if not item_serializer.is_valid():
+                results.append({'index': index, 'success': False, 'errors': item_serializer.errors})
+                continue
+
+            field_data_list = item_serializer.validated_data['fields']
+            invalid = [
+                f"Field ID {field_data['field_id']} is invalid for this process."
+                for field_data in field_data_list
+                if field_data['field_id'] not in process_fields
+            ]
+            if invalid:
+                results.append({'index': index, 'success': False, 'errors': {'non_field_errors': invalid}})
+                continue
+
+            valid_items.append((index, field_data_list))
+
+        if valid_items:
+            start_state = get_start_state(process)
+            # Allocated before the transaction so the counter row is not locked for its duration
+            titles = allocate_task_titles(process, len(valid_items))
+
+            with transaction.atomic():
+                tasks = Task.objects.bulk_create([
+                    Task(process=process, created_by=user, state=start_state, title=title)
+                    for title in titles
+                ])
+
+                task_data = TaskData.objects.bulk_create([
+                    TaskData(
+                        task=task,
+                        field=process_fields[field_data['field_id']],
+                        value=field_data.get('value')
+                    )
+                    for task, (index, field_data_list) in zip(tasks, valid_items)
+                    for field_data in field_data_list
+                ])
+
+                # bulk_create does not send post_save, refresh the projections here
+                sync_promoted_values(task_data)
+                refresh_task_snapshots([task.id for task in tasks])
+
+                PermissionService.create_permissions_for_tasks(tasks)
+                counters.record_tasks_created(tasks)
+                # bulk_create does not send post_save, invalidate cached reports here
+                report_cache.bump_on_commit([process.prefix])
+
+                outbox.publish(
+                    outbox.TASK_CREATED,
+                    task_ids=[str(task.id) for task in tasks],
+                    user_id=str(user.id)
+                )
+
+            results.extend(
+                {'index': index, 'success': True, 'id': task.id, 'title': task.title}
+                for task, (index, field_data_list) in zip(tasks, valid_items)
+            )
+
+        return sorted(results, key=lambda result: result['index'])
+
+
+class TaskBulkResultSerializer(serializers.Serializer):
+    index = serializers.IntegerField()
+    success = serializers.BooleanField()
+    id = serializers.UUIDField(required=False)
+    title = serializers.CharField(required=False)
+    errors = serializers.DictField(required=False)
+
+
 class TaskActionSerializer(serializers.Serializer):
     action_id = serializers.UUIDField()
     comment = serializers.CharField(required=False, allow_blank=True, allow_null=True)
@@ -255,71 +351,164 @@ def validate(self, attrs):
         if not PermissionService.user_can_perform_action(user, task, action):
             raise serializers.ValidationError({"non_field_errors": ["You do not have permission to perform this action."]})
         
-        try:
-            transition = Transition.objects.get(
-                process=task.process,
-                current_state=task.state,
-                actiontransition__action=action
-            )
-        except Transition.DoesNotExist:
+        transition = WorkflowGraph.for_process(task.process_id).next_transition(task.state_id, action.id)
+        if transition is None:
             raise serializers.ValidationError({"non_field_errors": ["No valid transition from current state for this action."]})
         
         attrs['action'] = action
-        attrs['transition'] = transition
+        attrs['next_state_id'] = transition[1]
         return attrs
     
     def save(self, **kwargs):
         task = self.context['task']
         user = self.context['request'].user
         action = self.validated_data['action']
-        transition = self.validated_data['transition']
+        next_state_id = self.validated_data['next_state_id']
         comment = self.validated_data.get('comment', '')
         file = self.validated_data.get('file')
         
-        # Perform state transition
-        task.state = transition.next_state
-        task.save()
-        
-        # Log action
-        TaskActionLog.objects.create(
-            task=task,
-            user=user,
-            action=action,
-            comment=comment,
-            file=file
-        )
-        
-        # Send notification
-        send_task_notification.delay_on_commit(
-            task_id=str(task.id),
-            state_id=str(transition.next_state.id),
-            exclude_user_id=user.id
-        )
+        with blob_atomic():
+            # Perform state transition
+            previous_state_id = task.state_id
+            task.state_id = next_state_id
+            task.save()
+
+            # Log action
+            action_log = TaskActionLog(task=task, user=user, action=action, comment=comment)
+            if file:
+                action_log.attach_file(file)
+            action_log.save()
+            refresh_task_inbox([task.pk])
+            counters.record_tasks_transitioned([(task, previous_state_id)])
+
+            # Notification goes out through the outbox relay
+            outbox.publish(outbox.TASK_TRANSITIONED, task_ids=[str(task.id)], user_id=str(user.id))
         
         return task
 
 
+class TaskBulkActionItemSerializer(serializers.Serializer):
+    task_id = serializers.UUIDField()
+    action_id = serializers.UUIDField()
+    comment = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+
+class TaskBulkActionSerializer(serializers.Serializer):
+    """
+    Perform actions on many tasks in one transaction.
+
+    Permissions and transitions are checked for the whole batch with a few
+    set-based queries; items failing a check are reported and skipped.
+    `save()` returns a result per item.
+    """
+    items = TaskBulkActionItemSerializer(many=True, allow_empty=False, max_length=200)
+
+    def create(self, validated_data):
+        user = self.context['request'].user
+        items = validated_data['items']
+        task_ids = {item['task_id'] for item in items}
+        action_ids = {item['action_id'] for item in items}
+
+        results = []
+        applied = []
+        transitions = []
+        with transaction.atomic():
+            # Lock the tasks so their state cannot move between the check and the update
+            tasks = Task.objects.select_for_update().in_bulk(task_ids)
+            actions = Action.objects.in_bulk(action_ids)
+            permitted = set(TaskPermission.objects.filter(
+                task_id__in=task_ids, user=user, action_id__in=action_ids
+            ).values_list('task_id', 'action_id'))
+
+            seen = set()
+            for index, item in enumerate(items):
+                error = None
+                task = tasks.get(item['task_id'])
+                action = actions.get(item['action_id'])
+
+                if task is None:
+                    error = "Task not found."
+                elif task.pk in seen:
+                    error = "Only one action per task is allowed in a batch."
+                elif action is None or action.process_id != task.process_id:
+                    error = "Invalid action for this process."
+                elif (task.pk, action.pk) not in permitted:
+                    error = "You do not have permission to perform this action."
+                else:
+                    transition = WorkflowGraph.for_process(task.process_id).next_transition(task.state_id, action.pk)
+                    if transition is None:
+                        error = "No valid transition from current state for this action."
+
+                if error:
+                    results.append({'index': index, 'success': False, 'errors': {'non_field_errors': [error]}})
+                    continue
+
+                seen.add(task.pk)
+                transitions.append((task, task.state_id))
+                task.state_id = transition[1]
+                applied.append((index, task, action, item.get('comment') or ''))
+
+            if applied:
+                Task.objects.bulk_update([task for index, task, action, comment in applied], ['state'])
+                TaskActionLog.objects.bulk_create([
+                    TaskActionLog(task=task, user=user, action=action, comment=comment)
+                    for index, task, action, comment in applied
+                ])
+                refresh_task_inbox([task.pk for index, task, action, comment in applied])
+                counters.record_tasks_transitioned(transitions)
+                report_cache.bump_for_tasks([task.pk for index, task, action, comment in applied])
+
+                # One message per recipient for the whole batch
+                outbox.publish(
+                    outbox.TASK_TRANSITIONED,
+                    task_ids=[str(task.pk) for index, task, action, comment in applied],
+                    user_id=str(user.id)
+                )
+
+        results.extend(
+            {'index': index, 'success': True, 'id': task.pk, 'title': task.title}
+            for index, task, action, comment in applied
+        )
+        return sorted(results, key=lambda result: result['index'])
+
+
+def build_file_url(file, context):
+    """Absolute URL of a stored file, or None when the field is empty"""
+    if not file:
+        return None
+
+    # Use the configured domain URL instead of request-based URL
+    domain = getattr(settings, 'DOMAIN_URL', '')
+    if domain:
+        return f"{domain}{file.url}"
+
+    # Fallback to request-based URL
+    request = context.get('request')
+    if request:
+        return request.build_absolute_uri(file.url)
+
+    # Last fallback - relative URL
+    return file.url
+
+
 class TaskFileDataSerializer(serializers.ModelSerializer):
     uploaded_file = serializers.SerializerMethodField()
+    thumbnail = serializers.SerializerMethodField()
+    preview = serializers.SerializerMethodField()
+
     class Meta:
         model = TaskFileData
-        fields = ['original_filename', 'uploaded_file', 'uploaded_at']
+        fields = ['original_filename', 'uploaded_file', 'thumbnail', 'preview', 'uploaded_at']
     
-    def get_uploaded_file(self, obj):
-        if obj.uploaded_file:
-            # Use the configured domain URL instead of request-based URL
-            domain = getattr(settings, 'DOMAIN_URL', '')
-            if domain:
-                return f"{domain}{obj.uploaded_file.url}"
-            
-            # Fallback to request-based URL
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.uploaded_file.url)
-            
-            # Last fallback - relative URL
-            return obj.uploaded_file.url
-        return None
+    def get_uploaded_file(self, obj) -> str | None:
+        return build_file_url(obj.uploaded_file, self.context)
+
+    def get_thumbnail(self, obj) -> str | None:
+        return build_file_url(obj.blob.thumbnail, self.context) if obj.blob_id else None
+
+    def get_preview(self, obj) -> str | None:
+        return build_file_url(obj.blob.preview, self.context) if obj.blob_id else None
+
 
 class TaskDataHistorySerializer(serializers.ModelSerializer):
     updated_by = serializers.StringRelatedField()
@@ -367,28 +556,23 @@ def to_representation(self, instance):
     def update(self, instance, validated_data):
         files_upload = validated_data.pop('files_upload', None)
         
-        # Update with history tracking
-        new_value = validated_data.get('value')
-        if new_value is not None:
-            instance.save_with_history(
-                user=self.context.get('request').user, 
-                new_value=new_value
-            )
-        else:
-            for attr, value in validated_data.items():
-                setattr(instance, attr, value)
-            instance.save()
-        
-        if instance.field.field_type in [FieldType.FILE, FieldType.MULTIFILE] and files_upload:
-            
-            for file in files_upload:
-                TaskFileData.objects.create(
-                    task_data=instance,
-                    uploaded_file=file,
-                    original_filename=file.name or 'unknown',
-                    file_size=file.size or 0,
-                    mime_type=getattr(file, 'content_type', '') or 'application/octet-stream'
+        with blob_atomic():
+            # Update with history tracking
+            new_value = validated_data.get('value')
+            if new_value is not None:
+                instance.save_with_history(
+                    user=self.context.get('request').user, 
+                    new_value=new_value
                 )
+            else:
+                for attr, value in validated_data.items():
+                    setattr(instance, attr, value)
+                instance.save()
+            
+            if instance.field.field_type in [FieldType.FILE, FieldType.MULTIFILE] and files_upload:
+                TaskFileData.objects.bulk_create([
+                    TaskFileData.from_upload(instance, file) for file in files_upload
+                ])
         
         return instance
 
@@ -397,26 +581,21 @@ class TaskActionLogSerializer(serializers.ModelSerializer):
     user = UserSerializer()
     action = ActionSerializer()
     file = serializers.SerializerMethodField()
+    file_thumbnail = serializers.SerializerMethodField()
+    file_preview = serializers.SerializerMethodField()
 
     class Meta:
         model = TaskActionLog
-        fields = ['id', 'user', 'action', 'created_at', 'comment', 'file']
-
-    def get_file(self, obj):
-        if obj.file:
-            # Use the configured domain URL instead of request-based URL
-            domain = getattr(settings, 'DOMAIN_URL', '')
-            if domain:
-                return f"{domain}{obj.file.url}"
-            
-            # Fallback to request-based URL
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.file.url)
-            
-            # Last fallback - relative URL
-            return obj.file.url
-        return None
+        fields = ['id', 'user', 'action', 'created_at', 'comment', 'file', 'file_thumbnail', 'file_preview']
+
+    def get_file(self, obj) -> str | None:
+        return build_file_url(obj.file, self.context)
+
+    def get_file_thumbnail(self, obj) -> str | None:
+        return build_file_url(obj.blob.thumbnail, self.context) if obj.blob_id else None
+
+    def get_file_preview(self, obj) -> str | None:
+        return build_file_url(obj.blob.preview, self.context) if obj.blob_id else None
 
 
 class TaskDetailSerializer(serializers.ModelSerializer):
@@ -437,27 +616,8 @@ class Meta:
     @extend_schema_field(ActionSerializer(many=True))
     def get_available_actions(self, obj):
         user = self.context['request'].user
-
-        transitions = Transition.objects.filter(
-            process=obj.process,
-            current_state=obj.state
-        )
-
-        actions = Action.objects.filter(
-            actiontransition__transition__in=transitions
-        ).distinct()
-
-        permitted = []
-        for action in actions:
-            if PermissionService.user_can_perform_action(user, obj, action):
-                permitted.append({
-                    'id': action.id,
-                    'name': action.name,
-                    'description': action.description,
-                    'action_type': action.action_type
-                })
-
-        return permitted
+        actions = PermissionService.get_available_actions(user, obj)
+        return ActionSerializer(actions, many=True).data
 
 
 class TaskDataDetailSerializer(serializers.Serializer):
@@ -601,4 +761,88 @@ class CustomerEntrySerializer(serializers.Serializer):
     license_plate = serializers.CharField()
     drive_name = serializers.CharField()
     scheduled_date = serializers.DateField()
-    scheduled_time = serializers.TimeField()
\ No newline at end of file
+    scheduled_time = serializers.TimeField()
+
+
+class TaskAvailableActionsRequestSerializer(serializers.Serializer):
+    task_ids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False, max_length=500)
+
+
+class TaskAvailableActionsSerializer(serializers.Serializer):
+    task_id = serializers.UUIDField()
+    actions = ActionSerializer(many=True)
+
+
+class NotificationPreferenceSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = NotificationPreference
+        fields = ['digest', 'digest_hour', 'updated_at']
+        read_only_fields = ['updated_at']
+
+
+class TaskCountsSerializer(serializers.Serializer):
+    received = serializers.IntegerField()
+    received_by_process = serializers.DictField(child=serializers.IntegerField())
+    sent = serializers.IntegerField()
+    sent_by_state_type = serializers.DictField(child=serializers.IntegerField())
+    sent_by_process = serializers.DictField(child=serializers.IntegerField())
+    reconciled_at = serializers.DateTimeField(allow_null=True)
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'filename', 'content_type', 'size', 'received', 'status', 'created_at', 'updated_at']
+        read_only_fields = fields
+
+
+class UploadSessionCreateSerializer(serializers.Serializer):
+    """Open a resumable upload for a task file field or an action log"""
+    filename = serializers.CharField(max_length=255)
+    content_type = serializers.CharField(max_length=100, required=False, allow_blank=True)
+    size = serializers.IntegerField(min_value=1)
+    task_id = serializers.UUIDField(required=False)
+    field_id = serializers.UUIDField(required=False)
+    action_log_id = serializers.UUIDField(required=False)
+
+    def validate(self, attrs):
+        user = self.context['request'].user
+        content_type = attrs.get('content_type') or mimetypes.guess_type(attrs['filename'])[0] or ''
+        attrs['content_type'] = content_type
+        validate_upload(attrs['filename'], attrs['size'], content_type)
+
+        if attrs.get('action_log_id'):
+            try:
+                attrs['action_log'] = TaskActionLog.objects.get(id=attrs['action_log_id'], user=user)
+            except TaskActionLog.DoesNotExist:
+                raise serializers.ValidationError({"non_field_errors": ["Action log not found."]})
+            return attrs
+
+        if not (attrs.get('task_id') and attrs.get('field_id')):
+            raise serializers.ValidationError(
+                {"non_field_errors": ["Either task_id and field_id, or action_log_id is required."]}
+            )
+        try:
+            task_data = TaskData.objects.select_related('field').get(
+                task_id=attrs['task_id'], field_id=attrs['field_id']
+            )
+        except TaskData.DoesNotExist:
+            raise serializers.ValidationError({"non_field_errors": ["TaskData not found for this field."]})
+        if task_data.field.field_type not in [FieldType.FILE, FieldType.MULTIFILE]:
+            raise serializers.ValidationError({"non_field_errors": ["This field does not accept files."]})
+
+        attrs['task_data'] = task_data
+        return attrs
+
+    def create(self, validated_data):
+        return UploadSession.objects.create(
+            created_by=self.context['request'].user,
+            task_data=validated_data.get('task_data'),
+            action_log=validated_data.get('action_log'),
+            filename=validated_data['filename'],
+            content_type=validated_data['content_type'],
+            size=validated_data['size']
+        )
+
+    def to_representation(self, instance):
+        return UploadSessionSerializer(instance).data
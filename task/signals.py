@@ -0,0 +1,125 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from process.models import Process, ProcessActionRole
+from user.models import Role, User, UserFactoryOnsite
+from .blobs import release_blob
+from .models import Task, TaskActionLog, TaskData, TaskFileData
+from .permission_sync import DEPARTMENT_HEAD_ROLE, USER_PERMISSION_FIELDS
+from .projections import remove_snapshot_value, set_snapshot_value, sync_promoted_values
+from .report_cache import USER_FACTORY_ONSITE, bump_for_tasks, bump_on_commit
+from .tasks import (recompute_permissions_for_process, recompute_permissions_for_role,
+                    recompute_permissions_for_user)
+
+
+@receiver(post_save, sender=TaskData)
+def sync_task_data_projections(sender, instance, raw=False, **kwargs):
+    """Keep denormalized projections in step with single TaskData writes"""
+    if raw:
+        return
+    sync_promoted_values([instance])
+    set_snapshot_value(instance)
+
+
+@receiver(post_delete, sender=TaskData)
+def remove_task_data_projections(sender, instance, **kwargs):
+    remove_snapshot_value(instance)
+
+
+def _user_permission_values(values):
+    """JSON-safe snapshot of the org-chart fields, used to diff and as task payload"""
+    return {
+        field: value if value is None or isinstance(value, bool) else str(value)
+        for field, value in values.items()
+    }
+
+
+def _touches_permission_fields(update_fields):
+    if update_fields is None:
+        return True
+    # update_fields holds field names (department), not attnames (department_id)
+    return any(field.removesuffix('_id') in update_fields for field in USER_PERMISSION_FIELDS)
+
+
+@receiver(pre_save, sender=User)
+def remember_user_permission_fields(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Keep the stored org-chart fields to diff against after the save"""
+    instance._permission_values = {}
+    if raw or instance._state.adding or not _touches_permission_fields(update_fields):
+        return
+    previous = User.objects.filter(pk=instance.pk).values(*USER_PERMISSION_FIELDS).first()
+    if previous:
+        instance._permission_values = _user_permission_values(previous)
+
+
+@receiver(post_save, sender=User)
+def recompute_permissions_on_user_change(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    if raw or (not created and not _touches_permission_fields(update_fields)):
+        return
+    old = instance._permission_values if not created else {}
+    new = _user_permission_values({field: getattr(instance, field) for field in USER_PERMISSION_FIELDS})
+    if old != new:
+        recompute_permissions_for_user.delay_on_commit(str(instance.pk), old, new)
+
+
+@receiver(pre_save, sender=Role)
+def remember_role_name(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding:
+        instance._previous_names = None
+        return
+    instance._previous_names = Role.objects.filter(pk=instance.pk).values_list('name', 'name_en').first()
+
+
+@receiver(post_save, sender=Role)
+def recompute_permissions_on_role_rename(sender, instance, raw=False, **kwargs):
+    """Department heads are matched on the role name, so a rename can move them"""
+    previous = getattr(instance, '_previous_names', None)
+    if raw or not previous:
+        return
+    current = (instance.name, instance.name_en)
+    if previous != current and DEPARTMENT_HEAD_ROLE in previous + current:
+        recompute_permissions_for_role.delay_on_commit(str(instance.pk))
+
+
+@receiver(post_save, sender=ProcessActionRole)
+@receiver(post_delete, sender=ProcessActionRole)
+def recompute_permissions_on_action_role_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    recompute_permissions_for_process.delay_on_commit(str(instance.process_id))
+
+
+@receiver(post_delete, sender=TaskFileData)
+@receiver(post_delete, sender=TaskActionLog)
+def release_attachment_blob(sender, instance, **kwargs):
+    """Drop the row's reference to its shared content"""
+    if instance.blob_id:
+        release_blob(instance.blob_id)
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def invalidate_reports_on_task_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    bump_on_commit(Process.objects.filter(pk=instance.process_id).values_list('prefix', flat=True))
+
+
+@receiver(post_save, sender=TaskData)
+@receiver(post_delete, sender=TaskData)
+@receiver(post_save, sender=TaskFileData)
+@receiver(post_delete, sender=TaskFileData)
+def invalidate_reports_on_task_data_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    if sender is TaskData:
+        bump_for_tasks([instance.task_id])
+    else:
+        bump_for_tasks(TaskData.objects.filter(pk=instance.task_data_id).values_list('task_id', flat=True))
+
+
+@receiver(post_save, sender=UserFactoryOnsite)
+@receiver(post_delete, sender=UserFactoryOnsite)
+def invalidate_reports_on_onsite_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    bump_on_commit([USER_FACTORY_ONSITE])
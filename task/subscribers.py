@@ -0,0 +1,7 @@
+from .outbox import TASK_CREATED, TASK_TRANSITIONED, subscriber
+from .tasks import queue_task_notifications
+
+
+@subscriber(TASK_CREATED, TASK_TRANSITIONED)
+def notify_task_recipients(payload):
+    queue_task_notifications.delay(task_ids=payload['task_ids'], exclude_user_id=payload['user_id'])
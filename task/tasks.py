@@ -1,9 +1,6 @@
 # tasks.py
 from celery import shared_task
 from django.contrib.auth import get_user_model
-from fcm_django.models import FCMDevice
-from firebase_admin.messaging import Message, Notification
-from firebase_admin.exceptions import FirebaseError
 import logging
 from django.conf import settings
 
@@ -16,68 +13,179 @@ def print_all_permission(task_id, permissions, state):
     print("task_id:", task_id, "permission:", permissions, "state", state)
 
 @shared_task
-def send_task_notification(task_id, state_id, exclude_user_id):
-    """  
+def recompute_task_permissions(task_ids):
+    """Recompute stored TaskPermission rows for a chunk of tasks"""
+    from .permission_service import PermissionService
+
+    deleted, created = PermissionService.recompute_permissions(task_ids)
+    return {'tasks': len(task_ids), 'deleted': deleted, 'created': created}
+
+@shared_task
+def recompute_permissions_for_user(user_id, old, new):
+    """Recompute permissions of open tasks affected by a user's org-chart change"""
+    from .permission_sync import affected_tasks_for_user, recompute_tasks
+
+    totals = recompute_tasks(affected_tasks_for_user(user_id, old, new))
+    logger.info(f"User {user_id} changed: recomputed permissions of {totals['tasks']} tasks")
+    return totals
+
+@shared_task
+def recompute_permissions_for_role(role_id):
+    """Recompute permissions of open tasks affected by a role rename"""
+    from .permission_sync import affected_tasks_for_role, recompute_tasks
+
+    totals = recompute_tasks(affected_tasks_for_role(role_id))
+    logger.info(f"Role {role_id} changed: recomputed permissions of {totals['tasks']} tasks")
+    return totals
+
+@shared_task
+def recompute_permissions_for_process(process_id):
+    """Recompute permissions of open tasks after a ProcessActionRole change"""
+    from .permission_sync import affected_tasks_for_process, recompute_tasks
+
+    totals = recompute_tasks(affected_tasks_for_process(process_id))
+    logger.info(f"Process {process_id} roles changed: recomputed permissions of {totals['tasks']} tasks")
+    return totals
+
+@shared_task
+def queue_task_notifications(task_ids, exclude_user_id):
+    """
+    Buffer a notification about changed tasks for each user who can act on
+    them; see task.coalescing.
+
     Args:
-        task_id: UUID of the task
-        state_id: UUID of the current state
+        task_ids: UUIDs of the tasks that were created or moved
         exclude_user_id: User ID to exclude (creator/performer)
     """
-    try:
-        from .models import Task, State
-        from .permission_service import PermissionService
-        
-        # Get task and state
-        task = Task.objects.get(id=task_id)
-        state = State.objects.get(id=state_id)
-        
-        # Get users who can perform actions (excluding performer)
-        eligible_users = PermissionService.get_users_for_state(task, state)
-        user_ids = [u.id for u in eligible_users if u.id != exclude_user_id]
-        
-        if not user_ids:
-            logger.info(f"Task {task_id}: No users to notify")
-            return {'success': False, 'message': 'No users to notify'}
-        
-        # Get active devices
-        devices = FCMDevice.objects.filter(user_id__in=user_ids, active=True)
-        
-        if not devices.exists():
-            logger.info(f"Task {task_id}: No active devices for {len(user_ids)} users")
-            return {'success': False, 'message': 'No active devices'}
-        
-        # Simple message
-        message = Message(
-            data={
-                'title': "TE-1 Viet Lien",
-                'body': f"{task.title} ({state.name}) cần thực hiện",
-                'task_id': str(task_id),
-                'state_id': str(state_id),
-                'url': f"{settings.DOMAIN_URL}/task-management/tasks/{task_id}" if hasattr(settings, 'DOMAIN_URL') else None,
-            }
-        )
-        
-        # Send and get response
-        response = devices.send_message(message)
-        
-        # Extract success/failure counts
-        success_count = getattr(response, 'success_count', 0)
-        failure_count = getattr(response, 'failure_count', 0)
-        
-        # Log detailed results
-        logger.info(
-            f"Task {task_id}: Notification sent to {len(user_ids)} users, "
-            f"{devices.count()} devices. Success: {success_count}, Failed: {failure_count}"
-        )
-        
-        return {
-            'success': True,
-            'users_count': len(user_ids),
-            'devices_count': devices.count(),
-            'success_count': success_count,
-            'failure_count': failure_count
-        }
-        
-    except Exception as e:
-        logger.error(f"Task {task_id}: Notification error - {str(e)}")
-        return {'success': False, 'error': str(e)}
\ No newline at end of file
+    from .coalescing import buffer_task_events
+
+    recipients = buffer_task_events(task_ids, exclude_user_id)
+    return {'tasks': len(task_ids), 'recipients': recipients}
+
+@shared_task
+def flush_task_notifications(user_id):
+    """Send a user's buffered task notifications as one push"""
+    from .coalescing import flush_buffer
+
+    summary = flush_buffer(user_id)
+    return {'success': summary is not None, **(summary or {})}
+
+@shared_task
+def send_notification_digests():
+    """Flush the buffers of users whose digest is due this hour"""
+    from django.db.models import Q
+    from django.utils.timezone import localtime
+    from .models import NotificationPreference
+
+    Digest = NotificationPreference.Digest
+    user_ids = NotificationPreference.objects.filter(
+        Q(digest=Digest.HOURLY) | Q(digest=Digest.DAILY, digest_hour=localtime().hour)
+    ).values_list('user_id', flat=True)
+
+    count = 0
+    for user_id in user_ids.iterator():
+        flush_task_notifications.delay(str(user_id))
+        count += 1
+
+    logger.info(f"Notification digests: {count} users flushed")
+    return {'users': count}
+
+@shared_task
+def deliver_notification(device_ids, data, attempt):
+    """Retry a message on devices whose previous attempt failed transiently"""
+    from .notifications import NotificationDispatcher
+
+    return NotificationDispatcher().send_to_devices(device_ids, data, attempt)
+
+@shared_task
+def cleanup_notification_deliveries():
+    """Drop NotificationDelivery rows older than NOTIFICATION_DELIVERY_RETENTION"""
+    from datetime import timedelta
+    from django.utils.timezone import now
+    from .models import NotificationDelivery
+
+    deleted = NotificationDelivery.objects.filter(
+        created_at__lt=now() - timedelta(days=settings.NOTIFICATION_DELIVERY_RETENTION)
+    ).delete()[0]
+
+    logger.info(f"Notification cleanup: {deleted} delivery records removed")
+    return {'deleted': deleted}
+
+
+@shared_task
+def cleanup_upload_sessions():
+    """Discard upload sessions, and their partial files, idle for longer than UPLOAD_SESSION_TTL"""
+    from datetime import timedelta
+    from django.utils.timezone import now
+    from .models import UploadSession
+    from .uploads import discard_partial
+
+    cutoff = now() - timedelta(seconds=settings.UPLOAD_SESSION_TTL)
+    pks = []
+    for session in UploadSession.objects.filter(updated_at__lt=cutoff).iterator():
+        discard_partial(session)
+        pks.append(session.pk)
+    # Sessions that received a chunk meanwhile are no longer stale; their
+    # file may have been recreated, keep them for the next run
+    deleted = UploadSession.objects.filter(pk__in=pks, updated_at__lt=cutoff).delete()[0]
+
+    logger.info(f"Upload cleanup: {deleted} stale sessions removed")
+    return {'deleted': deleted}
+
+
+@shared_task
+def generate_blob_renditions(blob_id):
+    """Build thumbnail/preview renditions for an image FileBlob"""
+    from .models import FileBlob
+    from .renditions import generate_renditions, needs_renditions
+
+    blob = FileBlob.objects.filter(pk=blob_id).first()
+    if blob is None or not needs_renditions(blob):
+        return {'success': False, 'message': 'Nothing to render'}
+
+    if not generate_renditions(blob):
+        logger.info(f"Blob {blob_id}: image format not supported for renditions")
+        return {'success': False, 'message': 'Unsupported image'}
+    return {'success': True}
+
+
+@shared_task
+def reconcile_task_counters():
+    """Rebuild cached per-user task counters from the database"""
+    from .counters import reconcile_counts
+
+    users = reconcile_counts()
+    logger.info(f"Task counters: reconciled {users} users")
+    return {'users': users}
+
+
+@shared_task
+def relay_outbox_events():
+    """Drain pending outbox events to their subscribers in batches"""
+    from .outbox import relay_batch
+
+    relayed = 0
+    for _ in range(settings.OUTBOX_RELAY_MAX_BATCHES):
+        count = relay_batch()
+        relayed += count
+        if count < settings.OUTBOX_BATCH_SIZE:
+            break
+
+    if relayed:
+        logger.info(f"Outbox relay: {relayed} events handled")
+    return {'relayed': relayed}
+
+
+@shared_task
+def cleanup_outbox_events():
+    """Drop relayed outbox events older than OUTBOX_RETENTION"""
+    from datetime import timedelta
+    from django.utils.timezone import now
+    from .models import OutboxEvent
+
+    deleted = OutboxEvent.objects.filter(
+        processed_at__lt=now() - timedelta(days=settings.OUTBOX_RETENTION)
+    ).delete()[0]
+
+    logger.info(f"Outbox cleanup: {deleted} relayed events removed")
+    return {'deleted': deleted}
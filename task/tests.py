@@ -1,3 +1,665 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from datetime import timedelta
+from unittest import mock
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils.timezone import now
+from fcm_django.models import FCMDevice
+from redis.exceptions import RedisError
+from rest_framework.test import APIClient
+from process.models import Action, ActionType, FieldType, Process, ProcessField
+from user.models import BusinessFunction, Department, Role, User
+from workflow_engine.models import ActionTransition, State, StateType, Transition
+from . import outbox, report_cache, uploads
+from .models import (NotificationDelivery, OutboxEvent, Task, TaskActionLog, TaskData, TaskPermission,
+                     TaskTitleSequence, UploadSession, allocate_task_titles)
+from .notifications import NotificationDispatcher, StandInTransport
+from .tasks import cleanup_upload_sessions
+from .uploads import UploadError, append_chunk, session_path
 
-# Create your tests here.
+
+class TaskFixtures:
+    """A user and a one-step process: start --approve--> closed"""
+
+    @classmethod
+    def create_fixtures(cls, target):
+        target.user = cls.create_user('requestor')
+        target.process = Process.objects.create(
+            name='Sample request', version='1', prefix='SR', is_active=True
+        )
+        target.field = ProcessField.objects.create(
+            process=target.process, name='Note', field_type=FieldType.TEXT, order=1, required=False
+        )
+        target.start = State.objects.create(name='Start', state_type=StateType.START)
+        target.closed = State.objects.create(name='Closed', state_type=StateType.CLOSED)
+        target.approve = Action.objects.create(
+            name='Approve', description='', action_type=ActionType.APPROVE, process=target.process
+        )
+        transition = Transition.objects.create(
+            process=target.process, current_state=target.start, next_state=target.closed
+        )
+        ActionTransition.objects.create(action=target.approve, transition=transition)
+
+    @staticmethod
+    def create_user(username):
+        return User.objects.create(
+            username=username,
+            department=Department.objects.get_or_create(name='Sample')[0],
+            role=Role.objects.get_or_create(name='Staff')[0],
+            business_function=BusinessFunction.objects.get_or_create(name='Development')[0],
+            is_password_changed=True,
+        )
+
+
+class AllocateTaskTitlesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.process = Process.objects.create(name='Sample request', version='1', prefix='SR', is_active=True)
+
+    def test_numbers_are_consecutive_per_prefix_and_month(self):
+        first = allocate_task_titles(self.process, 2)
+        second = allocate_task_titles(self.process, 3)
+
+        numbers = [int(title[-3:]) for title in first + second]
+        self.assertEqual(numbers, [1, 2, 3, 4, 5])
+        self.assertTrue(all(title.startswith('SR') for title in first + second))
+        self.assertEqual(TaskTitleSequence.objects.get(prefix='SR').last_value, 5)
+
+
+class AllocateTaskTitlesConcurrencyTests(TransactionTestCase):
+    def test_concurrent_allocations_never_share_a_number(self):
+        process = Process.objects.create(name='Sample request', version='1', prefix='SR', is_active=True)
+        titles = []
+        errors = []
+        barrier = threading.Barrier(8)
+
+        def allocate():
+            try:
+                barrier.wait()
+                for _ in range(5):
+                    titles.extend(allocate_task_titles(process, 3))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=allocate) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(titles), 8 * 5 * 3)
+        self.assertEqual(sorted(int(title[-3:]) for title in titles), list(range(1, 121)))
+
+
+class TaskBulkCreateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        TaskFixtures.create_fixtures(cls)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, tasks):
+        return self.client.post('/api/tasks/bulk/', {'process': str(self.process.id), 'tasks': tasks}, format='json')
+
+    def test_invalid_items_are_reported_and_valid_ones_created(self):
+        response = self.post([
+            {'fields': [{'field_id': str(self.field.id), 'value': 'first'}]},
+            {'fields': [{'field_id': str(uuid.uuid4()), 'value': 'unknown field'}]},
+            {'fields': []},
+            {'fields': [{'field_id': str(self.field.id), 'value': 'second'}]},
+        ])
+
+        self.assertEqual(response.status_code, 201)
+        results = response.json()
+        self.assertEqual([result['index'] for result in results], [0, 1, 2, 3])
+        self.assertEqual([result['success'] for result in results], [True, False, False, True])
+        self.assertIn('non_field_errors', results[1]['errors'])
+        self.assertIn('fields', results[2]['errors'])
+
+        tasks = Task.objects.filter(id__in=[results[0]['id'], results[3]['id']])
+        self.assertEqual(tasks.count(), 2)
+        self.assertEqual({task.state_id for task in tasks}, {self.start.id})
+        self.assertEqual(
+            set(tasks.values_list('data__value', flat=True)), {'first', 'second'}
+        )
+
+    def test_all_items_invalid_is_bad_request(self):
+        response = self.post([{'fields': [{'field_id': str(uuid.uuid4())}]}])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.json()[0]['success'])
+        self.assertFalse(Task.objects.exists())
+
+
+class TaskBulkActionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        TaskFixtures.create_fixtures(cls)
+        cls.permitted, cls.forbidden = [
+            Task.objects.create(process=cls.process, created_by=cls.user, state=cls.start, title=title)
+            for title in ('SR0001', 'SR0002')
+        ]
+        TaskPermission.objects.create(
+            task=cls.permitted, action=cls.approve, user=cls.user, role_type='specific_user'
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, items):
+        return self.client.post('/api/tasks/bulk-action/', {'items': items}, format='json')
+
+    def item(self, task_id):
+        return {'task_id': str(task_id), 'action_id': str(self.approve.id)}
+
+    def test_failed_items_are_reported_and_the_rest_applied(self):
+        response = self.post([
+            self.item(self.permitted.id),
+            self.item(self.forbidden.id),
+            self.item(uuid.uuid4()),
+            self.item(self.permitted.id),
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        results = response.json()
+        self.assertEqual([result['success'] for result in results], [True, False, False, False])
+        self.assertEqual(
+            [result.get('errors', {}).get('non_field_errors') for result in results],
+            [
+                None,
+                ["You do not have permission to perform this action."],
+                ["Task not found."],
+                ["Only one action per task is allowed in a batch."],
+            ]
+        )
+
+        self.permitted.refresh_from_db()
+        self.forbidden.refresh_from_db()
+        self.assertEqual(self.permitted.state_id, self.closed.id)
+        self.assertEqual(self.forbidden.state_id, self.start.id)
+        self.assertEqual(TaskActionLog.objects.filter(task=self.permitted).count(), 1)
+
+    def test_no_valid_transition_is_reported(self):
+        Task.objects.filter(pk=self.permitted.pk).update(state=self.closed)
+
+        response = self.post([self.item(self.permitted.id)])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json()[0]['errors']['non_field_errors'],
+            ["No valid transition from current state for this action."]
+        )
+
+
+class AppendChunkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        TaskFixtures.create_fixtures(cls)
+        task = Task.objects.create(process=cls.process, created_by=cls.user, state=cls.start, title='SR0001')
+        cls.task_data = TaskData.objects.create(task=task, field=cls.field)
+
+    def setUp(self):
+        upload_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, upload_dir)
+        settings_override = override_settings(UPLOAD_SESSION_DIR=upload_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.content = bytes(range(256)) * 4
+        self.session = UploadSession.objects.create(
+            created_by=self.user, task_data=self.task_data, filename='scan.pdf', size=len(self.content)
+        )
+
+    def append(self, offset, length, data=None):
+        data = self.content[offset:offset + length] if data is None else data
+        return append_chunk(self.session.pk, offset, io.BytesIO(data), length)
+
+    def part_content(self):
+        with open(session_path(self.session), 'rb') as part:
+            return part.read()
+
+    def test_chunks_advance_the_offset(self):
+        self.assertEqual(self.append(0, 400).received, 400)
+        self.assertEqual(self.append(400, 624).received, 1024)
+        self.assertEqual(self.part_content(), self.content)
+
+    def test_retry_of_a_received_chunk_is_accepted(self):
+        self.append(0, 400)
+
+        self.assertEqual(self.append(0, 400).received, 400)
+        self.assertEqual(self.part_content(), self.content[:400])
+
+    def test_offset_other_than_received_is_rejected(self):
+        self.append(0, 400)
+
+        for offset in (200, 500):
+            with self.subTest(offset=offset), self.assertRaisesMessage(UploadError, "Expected offset 400"):
+                self.append(offset, 300)
+
+    def test_chunk_past_declared_size_is_rejected(self):
+        with self.assertRaises(UploadError):
+            self.append(0, len(self.content) + 1, data=self.content + b'x')
+
+    def test_truncated_chunk_does_not_advance_and_is_overwritten(self):
+        self.append(0, 400)
+
+        with self.assertRaisesMessage(UploadError, "Chunk truncated"):
+            self.append(400, 300, data=b'\0' * 100)
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.received, 400)
+
+        self.append(400, 624)
+        self.assertEqual(self.part_content(), self.content)
+
+    def test_lost_compare_and_set_is_rejected(self):
+        self.append(0, 400)
+        session_pk = self.session.pk
+
+        class RacingStream(io.BytesIO):
+            def read(self, size=-1):
+                # A concurrent PUT of a shorter chunk wins while this one is written
+                UploadSession.objects.filter(pk=session_pk).update(received=450)
+                return super().read(size)
+
+        with self.assertRaisesMessage(UploadError, "Expected offset 450"):
+            append_chunk(session_pk, 400, RacingStream(self.content[400:500]), 100)
+
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.received, 450)
+
+    def test_lost_compare_and_set_to_the_same_chunk_is_accepted(self):
+        self.append(0, 400)
+        session_pk = self.session.pk
+
+        class RacingStream(io.BytesIO):
+            def read(self, size=-1):
+                # A retry of this very chunk wins while this one is written
+                UploadSession.objects.filter(pk=session_pk).update(received=500)
+                return super().read(size)
+
+        session = append_chunk(session_pk, 400, RacingStream(self.content[400:500]), 100)
+        self.assertEqual(session.received, 500)
+
+    def test_completed_session_is_rejected(self):
+        UploadSession.objects.filter(pk=self.session.pk).update(status=UploadSession.Status.COMPLETED)
+
+        with self.assertRaisesMessage(UploadError, "already completed"):
+            self.append(0, 400)
+
+    def test_missing_partial_file_is_not_recreated(self):
+        self.append(0, 400)
+        os.remove(session_path(self.session))
+
+        with self.assertRaisesMessage(UploadError, "Partial upload file is missing"):
+            self.append(400, 624)
+        self.assertFalse(os.path.exists(session_path(self.session)))
+
+    def test_cleanup_discards_only_sessions_still_stale(self):
+        self.append(0, 400)
+        stale_at = now() - timedelta(seconds=settings.UPLOAD_SESSION_TTL + 60)
+        UploadSession.objects.filter(pk=self.session.pk).update(updated_at=stale_at)
+        fresh = UploadSession.objects.create(
+            created_by=self.user, task_data=self.task_data, filename='other.pdf', size=10
+        )
+        raced = UploadSession.objects.create(
+            created_by=self.user, task_data=self.task_data, filename='raced.pdf', size=10
+        )
+        UploadSession.objects.filter(pk=raced.pk).update(updated_at=stale_at)
+
+        original_discard = uploads.discard_partial
+
+        def discard_and_race(session):
+            original_discard(session)
+            if session.pk == raced.pk:
+                # A chunk lands after the file was discarded
+                UploadSession.objects.filter(pk=raced.pk).update(updated_at=now())
+
+        with mock.patch.object(uploads, 'discard_partial', discard_and_race):
+            self.assertEqual(cleanup_upload_sessions(), {'deleted': 1})
+
+        self.assertFalse(UploadSession.objects.filter(pk=self.session.pk).exists())
+        self.assertFalse(os.path.exists(session_path(self.session)))
+        self.assertEqual(set(UploadSession.objects.values_list('pk', flat=True)), {fresh.pk, raced.pk})
+
+
+class FakeStandIn:
+    """
+    Answers stand-in multicast requests: tokens starting with 'gone' are
+    unregistered, tokens starting with 'busy' hit a transient error.
+    """
+
+    def __init__(self, status_code=200):
+        self.status_code = status_code
+        self.requests = []
+
+    def post(self, url, json, timeout):
+        tokens = json['message']['tokens']
+        self.requests.append(tokens)
+        if self.status_code != 200:
+            return mock.Mock(ok=False, status_code=self.status_code, json=lambda: {
+                'error': {'code': self.status_code, 'status': 'UNAVAILABLE'}
+            })
+
+        responses = []
+        for token in tokens:
+            if token.startswith('gone'):
+                responses.append({'error': {'code': 404, 'status': 'NOT_FOUND', 'details': [
+                    {'@type': 'type.googleapis.com/google.firebase.fcm.v1.FcmError', 'errorCode': 'UNREGISTERED'}
+                ]}})
+            elif token.startswith('busy'):
+                responses.append({'error': {'code': 503, 'status': 'UNAVAILABLE'}})
+            else:
+                responses.append({})
+        return mock.Mock(ok=True, status_code=200, json=lambda: {'responses': responses})
+
+
+@mock.patch('task.tasks.deliver_notification.apply_async')
+class NotificationDispatcherTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = TaskFixtures.create_user('recipient')
+
+    def dispatch(self, tokens, stand_in=None, attempt=1):
+        self.stand_in = stand_in or FakeStandIn()
+        devices = [
+            FCMDevice.objects.create(user=self.user, registration_id=token, type='android', active=True)
+            for token in tokens
+        ]
+        with mock.patch('task.notifications.requests.post', self.stand_in.post):
+            dispatcher = NotificationDispatcher(transport=StandInTransport(base_url='http://stand-in'))
+            summary = dispatcher.send_to_devices([device.id for device in devices], {'task_id': 1}, attempt)
+        return devices, summary
+
+    def statuses(self):
+        return dict(NotificationDelivery.objects.values_list('device__registration_id', 'status'))
+
+    @mock.patch('task.notifications.CHUNK_SIZE', 2)
+    def test_one_request_per_chunk(self, apply_async):
+        devices, summary = self.dispatch([f'token-{i}' for i in range(5)])
+
+        self.assertEqual([len(tokens) for tokens in self.stand_in.requests], [2, 2, 1])
+        self.assertEqual(summary['success_count'], 5)
+        self.assertEqual(NotificationDelivery.objects.filter(status=NotificationDelivery.Status.SENT).count(), 5)
+        apply_async.assert_not_called()
+
+    def test_unregistered_tokens_are_deactivated(self, apply_async):
+        (active, gone), summary = self.dispatch(['token-1', 'gone-1'])
+
+        self.assertEqual(summary['unregistered_count'], 1)
+        self.assertEqual(
+            set(FCMDevice.objects.filter(active=True).values_list('registration_id', flat=True)), {'token-1'}
+        )
+        self.assertEqual(self.statuses()['gone-1'], NotificationDelivery.Status.UNREGISTERED)
+        apply_async.assert_not_called()
+
+    def test_transient_failures_are_retried_with_backoff(self, apply_async):
+        (sent, busy), summary = self.dispatch(['token-1', 'busy-1'])
+
+        self.assertEqual(summary['retry_count'], 1)
+        self.assertEqual(self.statuses()['busy-1'], NotificationDelivery.Status.RETRYING)
+        apply_async.assert_called_once()
+        kwargs = apply_async.call_args.kwargs
+        self.assertEqual(kwargs['args'], [[busy.id], {'task_id': '1'}, 2])
+        self.assertGreater(kwargs['countdown'], 0)
+
+    def test_failed_request_retries_every_token(self, apply_async):
+        devices, summary = self.dispatch(['token-1', 'token-2'], stand_in=FakeStandIn(status_code=503))
+
+        self.assertEqual(summary['retry_count'], 2)
+        self.assertEqual(sorted(apply_async.call_args.kwargs['args'][0]), sorted(device.id for device in devices))
+
+    def test_final_attempt_is_not_retried(self, apply_async):
+        with self.settings(NOTIFICATION_MAX_ATTEMPTS=3):
+            devices, summary = self.dispatch(['busy-1'], attempt=3)
+
+        self.assertEqual(summary['retry_count'], 0)
+        self.assertEqual(self.statuses()['busy-1'], NotificationDelivery.Status.FAILED)
+        apply_async.assert_not_called()
+
+
+@mock.patch.dict(outbox._subscribers, clear=True)
+class OutboxRelayTests(TestCase):
+    EVENT = 'test.event'
+
+    def subscribe(self, handler):
+        outbox.subscriber(self.EVENT)(handler)
+
+    def make_due(self):
+        OutboxEvent.objects.update(next_attempt_at=now())
+
+    def test_handled_events_are_processed(self):
+        received = []
+        self.subscribe(received.append)
+        event = outbox.publish(self.EVENT, value=1)
+
+        self.assertEqual(outbox.relay_batch(), 1)
+
+        event.refresh_from_db()
+        self.assertEqual(received, [{'value': 1}])
+        self.assertIsNotNone(event.processed_at)
+        self.assertEqual(event.attempts, 1)
+        self.assertEqual(outbox.relay_batch(), 0)
+
+    def test_failed_event_is_retried_after_backoff(self):
+        calls = []
+
+        def flaky(payload):
+            calls.append(payload)
+            if len(calls) == 1:
+                raise ConnectionError("broker down")
+        self.subscribe(flaky)
+        event = outbox.publish(self.EVENT)
+
+        with self.assertLogs('task.outbox', 'WARNING'):
+            outbox.relay_batch()
+        event.refresh_from_db()
+        self.assertIsNone(event.processed_at)
+        self.assertEqual(event.last_error, "ConnectionError: broker down")
+        self.assertGreater(event.next_attempt_at, now())
+
+        # Not due yet
+        self.assertEqual(outbox.relay_batch(), 0)
+
+        self.make_due()
+        self.assertEqual(outbox.relay_batch(), 1)
+        event.refresh_from_db()
+        self.assertIsNotNone(event.processed_at)
+        self.assertEqual(event.attempts, 2)
+
+    def test_backoff_doubles_up_to_the_cap(self):
+        with self.settings(OUTBOX_RETRY_BASE_DELAY=5, OUTBOX_RETRY_MAX_DELAY=60):
+            self.assertEqual([outbox.retry_delay(attempts) for attempts in range(1, 6)], [5, 10, 20, 40, 60])
+
+    def test_event_is_dropped_after_max_attempts(self):
+        def failing(payload):
+            raise ConnectionError("broker down")
+        self.subscribe(failing)
+        event = outbox.publish(self.EVENT)
+
+        with self.settings(OUTBOX_MAX_ATTEMPTS=2):
+            with self.assertLogs('task.outbox', 'WARNING'):
+                outbox.relay_batch()
+            self.make_due()
+            with self.assertLogs('task.outbox', 'ERROR') as logs:
+                outbox.relay_batch()
+            self.assertIn(f"Outbox event {event.pk} (test.event) dropped after 2 attempts", logs.output[0])
+
+            self.make_due()
+            self.assertEqual(outbox.relay_batch(), 0)
+
+        event.refresh_from_db()
+        self.assertEqual(event.attempts, 2)
+        self.assertIsNone(event.processed_at)
+
+    def test_database_error_in_one_event_does_not_abort_the_batch(self):
+        def insert(payload):
+            TaskTitleSequence.objects.create(prefix='SR', year_month='2501')
+        self.subscribe(insert)
+        first = outbox.publish(self.EVENT)
+        duplicate = outbox.publish(self.EVENT)
+
+        with self.assertLogs('task.outbox', 'WARNING'):
+            self.assertEqual(outbox.relay_batch(), 2)
+
+        first.refresh_from_db()
+        duplicate.refresh_from_db()
+        self.assertIsNotNone(first.processed_at)
+        self.assertIsNone(duplicate.processed_at)
+        self.assertIn("IntegrityError", duplicate.last_error)
+        self.assertEqual(TaskTitleSequence.objects.count(), 1)
+
+
+class ReportCacheTests(TestCase):
+    def setUp(self):
+        # Unique names keep entries apart from other runs sharing the cache
+        self.name = f'report-{uuid.uuid4().hex}'
+        self.scope = f'scope-{uuid.uuid4().hex}'
+        self.other_scope = f'scope-{uuid.uuid4().hex}'
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return {'rows': self.calls}
+
+    def report(self, params=None):
+        return report_cache.cached_report(self.name, params or {'year': 2025}, [self.scope, self.other_scope], self.compute)
+
+    def test_result_is_cached_per_params(self):
+        self.assertEqual(self.report(), {'rows': 1})
+        self.assertEqual(self.report(), {'rows': 1})
+        self.assertEqual(self.report({'year': 2024}), {'rows': 2})
+        self.assertEqual(self.calls, 2)
+
+    def test_bumping_a_scope_invalidates(self):
+        self.report()
+        report_cache.bump_data_version([self.other_scope])
+
+        self.assertEqual(self.report(), {'rows': 2})
+
+    def test_bumping_an_unrelated_scope_keeps_the_entry(self):
+        self.report()
+        report_cache.bump_data_version([f'scope-{uuid.uuid4().hex}', '', None])
+
+        self.assertEqual(self.report(), {'rows': 1})
+
+    def test_bump_on_commit_waits_for_the_commit(self):
+        self.report()
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            report_cache.bump_on_commit([self.scope])
+            self.assertEqual(self.report(), {'rows': 1})
+        for callback in callbacks:
+            callback()
+
+        self.assertEqual(self.report(), {'rows': 2})
+
+    def test_lost_version_is_not_reused(self):
+        self.report()
+        cache.delete(report_cache.VERSION_KEY.format(scope=self.scope))
+
+        self.assertEqual(self.report(), {'rows': 2})
+
+    def test_redis_errors_fall_back_to_computing(self):
+        with mock.patch.object(report_cache.cache, 'get', side_effect=RedisError("down")), \
+                self.assertLogs('task.report_cache', 'WARNING'):
+            self.assertEqual(self.report(), {'rows': 1})
+            self.assertEqual(self.report(), {'rows': 2})
+
+    def test_redis_errors_do_not_fail_the_bump(self):
+        with mock.patch.object(report_cache.cache, 'add', side_effect=RedisError("down")), \
+                self.assertLogs('task.report_cache', 'WARNING'):
+            report_cache.bump_data_version([self.scope])
+
+
+class PivotTests(TestCase):
+    def test_safe_casts_return_null_for_invalid_values(self):
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT pivot_safe_date('2024-02-29'), pivot_safe_date('2025-02-30'), pivot_safe_date('0000-01-01'),
+                       pivot_safe_date('2025-13-01'), pivot_safe_time('08:30'), pivot_safe_time('25:00'),
+                       pivot_safe_integer(' -42 '), pivot_safe_integer('99999999999'), pivot_safe_integer('4x')
+            """)
+            row = cursor.fetchone()
+
+        self.assertEqual(
+            [str(value) if value is not None else None for value in row],
+            ['2024-02-29', None, None, None, '08:30:00', None, '-42', None, None]
+        )
+
+    def test_unknown_fields_are_rejected(self):
+        client = APIClient()
+        client.force_authenticate(TaskFixtures.create_user('reporter'))
+
+        response = client.get('/api/tasks/customer-entry/', {'fields': 'note,bogus'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('bogus', response.json()['fields'][0])
+
+    def test_report_columns_outside_the_pivot_are_accepted(self):
+        client = APIClient()
+        client.force_authenticate(TaskFixtures.create_user('reporter'))
+
+        response = client.get('/api/tasks/overtime/', {'fields': 'factory_code,files'})
+
+        self.assertEqual(response.status_code, 200)
+
+
+class TaskFileUploadReportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = TaskFixtures.create_user('reporter')
+        process = Process.objects.create(name='Daily report', version='1', prefix='DR', is_active=True)
+        customer = ProcessField.objects.create(
+            process=process, name='Name of customer', field_type=FieldType.TEXT, order=1, required=False
+        )
+        cls.photos = ProcessField.objects.create(
+            process=process, name='Photos', field_type=FieldType.MULTIFILE, order=2, required=False
+        )
+        start = State.objects.create(name='Start', state_type=StateType.START)
+        cls.task = Task.objects.create(process=process, created_by=cls.user, state=start, title='DR0001')
+        TaskData.objects.create(task=cls.task, field=customer, value='F01')
+        TaskData.objects.create(task=cls.task, field=cls.photos)
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        # Start from a fresh data version so entries of earlier runs are not read
+        report_cache.bump_data_version(['DR'])
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def report_files(self):
+        response = self.client.get('/api/tasks/overtime/')
+        self.assertEqual(response.status_code, 200)
+        return [row['files'] for row in response.json() if row['task_id'] == str(self.task.id)][0]
+
+    def test_uploaded_file_shows_in_the_cached_report(self):
+        self.assertEqual(self.report_files(), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/api/tasks/{self.task.id}/upload-files/', {
+                'field_id': str(self.photos.id),
+                'files': [SimpleUploadedFile('scan.pdf', b'%PDF-1.4 scan', content_type='application/pdf')],
+            }, format='multipart')
+        self.assertEqual(response.status_code, 201)
+
+        files = self.report_files()
+        self.assertEqual([file['filename'] for file in files], ['scan.pdf'])
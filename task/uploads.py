@@ -0,0 +1,127 @@
+import os
+from types import SimpleNamespace
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils.timezone import now
+from core.utils import FileValidator
+from .blobs import blob_atomic, release_blob
+from .models import TaskFileData, UploadSession
+
+READ_BLOCK_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    """Raised for chunks or completions that do not fit the session state"""
+
+
+def session_path(session):
+    return os.path.join(settings.UPLOAD_SESSION_DIR, f"{session.pk}.part")
+
+
+def validate_upload(filename, size, content_type):
+    """Run the FileValidator checks that do not need the content"""
+    validator = FileValidator()
+    upload = SimpleNamespace(name=filename, size=size, content_type=content_type)
+    validator.validate_extension(upload)
+    validator.validate_size(upload)
+    validator.validate_mime_type(upload)
+
+
+def append_chunk(session_id, offset, stream, length):
+    """
+    Write `length` bytes read from `stream` at `offset` and return the session.
+
+    The chunk is written to the partial file without holding a row lock; the
+    session then advances with a compare-and-set on `received`, so of two
+    concurrent PUTs at the same offset only one moves it. A chunk already
+    fully received (a client retry) is accepted without writing.
+    """
+    session = UploadSession.objects.get(pk=session_id)
+
+    if session.status != UploadSession.Status.OPEN:
+        raise UploadError("Upload session is already completed.")
+    if offset + length <= session.received:
+        return session
+    if offset != session.received:
+        raise UploadError(f"Expected offset {session.received}, got {offset}.")
+    if offset + length > session.size:
+        raise UploadError("Chunk exceeds the declared file size.")
+
+    os.makedirs(settings.UPLOAD_SESSION_DIR, exist_ok=True)
+    written = 0
+    # Never truncated: bytes past the acknowledged offset left by an
+    # interrupted write are overwritten by the next chunk. Only the first
+    # chunk creates the file; a later one finding it gone (discarded by
+    # cleanup_upload_sessions) must not leave a hole in its place.
+    try:
+        fd = os.open(session_path(session), os.O_WRONLY | (os.O_CREAT if offset == 0 else 0), 0o644)
+    except FileNotFoundError:
+        raise UploadError("Partial upload file is missing, restart the upload.")
+    with os.fdopen(fd, 'wb') as part:
+        part.seek(offset)
+        while written < length:
+            block = stream.read(min(READ_BLOCK_SIZE, length - written))
+            if not block:
+                break
+            part.write(block)
+            written += len(block)
+
+    if written != length:
+        raise UploadError(f"Chunk truncated: expected {length} bytes, got {written}.")
+
+    advanced = UploadSession.objects.filter(
+        pk=session.pk, status=UploadSession.Status.OPEN, received=offset
+    ).update(received=offset + written, updated_at=now())
+    session.refresh_from_db()
+
+    if not advanced:
+        if session.status != UploadSession.Status.OPEN:
+            # Completed meanwhile; drop the partial file this write recreated
+            discard_partial(session)
+            raise UploadError("Upload session is already completed.")
+        if session.received < offset + written:
+            raise UploadError(f"Expected offset {session.received}, got {offset}.")
+    return session
+
+
+def complete_session(session_id):
+    """Attach the fully received file to the session's target and drop the partial file"""
+    with blob_atomic():
+        session = UploadSession.objects.select_for_update().select_related(
+            'task_data', 'action_log'
+        ).get(pk=session_id)
+
+        if session.status != UploadSession.Status.OPEN:
+            raise UploadError("Upload session is already completed.")
+        if session.received != session.size:
+            raise UploadError(f"Upload incomplete: {session.received}/{session.size} bytes received.")
+
+        path = session_path(session)
+        if not os.path.exists(path):
+            raise UploadError("Partial upload file is missing, restart the upload.")
+        with open(path, 'rb') as part:
+            upload = File(part, name=session.filename)
+            upload.content_type = session.content_type
+
+            if session.task_data_id:
+                TaskFileData.from_upload(session.task_data, upload).save()
+            else:
+                action_log = session.action_log
+                replaced_blob_id = action_log.blob_id
+                action_log.attach_file(upload)
+                action_log.save(update_fields=['file', 'blob', 'updated_at'])
+                if replaced_blob_id:
+                    release_blob(replaced_blob_id)
+
+        session.status = UploadSession.Status.COMPLETED
+        session.save(update_fields=['status', 'updated_at'])
+        transaction.on_commit(lambda: discard_partial(session))
+        return session
+
+
+def discard_partial(session):
+    try:
+        os.remove(session_path(session))
+    except FileNotFoundError:
+        pass
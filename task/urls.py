@@ -4,7 +4,15 @@
 urlpatterns = [
     path('sent/', views.SentTasksAPIView.as_view(), name='sent-tasks'),
     path('received/', views.ReceivedTasksAPIView.as_view(), name='received-tasks'),
+    path('counts/', views.TaskCountsView.as_view(), name='task-counts'),
+    path('notification-preference/', views.NotificationPreferenceView.as_view(), name='notification-preference'),
     path('', views.TaskCreateView.as_view(), name='task-create'),
+    path('bulk/', views.TaskBulkCreateView.as_view(), name='task-bulk-create'),
+    path('bulk-action/', views.TaskBulkActionView.as_view(), name='task-bulk-action'),
+    path('uploads/', views.UploadSessionCreateView.as_view(), name='upload-session-create'),
+    path('uploads/<uuid:pk>/', views.UploadSessionView.as_view(), name='upload-session'),
+    path('uploads/<uuid:pk>/complete/', views.UploadSessionCompleteView.as_view(), name='upload-session-complete'),
+    path('available-actions/', views.TaskAvailableActionsView.as_view(), name='task-available-actions'),
     path('<uuid:pk>/upload-files/', views.TaskFileUploadView.as_view(), name='task-upload-files'),
     path('<uuid:pk>/action/', views.TaskActionView.as_view(), name='task-action'),
     path('<uuid:pk>/', views.TaskDetailView.as_view(), name='task-detail'),
@@ -1,9 +1,17 @@
-from django.db.models import Prefetch, F
+import django_filters
+from django.db.models import Exists, OuterRef, Prefetch
 from django.db import connection
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from .models import Task, TaskActionLog, TaskData, TaskPermission, TaskFileData
+from .models import Task, TaskActionLog, TaskData, TaskFileData, TaskInboxEntry, UploadSession, NotificationPreference
+from .blobs import blob_atomic
+from .counters import get_counts
+from .tasks import flush_task_notifications
+from .report_cache import USER_FACTORY_ONSITE, bump_for_tasks, cached_report
+from .permission_service import PermissionService
+from .pivot import ProcessPivot, parse_fields_param
+from .uploads import UploadError, append_chunk, complete_session, discard_partial
 from .serializers import (ReceivedTaskSerializer, SentTaskSerializer,
                           TaskActionSerializer, TaskDetailSerializer, TaskCreateSerializer,
                           TaskDataSerializer, 
@@ -11,7 +19,11 @@
                           OnsiteTransferAbsenceSerializer, TransferAbsenceSerializer,
                           OvertimeSerializer,
                           DailyMovementSerializer,
-                          CustomerEntrySerializer,)
+                          CustomerEntrySerializer,
+                          TaskAvailableActionsRequestSerializer, TaskAvailableActionsSerializer,
+                          TaskBulkCreateSerializer, TaskBulkResultSerializer, TaskBulkActionSerializer,
+                          UploadSessionSerializer, UploadSessionCreateSerializer, TaskCountsSerializer,
+                          NotificationPreferenceSerializer,)
 from drf_spectacular.utils import extend_schema
 from core.translation import get_localized_column
 from user.permissions import HasJWTPermission
@@ -21,59 +33,135 @@
 from rest_framework.exceptions import PermissionDenied
 from datetime import datetime
 from django.conf import settings
+from core.pagination import KeysetPagination
+from core.streaming import STREAM_PARAMETER, get_stream_format, stream_query_response
+
+
+def filter_promoted_values(queryset, query_params, task_path=''):
+    """
+    Apply `promoted__<key>=<value>` query params against TaskPromotedValue.
+    `task_path` leads from the queryset's model to Task, e.g. 'task__'.
+    """
+    for param, value in query_params.items():
+        if param.startswith('promoted__'):
+            queryset = queryset.filter(**{
+                f'{task_path}promoted_values__key': param[len('promoted__'):],
+                f'{task_path}promoted_values__value': value,
+            })
+    return queryset
+
+
+class ReceivedTasksPagination(KeysetPagination):
+    ordering_field = 'state_entered_at'
+
+
+class ReceivedTasksFilter(django_filters.FilterSet):
+    """The Task filters of the sent list, applied to inbox entries"""
+    state__state_type = django_filters.CharFilter(field_name='task__state__state_type')
+    state__state_type__in = django_filters.BaseInFilter(field_name='task__state__state_type', lookup_expr='in')
+    process__prefix = django_filters.CharFilter(field_name='task__process__prefix')
+
+    class Meta:
+        model = TaskInboxEntry
+        fields = []
 
 
 class SentTasksAPIView(generics.ListAPIView):
     serializer_class = SentTaskSerializer
+    pagination_class = KeysetPagination
     filterset_fields = {
         'state__state_type': ['exact', 'in'],
         'process__prefix': ['exact']
     }
-    search_fields = ['title']
+    search_fields = ['title', 'promoted_values__value']
 
     def get_queryset(self):
-        # Add prefetching for better performance in serializers
-        return Task.objects.filter(
+        queryset = Task.objects.filter(
             created_by=self.request.user
         ).select_related(
             'process', 'state', 'created_by'
-        ).prefetch_related(
-            'taskpermission_set__user',
-            'taskpermission_set__action'
-        )
+        ).prefetch_related('promoted_values')
+        return filter_promoted_values(queryset, self.request.query_params)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        tasks = page if page is not None else list(queryset)
+
+        # Resolve recipients for the whole page in one query
+        context = self.get_serializer_context()
+        context['recipients'] = PermissionService.get_recipients_for_tasks(tasks)
+        serializer = self.get_serializer(tasks, many=True, context=context)
+
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
 
 
 class ReceivedTasksAPIView(generics.ListAPIView):
+    """
+    Tasks the user can act on from their current state, most recently
+    arrived first. Served from the inbox projection: pages are read along
+    the (user, state_entered_at) index and only the page's tasks are loaded.
+    """
     serializer_class = ReceivedTaskSerializer
-    filterset_fields = {
-        'state__state_type': ['exact', 'in'],
-        'process__prefix': ['exact']
-    }
-    search_fields = ['title']
+    pagination_class = ReceivedTasksPagination
+    filterset_class = ReceivedTasksFilter
+    search_fields = ['task__title', 'task__promoted_values__value']
+    ordering_fields = ['state_entered_at', 'task__created_at', 'task__title']
 
     def get_queryset(self):
-        user = self.request.user
-        
-        # Single complex query to get all tasks user can act on from current state
-        return Task.objects.filter(
-            # User has permission for this task
-            id__in=TaskPermission.objects.filter(user=user).values_list('task_id', flat=True)
-        ).filter(
-            # And the action is available from current state
-            taskpermission__user=user,
-            taskpermission__action__actiontransition__transition__current_state=F('state')
+        # One entry per task: a task with several available actions has an
+        # entry per action, keep the first
+        queryset = TaskInboxEntry.objects.filter(
+            user=self.request.user
+        ).exclude(
+            Exists(TaskInboxEntry.objects.filter(
+                user=OuterRef('user'), task=OuterRef('task'), id__lt=OuterRef('id')
+            ))
         ).select_related(
-            'process', 'state', 'created_by'
-        ).prefetch_related(
-            'taskpermission_set__user',
-            'taskpermission_set__action'
-        ).distinct()
+            'task__process', 'task__state', 'task__created_by'
+        ).prefetch_related('task__promoted_values')
+        return filter_promoted_values(queryset, self.request.query_params, task_path='task__')
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        tasks = [entry.task for entry in (page if page is not None else queryset)]
+
+        # Resolve the user's available action for the whole page in one query
+        context = self.get_serializer_context()
+        context['actions'] = PermissionService.get_actions_for_tasks(request.user, tasks)
+        serializer = self.get_serializer(tasks, many=True, context=context)
+
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
 
 
 class TaskCreateView(generics.CreateAPIView):
     serializer_class = TaskCreateSerializer
     
     
+class TaskBulkCreateView(generics.GenericAPIView):
+    serializer_class = TaskBulkCreateSerializer
+
+    @extend_schema(
+        request=TaskBulkCreateSerializer,
+        responses=TaskBulkResultSerializer(many=True),
+    )
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = serializer.save()
+
+        created = any(result['success'] for result in results)
+        return Response(
+            TaskBulkResultSerializer(results, many=True).data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST
+        )
+
+
 class TaskFileUploadView(generics.GenericAPIView):
     def post(self, request, pk):
         """Upload files to existing task"""
@@ -104,14 +192,12 @@ def post(self, request, pk):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        for file in files:
-            TaskFileData.objects.create(
-                task_data=task_data,
-                uploaded_file=file,
-                original_filename=file.name or 'unknown',
-                file_size=file.size or 0,
-                mime_type=getattr(file, 'content_type', '') or 'application/octet-stream'
-            )
+        with blob_atomic():
+            TaskFileData.objects.bulk_create([
+                TaskFileData.from_upload(task_data, file) for file in files
+            ])
+            # bulk_create does not send post_save, invalidate cached reports here
+            bump_for_tasks([task_data.task_id])
         
         return Response({
             "success": True,
@@ -119,6 +205,75 @@ def post(self, request, pk):
         }, status=status.HTTP_201_CREATED)
     
     
+class UploadSessionCreateView(generics.CreateAPIView):
+    """Open a resumable upload; send chunks with PUT, then POST complete/"""
+    serializer_class = UploadSessionCreateSerializer
+
+
+class UploadSessionView(APIView):
+
+    def get_session(self, request, pk):
+        return get_object_or_404(UploadSession, pk=pk, created_by=request.user)
+
+    @extend_schema(responses=UploadSessionSerializer)
+    def get(self, request, pk):
+        """Current offset, to resume after a dropped connection"""
+        return Response(UploadSessionSerializer(self.get_session(request, pk)).data)
+
+    @extend_schema(
+        request={'application/octet-stream': {'type': 'string', 'format': 'binary'}},
+        responses=UploadSessionSerializer,
+    )
+    def put(self, request, pk):
+        """Append a chunk; its offset is given in the Upload-Offset header"""
+        session = self.get_session(request, pk)
+
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return Response({"error": "Upload-Offset header is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if length <= 0:
+            return Response({"error": "Empty chunk"}, status=status.HTTP_400_BAD_REQUEST)
+        if length > settings.UPLOAD_CHUNK_MAX_SIZE:
+            return Response(
+                {"error": f"Chunk exceeds {settings.UPLOAD_CHUNK_MAX_SIZE} bytes"},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+
+        try:
+            session = append_chunk(session.pk, offset, request.stream, length)
+        except UploadError as e:
+            return Response(
+                {"error": str(e), "received": session.received},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response(UploadSessionSerializer(session).data)
+
+    def delete(self, request, pk):
+        """Abort the upload"""
+        session = self.get_session(request, pk)
+        discard_partial(session)
+        session.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class UploadSessionCompleteView(APIView):
+
+    @extend_schema(request=None, responses=UploadSessionSerializer)
+    def post(self, request, pk):
+        session = get_object_or_404(UploadSession, pk=pk, created_by=request.user)
+        try:
+            session = complete_session(session.pk)
+        except UploadError as e:
+            return Response(
+                {"error": str(e), "received": session.received},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response(UploadSessionSerializer(session).data)
+
+
 class TaskActionView(generics.GenericAPIView):
     serializer_class = TaskActionSerializer
 
@@ -135,6 +290,74 @@ def post(self, request, pk):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
     
+class TaskCountsView(APIView):
+    """Badge counts for the sent and received lists, served from Redis counters"""
+
+    @extend_schema(responses=TaskCountsSerializer)
+    def get(self, request):
+        return Response(TaskCountsSerializer(get_counts(request.user)).data)
+
+
+class NotificationPreferenceView(generics.RetrieveUpdateAPIView):
+    """The user's task notification delivery: immediate (coalesced) or an hourly/daily digest"""
+    serializer_class = NotificationPreferenceSerializer
+    http_method_names = ['get', 'put', 'patch']
+
+    def get_object(self):
+        preference, created = NotificationPreference.objects.get_or_create(user=self.request.user)
+        return preference
+
+    def perform_update(self, serializer):
+        previous_digest = serializer.instance.digest
+        preference = serializer.save()
+
+        # Leaving digest mode: send what was held for the digest now instead
+        # of at a digest run that no longer includes the user
+        if previous_digest != NotificationPreference.Digest.OFF and preference.digest == NotificationPreference.Digest.OFF:
+            flush_task_notifications.delay_on_commit(str(preference.user_id))
+
+
+class TaskAvailableActionsView(generics.GenericAPIView):
+    """Actions the user can take on each of a list of tasks, for list screens"""
+    serializer_class = TaskAvailableActionsRequestSerializer
+
+    @extend_schema(
+        request=TaskAvailableActionsRequestSerializer,
+        responses=TaskAvailableActionsSerializer(many=True),
+    )
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        available = PermissionService.get_available_actions_for_tasks(
+            request.user, serializer.validated_data['task_ids']
+        )
+        results = [
+            {'task_id': task_id, 'actions': actions}
+            for task_id, actions in available.items()
+        ]
+        return Response(TaskAvailableActionsSerializer(results, many=True).data)
+
+
+class TaskBulkActionView(generics.GenericAPIView):
+    serializer_class = TaskBulkActionSerializer
+
+    @extend_schema(
+        request=TaskBulkActionSerializer,
+        responses=TaskBulkResultSerializer(many=True),
+    )
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = serializer.save()
+
+        performed = any(result['success'] for result in results)
+        return Response(
+            TaskBulkResultSerializer(results, many=True).data,
+            status=status.HTTP_200_OK if performed else status.HTTP_400_BAD_REQUEST
+        )
+
+
 class TaskDetailView(generics.RetrieveAPIView):
     serializer_class = TaskDetailSerializer
 
@@ -142,8 +365,9 @@ def get_queryset(self):
         return Task.objects.select_related(
             'process', 'state', 'created_by'
         ).prefetch_related(
-            Prefetch('action_logs', queryset=TaskActionLog.objects.select_related('user', 'action')),
-            Prefetch('data', queryset=TaskData.objects.select_related('field').order_by('field__order'))
+            Prefetch('action_logs', queryset=TaskActionLog.objects.select_related('user', 'action', 'blob')),
+            Prefetch('data', queryset=TaskData.objects.select_related('field').order_by('field__order')),
+            Prefetch('data__files', queryset=TaskFileData.objects.select_related('blob'))
         )
 
         
@@ -185,12 +409,91 @@ def update(self, request, *args, **kwargs):
         return Response(self.get_serializer(instance).data)
     
 
+# SP sample-request columns read from the maintained TaskSnapshot projection
+SP_SNAPSHOT_COLUMNS = """
+                    ts.data->>'Name of customer' AS factory_code,
+                    ts.data->>'Finishing code' AS finishing_code,
+                    ts.data->>'Retailer' AS retailer_id,
+                    ts.data->>'Customer''s color name' AS customer_color_name,
+                    ts.data->>'Type of substrate' AS type_of_substrate,
+                    ts.data->>'Collection' AS collection,
+                    ts.data->>'Sample Type' AS sample_type,
+                    ts.data->>'Quantity requirement' AS quantity_requirement,
+                    ts.data->>'Requester name' AS requester_name,
+                    ts.data->>'Deadline request' AS deadline_request,
+                    uu_sampler.username AS sampler,
+                    uu_sampler.id::text AS sampler_id,
+                    ts.data->>'Type of paint' AS type_of_paint,
+                    ts.data->>'Finishing surface grain' AS finishing_surface_grain,
+                    ts.data->>'Sheen level' AS sheen_level,
+                    ts.data->>'Substrate surface treatment' AS substrate_surface_treatment,
+                    ts.data->>'Panel category' AS panel_category,
+                    ts.data->>'Purpose of usage' AS purpose_of_usage,
+                    ts.data->>'Additional detail' AS additional_detail
+"""
+
+
+# Report pivots, see ProcessPivot
+TRANSFER_ABSENCE_PIVOT = ProcessPivot('TA', {
+    'factory_code': 'Name of customer',
+    'user_id': 'username',
+    'transfer_type': 'Transfer type',
+    'from_date': 'From date',
+    'to_date': 'To date',
+    'reason': 'Reason',
+})
+
+OVERTIME_PIVOT = ProcessPivot('DR', {
+    'factory_code': 'Name of customer',
+    'weekday_ot': 'Weekday overtime',
+    'weekday_ot_start': 'Overtime start time today',
+    'weekday_ot_end': 'Overtime end time today',
+    'weekday_ot_num': 'Number of overtime workers today',
+    'hanging_line_today': 'Hanging line today',
+    'pallet_line_today': 'Pallet line today',
+    'others_today': 'Others task today',
+    'hanging_line_tomorrow': 'Hanging line tomorrow',
+    'pallet_line_tomorrow': 'Pallet line tomorrow',
+    'others_tomorrow': 'Others task tomorrow',
+    'instock': 'Customer in stock status',
+    'instock_by_code': 'Customer in stock status for each color code',
+    'sunday_ot': 'Sunday overtime',
+    'sunday_ot_end': 'Sunday overtime end time',
+    'sunday_ot_num': 'Number of overtime workers sunday',
+    'hanging_line_sunday': 'Hanging line sunday',
+    'pallet_line_sunday': 'Pallet line sunday',
+    'num_of_ppl': 'Num of people',
+    'name_of_ppl': 'Name of people',
+})
+
+DAILY_MOVEMENT_PIVOT = ProcessPivot('DM', {
+    'actual_date': ('Actual date', 'date'),
+    'factory_code': 'Name of customer',
+    'task_type': 'Task type',
+    'task_detail': 'Task detail',
+    'estimated_completion_date': 'Estimated completion date',
+    'result': 'Result',
+})
+
+CUSTOMER_ENTRY_PIVOT = ProcessPivot('CE', {
+    'customer_of_boss': 'Customer of Boss',
+    'factory_code': 'Name of customer',
+    'note': 'Note',
+    'license_plate': 'Licence plate',
+    'drive_name': 'Driver name',
+    'scheduled_date': 'Date',
+    'scheduled_time': 'Time',
+})
+
+
 class TaskDataDetailListView(APIView):
     
     @extend_schema(
+        parameters=[STREAM_PARAMETER],
         responses=TaskDataDetailSerializer(many=True),
     )
     def get(self, request):
+        stream_format = get_stream_format(request)
         wes_name = get_localized_column('wes.name')
 
         # Parse and validate query parameters
@@ -209,34 +512,14 @@ def get(self, request):
                     uu.username AS created_by,
                     {wes_name} AS state,
                     wes.state_type AS state_type,
-                    MAX(CASE WHEN ppf.name = 'Name of customer' THEN ttd.value END) AS factory_code,
-                    MAX(CASE WHEN ppf.name = 'Finishing code' THEN ttd.value END) AS finishing_code,
-                    MAX(CASE WHEN ppf.name = 'Retailer' THEN ttd.value END) AS retailer_id,
-                    MAX(CASE WHEN ppf.name = 'Customer''s color name' THEN ttd.value END) AS customer_color_name,
-                    MAX(CASE WHEN ppf.name = 'Type of substrate' THEN ttd.value END) AS type_of_substrate,
-                    MAX(CASE WHEN ppf.name = 'Collection' THEN ttd.value END) AS collection,
-                    MAX(CASE WHEN ppf.name = 'Sample Type' THEN ttd.value END) AS sample_type,
-                    MAX(CASE WHEN ppf.name = 'Quantity requirement' THEN ttd.value END) AS quantity_requirement,
-                    MAX(CASE WHEN ppf.name = 'Requester name' THEN ttd.value END) AS requester_name,
-                    MAX(CASE WHEN ppf.name = 'Deadline request' THEN ttd.value END) AS deadline_request,
-                    MAX(CASE WHEN ppf.name = 'Sampler' THEN uu_sampler.username END) AS sampler,
-                    MAX(CASE WHEN ppf.name = 'Sampler' THEN uu_sampler.id::text END) AS sampler_id,
-                    MAX(CASE WHEN ppf.name = 'Type of paint' THEN ttd.value END) AS type_of_paint,
-                    MAX(CASE WHEN ppf.name = 'Finishing surface grain' THEN ttd.value END) AS finishing_surface_grain,       
-                    MAX(CASE WHEN ppf.name = 'Sheen level' THEN ttd.value END) AS sheen_level,       
-                    MAX(CASE WHEN ppf.name = 'Substrate surface treatment' THEN ttd.value END) AS substrate_surface_treatment,
-                    MAX(CASE WHEN ppf.name = 'Panel category' THEN ttd.value END) AS panel_category,
-                    MAX(CASE WHEN ppf.name = 'Purpose of usage' THEN ttd.value END) AS purpose_of_usage,
-                    MAX(CASE WHEN ppf.name = 'Additional detail' THEN ttd.value END) AS additional_detail
-                FROM task_task tt
+                    {SP_SNAPSHOT_COLUMNS}
+                FROM task_tasksnapshot ts
+                    JOIN task_task tt ON ts.task_id = tt.id
                     JOIN workflow_engine_state wes ON tt.state_id = wes.id
                     JOIN user_user uu ON tt.created_by_id = uu.id
-                    JOIN task_taskdata ttd ON tt.id = ttd.task_id
-                    JOIN process_processfield ppf ON ttd.field_id = ppf.id
-                    LEFT JOIN user_user uu_sampler ON ttd.value = uu_sampler.id::text AND ppf.name = 'Sampler'
+                    LEFT JOIN user_user uu_sampler ON ts.data->>'Sampler' = uu_sampler.id::text
                 WHERE tt.title LIKE 'SP%%' 
                     AND tt.created_at >= '2025-08-29'
-                GROUP BY tt.id, tt.created_at::date, tt.title, uu.username, {wes_name}, wes.state_type
             )
         """
 
@@ -286,6 +569,9 @@ def get(self, request):
             ORDER BY title
         """
 
+        if stream_format:
+            return stream_query_response(query, query_params, stream_format, 'sample-requests')
+
         with connection.cursor() as cursor:                
             cursor.execute(query, query_params)  # Pass parameters separately
             columns = [col[0] for col in cursor.description]
@@ -317,16 +603,14 @@ def get(self, request):
             WITH task_data AS (
                 SELECT 
                     tt.id,
-                    MAX(CASE WHEN ppf.name = 'Name of customer' THEN ttd.value END) AS factory_code,
-                    MAX(CASE WHEN ppf.name = 'Quantity requirement' THEN ttd.value END) AS quantity
-                FROM task_task tt
+                    ts.data->>'Name of customer' AS factory_code,
+                    ts.data->>'Quantity requirement' AS quantity
+                FROM task_tasksnapshot ts
+                    JOIN task_task tt ON ts.task_id = tt.id
                     JOIN workflow_engine_state wes ON tt.state_id = wes.id
-                    JOIN task_taskdata ttd ON tt.id = ttd.task_id
-                    JOIN process_processfield ppf ON ttd.field_id = ppf.id
                 WHERE tt.title LIKE 'SP%%' 
                     AND tt.created_at >= '2025-08-29'
                     {where_clause}
-                GROUP BY tt.id
             )
             SELECT 
                 factory_code,
@@ -335,13 +619,16 @@ def get(self, request):
             GROUP BY factory_code
         """
 
-        with connection.cursor() as cursor:
-            cursor.execute(query, query_params)
-            columns = [col[0] for col in cursor.description]
-            rows = cursor.fetchall()
-            
-            results = [dict(zip(columns, row)) for row in rows]
-            return Response(results, status=status.HTTP_200_OK)
+        def run():
+            with connection.cursor() as cursor:
+                cursor.execute(query, query_params)
+                columns = [col[0] for col in cursor.description]
+                rows = cursor.fetchall()
+
+                return [dict(zip(columns, row)) for row in rows]
+
+        results = cached_report('sample_by_factory', {'state_type__in': sorted(query_params)}, ['SP'], run)
+        return Response(results, status=status.HTTP_200_OK)
 
 
 class TaskDataDetailView(APIView):
@@ -361,33 +648,13 @@ def get(self, request, task_id):
                     uu.username AS created_by,
                     {wes_name} AS state,
                     wes.state_type AS state_type,
-                    MAX(CASE WHEN ppf.name = 'Name of customer' THEN ttd.value END) AS factory_code,
-                    MAX(CASE WHEN ppf.name = 'Finishing code' THEN ttd.value END) AS finishing_code,
-                    MAX(CASE WHEN ppf.name = 'Retailer' THEN ttd.value END) AS retailer_id,
-                    MAX(CASE WHEN ppf.name = 'Customer''s color name' THEN ttd.value END) AS customer_color_name,
-                    MAX(CASE WHEN ppf.name = 'Type of substrate' THEN ttd.value END) AS type_of_substrate,
-                    MAX(CASE WHEN ppf.name = 'Collection' THEN ttd.value END) AS collection,
-                    MAX(CASE WHEN ppf.name = 'Sample Type' THEN ttd.value END) AS sample_type,
-                    MAX(CASE WHEN ppf.name = 'Quantity requirement' THEN ttd.value END) AS quantity_requirement,
-                    MAX(CASE WHEN ppf.name = 'Requester name' THEN ttd.value END) AS requester_name,
-                    MAX(CASE WHEN ppf.name = 'Deadline request' THEN ttd.value END) AS deadline_request,
-                    MAX(CASE WHEN ppf.name = 'Sampler' THEN uu_sampler.username END) AS sampler,
-                    MAX(CASE WHEN ppf.name = 'Sampler' THEN uu_sampler.id::text END) AS sampler_id,
-                    MAX(CASE WHEN ppf.name = 'Type of paint' THEN ttd.value END) AS type_of_paint,
-                    MAX(CASE WHEN ppf.name = 'Finishing surface grain' THEN ttd.value END) AS finishing_surface_grain,       
-                    MAX(CASE WHEN ppf.name = 'Sheen level' THEN ttd.value END) AS sheen_level,       
-                    MAX(CASE WHEN ppf.name = 'Substrate surface treatment' THEN ttd.value END) AS substrate_surface_treatment,
-                    MAX(CASE WHEN ppf.name = 'Panel category' THEN ttd.value END) AS panel_category,
-                    MAX(CASE WHEN ppf.name = 'Purpose of usage' THEN ttd.value END) AS purpose_of_usage,
-                    MAX(CASE WHEN ppf.name = 'Additional detail' THEN ttd.value END) AS additional_detail
-                FROM task_task tt
+                    {SP_SNAPSHOT_COLUMNS}
+                FROM task_tasksnapshot ts
+                    JOIN task_task tt ON ts.task_id = tt.id
                     JOIN workflow_engine_state wes ON tt.state_id = wes.id
                     JOIN user_user uu ON tt.created_by_id = uu.id
-                    JOIN task_taskdata ttd ON tt.id = ttd.task_id
-                    JOIN process_processfield ppf ON ttd.field_id = ppf.id
-                    LEFT JOIN user_user uu_sampler ON ttd.value = uu_sampler.id::text AND ppf.name = 'Sampler'
+                    LEFT JOIN user_user uu_sampler ON ts.data->>'Sampler' = uu_sampler.id::text
                 WHERE tt.id = %s AND tt.title LIKE 'SP%%' 
-                GROUP BY tt.id, tt.created_at::date, tt.title, uu.username, {wes_name}, wes.state_type
             )
             SELECT * FROM task_data
         """
@@ -410,43 +677,51 @@ def get(self, request, task_id):
 class TaskActionDetailView(APIView):
     
     @extend_schema(
+        parameters=[STREAM_PARAMETER],
         responses=TaskActionDetailSerializer(many=True),
     )
     def get(self, request):
+        stream_format = get_stream_format(request)
         wes_name = get_localized_column('wes.name')
         pa_name = get_localized_column('pa.name')
         sp_prefix = 'SP%'
+        query = f"""
+            SELECT 
+                tt.id as task_id,
+                tt.title, 
+                tt.created_at, 
+                uu.username AS created_by,
+                {wes_name} AS state,
+                wes.state_type AS state_type,
+                {pa_name} AS action, 
+                pa.action_type as action_type,
+                uu2.username AS action_created_by, 
+                ttal.created_at AS action_created_at, 
+                ttal.comment,
+                CASE 
+                    WHEN LAG(ttal.created_at) OVER (PARTITION BY tt.id ORDER BY ttal.created_at) IS NULL 
+                    THEN ttal.created_at - tt.created_at
+                    WHEN LEAD(ttal.created_at) OVER (PARTITION BY tt.id ORDER BY ttal.created_at) IS NULL 
+                        AND pa.action_type != 'close'
+                    THEN NOW() - ttal.created_at
+                    ELSE LEAD(ttal.created_at) OVER (PARTITION BY tt.id ORDER BY ttal.created_at) - ttal.created_at
+                END AS duration
+            FROM task_task tt
+                JOIN workflow_engine_state wes ON tt.state_id = wes.id
+                JOIN user_user uu ON tt.created_by_id = uu.id
+                JOIN task_taskactionlog ttal ON tt.id = ttal.task_id
+                JOIN process_action pa ON ttal.action_id = pa.id
+                JOIN user_user uu2 ON ttal.user_id = uu2.id
+            WHERE tt.title LIKE %(prefix)s
+            ORDER BY tt.title, action_created_at
+        """
+        params = {'prefix': sp_prefix}
+
+        if stream_format:
+            return stream_query_response(query, params, stream_format, 'task-actions')
+
         with connection.cursor() as cursor:
-            cursor.execute(f"""
-                SELECT 
-                    tt.id as task_id,
-                    tt.title, 
-                    tt.created_at, 
-                    uu.username AS created_by,
-                    {wes_name} AS state,
-                    wes.state_type AS state_type,
-                    {pa_name} AS action, 
-                    pa.action_type as action_type,
-                    uu2.username AS action_created_by, 
-                    ttal.created_at AS action_created_at, 
-                    ttal.comment,
-                    CASE 
-                        WHEN LAG(ttal.created_at) OVER (PARTITION BY tt.id ORDER BY ttal.created_at) IS NULL 
-                        THEN ttal.created_at - tt.created_at
-                        WHEN LEAD(ttal.created_at) OVER (PARTITION BY tt.id ORDER BY ttal.created_at) IS NULL 
-                            AND pa.action_type != 'close'
-                        THEN NOW() - ttal.created_at
-                        ELSE LEAD(ttal.created_at) OVER (PARTITION BY tt.id ORDER BY ttal.created_at) - ttal.created_at
-                    END AS duration
-                FROM task_task tt
-                    JOIN workflow_engine_state wes ON tt.state_id = wes.id
-                    JOIN user_user uu ON tt.created_by_id = uu.id
-                    JOIN task_taskactionlog ttal ON tt.id = ttal.task_id
-                    JOIN process_action pa ON ttal.action_id = pa.id
-                    JOIN user_user uu2 ON ttal.user_id = uu2.id
-                WHERE tt.title LIKE %(prefix)s
-                ORDER BY tt.title, action_created_at;
-            """, {'prefix': sp_prefix})
+            cursor.execute(query, params)
             columns = [col[0] for col in cursor.description]
             results = [dict(zip(columns, row)) for row in cursor.fetchall()]
 
@@ -472,133 +747,128 @@ def get(self, request):
                 {"error": "Invalid date format. Use YYYY-MM-DD"}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
-        ta_prefix = 'TA%'
-        with connection.cursor() as cursor:
-            cursor.execute("""
-                WITH transfer_absence AS (
-                    SELECT
-                        MAX(CASE WHEN ppf.name = 'Name of customer' THEN ttd.value END) AS factory_code,
-                        MAX(CASE WHEN ppf.name = 'username' THEN ttd.value END) AS user_id,
-                        MAX(CASE WHEN ppf.name = 'Transfer type' THEN ttd.value END) AS transfer_type,
-                        MAX(CASE WHEN ppf.name = 'From date' THEN ttd.value END) AS from_date,
-                        MAX(CASE WHEN ppf.name = 'To date' THEN ttd.value END) AS to_date,
-                        MAX(CASE WHEN ppf.name = 'Reason' THEN ttd.value END) AS reason
-                    FROM task_task tt
-                    JOIN task_taskdata ttd ON tt.id = ttd.task_id
-                    JOIN process_processfield ppf ON ttd.field_id = ppf.id
-                    WHERE tt.title LIKE %(prefix)s
-                    GROUP BY tt.id
-                    HAVING
-                        MAX(CASE WHEN ppf.name = 'From date' THEN ttd.value END) <= %(date)s
-                        AND MAX(CASE WHEN ppf.name = 'To date' THEN ttd.value END) >= %(date)s
-                ),
-                onsite_list AS (
-                    SELECT ufo.factory, ufo.user_id, ud."name" AS dept_name
-                    FROM user_userfactoryonsite ufo
-                    JOIN user_user uu ON ufo.user_id = uu.id
-                    JOIN user_department ud ON uu.department_id = ud.id
-                    WHERE ufo.year = EXTRACT(YEAR FROM %(date)s::date) 
-                        AND ufo.month = EXTRACT(MONTH FROM %(date)s::date)
-                        AND uu.is_active = true
-                ),
-                grouped_data AS (
-                    SELECT factory, dept_name, COUNT(user_id) AS count_users
-                    FROM onsite_list
-                    GROUP BY factory, dept_name
-                ),
-                factory_onsite AS (
-                    SELECT
-                        factory,
-                        COALESCE(SUM(CASE WHEN dept_name = 'KTW' THEN count_users END), 0) AS KTW,
-                        COALESCE(SUM(CASE WHEN dept_name = 'KTC' THEN count_users END), 0) AS KTC,
-                        COALESCE(SUM(CASE WHEN dept_name = 'KVN' THEN count_users END), 0) AS KVN,
-                        COALESCE(SUM(CASE WHEN dept_name = 'TT' THEN count_users END), 0) AS TT
-                    FROM grouped_data
-                    GROUP BY factory
-                ),
-                -- Get all factories from both onsite and transfer data
-                all_factories AS (
-                    SELECT DISTINCT factory FROM factory_onsite
-                    UNION
-                    SELECT DISTINCT factory_code FROM transfer_absence WHERE factory_code IS NOT NULL AND factory_code != ''
-                ),
-                -- Transfer and absence analysis CTEs
-                transfer_onsite_list AS (
-                    SELECT ufo.user_id, ufo.factory, ufo."year", ufo."month"
-                    FROM user_userfactoryonsite ufo
-                    WHERE ufo.year = EXTRACT(YEAR FROM %(date)s::date) 
-                        AND ufo.month = EXTRACT(MONTH FROM %(date)s::date)
-                ),
-                factory_change_list AS (
-                    SELECT ta.user_id, ol.factory factory_onsite, ta.factory_code AS factory_change, ta.transfer_type
-                    FROM transfer_absence ta
-                    LEFT JOIN transfer_onsite_list ol ON ta.user_id = ol.user_id::text
-                ),
-                user_info AS (
-                    SELECT uu.id, ud.name AS dept_name
-                    FROM user_user uu
-                    JOIN user_department ud ON uu.department_id = ud.id
-                ),
-                factory_combined AS (
-                    SELECT factory_onsite, factory_change, transfer_type, fcl.user_id, dept_name
-                    FROM factory_change_list fcl
-                    JOIN user_info ui ON fcl.user_id = ui.id::text
-                ),
-                factory_movements AS (
-                    SELECT 
-                        af.factory,
-                        -- Incoming transfers by department
-                        COALESCE(SUM(CASE WHEN fc.factory_change = af.factory AND fc.transfer_type = '調動 ĐIỀU ĐỘNG' AND fc.dept_name = 'KTW' THEN 1 END), 0) AS KTW_in,
-                        COALESCE(SUM(CASE WHEN fc.factory_change = af.factory AND fc.transfer_type = '調動 ĐIỀU ĐỘNG' AND fc.dept_name = 'KTC' THEN 1 END), 0) AS KTC_in,
-                        COALESCE(SUM(CASE WHEN fc.factory_change = af.factory AND fc.transfer_type = '調動 ĐIỀU ĐỘNG' AND fc.dept_name = 'KVN' THEN 1 END), 0) AS KVN_in,
-                        COALESCE(SUM(CASE WHEN fc.factory_change = af.factory AND fc.transfer_type = '調動 ĐIỀU ĐỘNG' AND fc.dept_name = 'TT' THEN 1 END), 0) AS TT_in,
+        pivot_sql, params = TRANSFER_ABSENCE_PIVOT.sql()
+        params['date'] = date
+        def run():
+            with connection.cursor() as cursor:
+                cursor.execute(f"""
+                    WITH transfer_absence AS (
+                        SELECT * FROM ({pivot_sql}) ta_pivot
+                        WHERE from_date <= %(date)s
+                            AND to_date >= %(date)s
+                    ),
+                    onsite_list AS (
+                        SELECT ufo.factory, ufo.user_id, ud."name" AS dept_name
+                        FROM user_userfactoryonsite ufo
+                        JOIN user_user uu ON ufo.user_id = uu.id
+                        JOIN user_department ud ON uu.department_id = ud.id
+                        WHERE ufo.year = EXTRACT(YEAR FROM %(date)s::date) 
+                            AND ufo.month = EXTRACT(MONTH FROM %(date)s::date)
+                            AND uu.is_active = true
+                    ),
+                    grouped_data AS (
+                        SELECT factory, dept_name, COUNT(user_id) AS count_users
+                        FROM onsite_list
+                        GROUP BY factory, dept_name
+                    ),
+                    factory_onsite AS (
+                        SELECT
+                            factory,
+                            COALESCE(SUM(CASE WHEN dept_name = 'KTW' THEN count_users END), 0) AS KTW,
+                            COALESCE(SUM(CASE WHEN dept_name = 'KTC' THEN count_users END), 0) AS KTC,
+                            COALESCE(SUM(CASE WHEN dept_name = 'KVN' THEN count_users END), 0) AS KVN,
+                            COALESCE(SUM(CASE WHEN dept_name = 'TT' THEN count_users END), 0) AS TT
+                        FROM grouped_data
+                        GROUP BY factory
+                    ),
+                    -- Get all factories from both onsite and transfer data
+                    all_factories AS (
+                        SELECT DISTINCT factory FROM factory_onsite
+                        UNION
+                        SELECT DISTINCT factory_code FROM transfer_absence WHERE factory_code IS NOT NULL AND factory_code != ''
+                    ),
+                    -- Transfer and absence analysis CTEs
+                    transfer_onsite_list AS (
+                        SELECT ufo.user_id, ufo.factory, ufo."year", ufo."month"
+                        FROM user_userfactoryonsite ufo
+                        WHERE ufo.year = EXTRACT(YEAR FROM %(date)s::date) 
+                            AND ufo.month = EXTRACT(MONTH FROM %(date)s::date)
+                    ),
+                    factory_change_list AS (
+                        SELECT ta.user_id, ol.factory factory_onsite, ta.factory_code AS factory_change, ta.transfer_type
+                        FROM transfer_absence ta
+                        LEFT JOIN transfer_onsite_list ol ON ta.user_id = ol.user_id::text
+                    ),
+                    user_info AS (
+                        SELECT uu.id, ud.name AS dept_name
+                        FROM user_user uu
+                        JOIN user_department ud ON uu.department_id = ud.id
+                    ),
+                    factory_combined AS (
+                        SELECT factory_onsite, factory_change, transfer_type, fcl.user_id, dept_name
+                        FROM factory_change_list fcl
+                        JOIN user_info ui ON fcl.user_id = ui.id::text
+                    ),
+                    factory_movements AS (
+                        SELECT 
+                            af.factory,
+                            -- Incoming transfers by department
+                            COALESCE(SUM(CASE WHEN fc.factory_change = af.factory AND fc.transfer_type = '調動 ĐIỀU ĐỘNG' AND fc.dept_name = 'KTW' THEN 1 END), 0) AS KTW_in,
+                            COALESCE(SUM(CASE WHEN fc.factory_change = af.factory AND fc.transfer_type = '調動 ĐIỀU ĐỘNG' AND fc.dept_name = 'KTC' THEN 1 END), 0) AS KTC_in,
+                            COALESCE(SUM(CASE WHEN fc.factory_change = af.factory AND fc.transfer_type = '調動 ĐIỀU ĐỘNG' AND fc.dept_name = 'KVN' THEN 1 END), 0) AS KVN_in,
+                            COALESCE(SUM(CASE WHEN fc.factory_change = af.factory AND fc.transfer_type = '調動 ĐIỀU ĐỘNG' AND fc.dept_name = 'TT' THEN 1 END), 0) AS TT_in,
                         
-                        -- Outgoing transfers by department
-                        COALESCE(SUM(CASE WHEN fc.factory_onsite = af.factory AND fc.transfer_type = '調動 ĐIỀU ĐỘNG' AND fc.dept_name = 'KTW' AND fc.factory_change IS NOT NULL AND fc.factory_change != '' THEN 1 END), 0) AS KTW_out,
-                        COALESCE(SUM(CASE WHEN fc.factory_onsite = af.factory AND fc.transfer_type = '調動 ĐIỀU ĐỘNG' AND fc.dept_name = 'KTC' AND fc.factory_change IS NOT NULL AND fc.factory_change != '' THEN 1 END), 0) AS KTC_out,
-                        COALESCE(SUM(CASE WHEN fc.factory_onsite = af.factory AND fc.transfer_type = '調動 ĐIỀU ĐỘNG' AND fc.dept_name = 'KVN' AND fc.factory_change IS NOT NULL AND fc.factory_change != '' THEN 1 END), 0) AS KVN_out,
-                        COALESCE(SUM(CASE WHEN fc.factory_onsite = af.factory AND fc.transfer_type = '調動 ĐIỀU ĐỘNG' AND fc.dept_name = 'TT' AND fc.factory_change IS NOT NULL AND fc.factory_change != '' THEN 1 END), 0) AS TT_out,
+                            -- Outgoing transfers by department
+                            COALESCE(SUM(CASE WHEN fc.factory_onsite = af.factory AND fc.transfer_type = '調動 ĐIỀU ĐỘNG' AND fc.dept_name = 'KTW' AND fc.factory_change IS NOT NULL AND fc.factory_change != '' THEN 1 END), 0) AS KTW_out,
+                            COALESCE(SUM(CASE WHEN fc.factory_onsite = af.factory AND fc.transfer_type = '調動 ĐIỀU ĐỘNG' AND fc.dept_name = 'KTC' AND fc.factory_change IS NOT NULL AND fc.factory_change != '' THEN 1 END), 0) AS KTC_out,
+                            COALESCE(SUM(CASE WHEN fc.factory_onsite = af.factory AND fc.transfer_type = '調動 ĐIỀU ĐỘNG' AND fc.dept_name = 'KVN' AND fc.factory_change IS NOT NULL AND fc.factory_change != '' THEN 1 END), 0) AS KVN_out,
+                            COALESCE(SUM(CASE WHEN fc.factory_onsite = af.factory AND fc.transfer_type = '調動 ĐIỀU ĐỘNG' AND fc.dept_name = 'TT' AND fc.factory_change IS NOT NULL AND fc.factory_change != '' THEN 1 END), 0) AS TT_out,
                         
-                        -- Absences by department
-                        COALESCE(SUM(CASE WHEN fc.factory_onsite = af.factory AND fc.transfer_type IN ('CL底薪假', '請假 NGHỈ PHÉP') AND fc.dept_name = 'KTW' THEN 1 END), 0) AS KTW_absence,
-                        COALESCE(SUM(CASE WHEN fc.factory_onsite = af.factory AND fc.transfer_type IN ('CL底薪假', '請假 NGHỈ PHÉP') AND fc.dept_name = 'KTC' THEN 1 END), 0) AS KTC_absence,
-                        COALESCE(SUM(CASE WHEN fc.factory_onsite = af.factory AND fc.transfer_type IN ('CL底薪假', '請假 NGHỈ PHÉP') AND fc.dept_name = 'KVN' THEN 1 END), 0) AS KVN_absence,
-                        COALESCE(SUM(CASE WHEN fc.factory_onsite = af.factory AND fc.transfer_type IN ('CL底薪假', '請假 NGHỈ PHÉP') AND fc.dept_name = 'TT' THEN 1 END), 0) AS TT_absence
-                    FROM all_factories af
-                    LEFT JOIN factory_combined fc ON (af.factory = fc.factory_onsite OR af.factory = fc.factory_change)
-                    GROUP BY af.factory
-                )
-                -- Final result combining onsite counts with movements
-                SELECT 
-                    COALESCE(fo.factory, fm.factory) as factory_code,
-                    -- Current onsite counts
-                    COALESCE(fo.KTW, 0) AS KTW_onsite,
-                    COALESCE(fo.KTC, 0) AS KTC_onsite, 
-                    COALESCE(fo.KVN, 0) AS KVN_onsite,
-                    COALESCE(fo.TT, 0) AS TT_onsite,
+                            -- Absences by department
+                            COALESCE(SUM(CASE WHEN fc.factory_onsite = af.factory AND fc.transfer_type IN ('CL底薪假', '請假 NGHỈ PHÉP') AND fc.dept_name = 'KTW' THEN 1 END), 0) AS KTW_absence,
+                            COALESCE(SUM(CASE WHEN fc.factory_onsite = af.factory AND fc.transfer_type IN ('CL底薪假', '請假 NGHỈ PHÉP') AND fc.dept_name = 'KTC' THEN 1 END), 0) AS KTC_absence,
+                            COALESCE(SUM(CASE WHEN fc.factory_onsite = af.factory AND fc.transfer_type IN ('CL底薪假', '請假 NGHỈ PHÉP') AND fc.dept_name = 'KVN' THEN 1 END), 0) AS KVN_absence,
+                            COALESCE(SUM(CASE WHEN fc.factory_onsite = af.factory AND fc.transfer_type IN ('CL底薪假', '請假 NGHỈ PHÉP') AND fc.dept_name = 'TT' THEN 1 END), 0) AS TT_absence
+                        FROM all_factories af
+                        LEFT JOIN factory_combined fc ON (af.factory = fc.factory_onsite OR af.factory = fc.factory_change)
+                        GROUP BY af.factory
+                    )
+                    -- Final result combining onsite counts with movements
+                    SELECT 
+                        COALESCE(fo.factory, fm.factory) as factory_code,
+                        -- Current onsite counts
+                        COALESCE(fo.KTW, 0) AS KTW_onsite,
+                        COALESCE(fo.KTC, 0) AS KTC_onsite, 
+                        COALESCE(fo.KVN, 0) AS KVN_onsite,
+                        COALESCE(fo.TT, 0) AS TT_onsite,
                     
-                    -- Transfer movements
-                    COALESCE(fm.KTW_in, 0) AS KTW_in,
-                    COALESCE(fm.KTC_in, 0) AS KTC_in,
-                    COALESCE(fm.KVN_in, 0) AS KVN_in,
-                    COALESCE(fm.TT_in, 0) AS TT_in,
-                    COALESCE(fm.KTW_out, 0) AS KTW_out,
-                    COALESCE(fm.KTC_out, 0) AS KTC_out,
-                    COALESCE(fm.KVN_out, 0) AS KVN_out,
-                    COALESCE(fm.TT_out, 0) AS TT_out,
+                        -- Transfer movements
+                        COALESCE(fm.KTW_in, 0) AS KTW_in,
+                        COALESCE(fm.KTC_in, 0) AS KTC_in,
+                        COALESCE(fm.KVN_in, 0) AS KVN_in,
+                        COALESCE(fm.TT_in, 0) AS TT_in,
+                        COALESCE(fm.KTW_out, 0) AS KTW_out,
+                        COALESCE(fm.KTC_out, 0) AS KTC_out,
+                        COALESCE(fm.KVN_out, 0) AS KVN_out,
+                        COALESCE(fm.TT_out, 0) AS TT_out,
                     
-                    -- Absences
-                    COALESCE(fm.KTW_absence, 0) AS KTW_absence,
-                    COALESCE(fm.KTC_absence, 0) AS KTC_absence,
-                    COALESCE(fm.KVN_absence, 0) AS KVN_absence,
-                    COALESCE(fm.TT_absence, 0) AS TT_absence
-                FROM factory_onsite fo
-                FULL OUTER JOIN factory_movements fm ON fo.factory = fm.factory
-                ORDER BY COALESCE(fo.factory, fm.factory);
-            """, {'date': date, 'prefix': ta_prefix})
+                        -- Absences
+                        COALESCE(fm.KTW_absence, 0) AS KTW_absence,
+                        COALESCE(fm.KTC_absence, 0) AS KTC_absence,
+                        COALESCE(fm.KVN_absence, 0) AS KVN_absence,
+                        COALESCE(fm.TT_absence, 0) AS TT_absence
+                    FROM factory_onsite fo
+                    FULL OUTER JOIN factory_movements fm ON fo.factory = fm.factory
+                    ORDER BY COALESCE(fo.factory, fm.factory);
+                """, params)
             
-            columns = [col[0] for col in cursor.description]
-            results = [dict(zip(columns, row)) for row in cursor.fetchall()]
+                columns = [col[0] for col in cursor.description]
+                results = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            return results
+
+        results = cached_report(
+            'onsite_transfer_absence', {'date': date}, ['TA', USER_FACTORY_ONSITE], run
+        )
 
         return Response(results, status=status.HTTP_200_OK)
     
@@ -639,15 +909,13 @@ def get(self, request):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        ta_prefix = 'TA%'
-        
         # Build the WHERE clause dynamically based on whether department is provided
         department_filter = ""
-        params = {
+        pivot_sql, params = TRANSFER_ABSENCE_PIVOT.sql()
+        params.update({
             'start_date': start_date, 
-            'end_date': end_date, 
-            'prefix': ta_prefix
-        }
+            'end_date': end_date,
+        })
         
         if department:
             department_filter = "AND ud.name IN %(department)s"
@@ -655,21 +923,7 @@ def get(self, request):
         
         with connection.cursor() as cursor:
             cursor.execute(f"""
-                WITH transfer_absence AS (
-                    SELECT
-                        tt.id as task_id,
-                        MAX(CASE WHEN ppf.name = 'Name of customer' THEN ttd.value END) AS factory_code,
-                        MAX(CASE WHEN ppf.name = 'username' THEN ttd.value END) AS user_id,
-                        MAX(CASE WHEN ppf.name = 'Transfer type' THEN ttd.value END) AS transfer_type,
-                        MAX(CASE WHEN ppf.name = 'From date' THEN ttd.value END) AS from_date,
-                        MAX(CASE WHEN ppf.name = 'To date' THEN ttd.value END) AS to_date,
-                        MAX(CASE WHEN ppf.name = 'Reason' THEN ttd.value END) AS reason
-                    FROM task_task tt
-                    JOIN task_taskdata ttd ON tt.id = ttd.task_id
-                    JOIN process_processfield ppf ON ttd.field_id = ppf.id
-                    WHERE tt.title LIKE %(prefix)s
-                    GROUP BY tt.id
-                ),
+                WITH transfer_absence AS ({pivot_sql}),
                 onsite as (
                     SELECT DISTINCT user_id as user_id_onsite, factory as factory_code_onsite
                     FROM user_userfactoryonsite
@@ -726,54 +980,51 @@ def get(self, request):
                 {"error": "start_date must be before or equal to end_date"}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
-        dr_prefix = 'DR%'
-        with connection.cursor() as cursor:
-            cursor.execute("""
-                SELECT 
-                    tt.id as task_id,
-                    MAX(CASE WHEN ppf.name = 'Name of customer' THEN ttd.value END) AS factory_code,
-                    MAX(CASE WHEN ppf.name = 'Weekday overtime' THEN ttd.value END) AS weekday_ot,
-                    MAX(CASE WHEN ppf.name = 'Overtime start time today' THEN ttd.value END) AS weekday_ot_start,
-                    MAX(CASE WHEN ppf.name = 'Overtime end time today' THEN ttd.value END) AS weekday_ot_end,
-                    MAX(CASE WHEN ppf.name = 'Number of overtime workers today' THEN ttd.value END) AS weekday_ot_num,
-                    MAX(CASE WHEN ppf.name = 'Hanging line today' THEN ttd.value END) AS hanging_line_today,
-                    MAX(CASE WHEN ppf.name = 'Pallet line today' THEN ttd.value END) AS pallet_line_today,
-                    MAX(CASE WHEN ppf.name = 'Others task today' THEN ttd.value END) AS others_today,
-                    MAX(CASE WHEN ppf.name = 'Hanging line tomorrow' THEN ttd.value END) AS hanging_line_tomorrow,
-                    MAX(CASE WHEN ppf.name = 'Pallet line tomorrow' THEN ttd.value END) AS pallet_line_tomorrow,
-                    MAX(CASE WHEN ppf.name = 'Others task tomorrow' THEN ttd.value END) AS others_tomorrow,
-                    MAX(CASE WHEN ppf.name = 'Customer in stock status' THEN ttd.value END) AS instock,
-                    MAX(CASE WHEN ppf.name = 'Customer in stock status for each color code' THEN ttd.value END) AS instock_by_code,       
-                    MAX(CASE WHEN ppf.name = 'Sunday overtime' THEN ttd.value END) AS sunday_ot,       
-                    MAX(CASE WHEN ppf.name = 'Sunday overtime end time' THEN ttd.value END) AS sunday_ot_end,
-                    MAX(CASE WHEN ppf.name = 'Number of overtime workers sunday' THEN ttd.value END) AS sunday_ot_num,
-                    MAX(CASE WHEN ppf.name = 'Hanging line sunday' THEN ttd.value END) AS hanging_line_sunday,
-                    MAX(CASE WHEN ppf.name = 'Pallet line sunday' THEN ttd.value END) AS pallet_line_sunday,
-                    MAX(CASE WHEN ppf.name = 'Num of people' THEN ttd.value END) AS num_of_ppl,
-                    MAX(CASE WHEN ppf.name = 'Name of people' THEN ttd.value END) AS name_of_ppl,
+        only = parse_fields_param(request, OVERTIME_PIVOT, extra=['files'])
+        pivot_sql, params = OVERTIME_PIVOT.sql(
+            only=only,
+            where="AND DATE(tt.created_at) BETWEEN %(start_date)s AND %(end_date)s"
+        )
+        params.update({'start_date': start_date, 'end_date': end_date})
+
+        files_column = ""
+        if not only or 'files' in only:
+            files_column = """
                     COALESCE(
-                        json_agg(
-                            json_build_object(
-                                'url', ttfd.uploaded_file,
-                                'filename', ttfd.original_filename,
-                                'size', ttfd.file_size,
-                                'mime_type', ttfd.mime_type
+                        (
+                            SELECT json_agg(
+                                json_build_object(
+                                    'url', ttfd.uploaded_file,
+                                    'filename', ttfd.original_filename,
+                                    'size', ttfd.file_size,
+                                    'mime_type', ttfd.mime_type
+                                )
                             )
-                        ) FILTER (WHERE ttfd.id IS NOT NULL),
+                            FROM task_taskdata ttd
+                                JOIN task_taskfiledata ttfd ON ttd.id = ttfd.task_data_id
+                            WHERE ttd.task_id = ov.task_id
+                        ),
                         '[]'::json
-                    ) as files,
-                    tt.created_at 
-                FROM task_task tt
-                    JOIN task_taskdata ttd ON tt.id = ttd.task_id
-                    JOIN process_processfield ppf ON ttd.field_id = ppf.id
-                    LEFT JOIN task_taskfiledata ttfd ON ttd.id = ttfd.task_data_id
-                WHERE tt.title LIKE %(prefix)s
-                    AND DATE(tt.created_at) BETWEEN %(start_date)s AND %(end_date)s
-                GROUP BY tt.id, tt.created_at
-            """, {'start_date': start_date, 'end_date': end_date, 'prefix': dr_prefix})
+                    ) AS files,"""
+
+        def run():
+            with connection.cursor() as cursor:
+                cursor.execute(f"""
+                    WITH overtime AS ({pivot_sql})
+                    SELECT 
+                        ov.*,{files_column}
+                        tt.created_at 
+                    FROM overtime ov
+                        JOIN task_task tt ON ov.task_id = tt.id
+                """, params)
             
-            columns = [col[0] for col in cursor.description]
-            results = [dict(zip(columns, row)) for row in cursor.fetchall()]
+                columns = [col[0] for col in cursor.description]
+                results = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            return results
+
+        results = cached_report('overtime', {
+            'start_date': start_date, 'end_date': end_date, 'fields': sorted(only) if only else None,
+        }, ['DR'], run)
 
         domain = getattr(settings, 'DOMAIN_URL', '')
         for result in results:
@@ -803,56 +1054,47 @@ def get(self, request):
 
         created_by_id_list = created_by_id.split(',') if created_by_id else None
         
-        dm_prefix = 'DM%'
-        params = {
-            'prefix': dm_prefix,
+        only = parse_fields_param(request, DAILY_MOVEMENT_PIVOT)
+        pivot_sql, params = DAILY_MOVEMENT_PIVOT.sql(only=only | {'actual_date'} if only else None)
+        params.update({
             'year': year,
             'month': month,
             'created_by_id_list': created_by_id_list,
-        }
-        print(created_by_id_list)
-        with connection.cursor() as cursor:
-            cursor.execute(f"""
-                WITH daily_movement AS (
+        })
+        pivot_columns = ''.join(
+            f", dm.{alias}" for alias in DAILY_MOVEMENT_PIVOT.aliases(only) if alias != 'actual_date'
+        )
+        def run():
+            with connection.cursor() as cursor:
+                cursor.execute(f"""
+                    WITH daily_movement AS ({pivot_sql})
                     SELECT
                         tt.id task_id,
                         tt.title,
-                        CASE 
-                            WHEN MAX(CASE WHEN ppf.name = 'Actual date' THEN ttd.value END) IS NOT NULL 
-                                AND MAX(CASE WHEN ppf.name = 'Actual date' THEN ttd.value END) != '' 
-                            THEN MAX(CASE WHEN ppf.name = 'Actual date' THEN ttd.value END)::date
-                            ELSE tt.created_at::date
-                        END AS created_at,
-                        CONCAT(uu.last_name,' ', uu.first_name) AS created_by,
+                        COALESCE(dm.actual_date, tt.created_at::date) AS created_at,
                         tt.created_by_id,
+                        CONCAT(uu.last_name,' ', uu.first_name) AS created_by,
                         {wes_name} AS state,
-                        wes.state_type AS state_type,
-                        MAX(CASE WHEN ppf.name = 'Name of customer' THEN ttd.value END) AS factory_code,
-                        MAX(CASE WHEN ppf.name = 'Task type' THEN ttd.value END) AS task_type,
-                        MAX(CASE WHEN ppf.name = 'Task detail' THEN ttd.value END) AS task_detail,
-                        MAX(CASE WHEN ppf.name = 'Estimated completion date' THEN ttd.value END) AS estimated_completion_date,
-                        MAX(CASE WHEN ppf.name = 'Result' THEN ttd.value END) AS result
-                    FROM task_task tt
+                        wes.state_type AS state_type{pivot_columns}
+                    FROM daily_movement dm
+                        JOIN task_task tt ON dm.task_id = tt.id
                         JOIN workflow_engine_state wes ON tt.state_id = wes.id
                         JOIN user_user uu ON tt.created_by_id = uu.id
-                        JOIN task_taskdata ttd ON tt.id = ttd.task_id
-                        JOIN process_processfield ppf ON ttd.field_id = ppf.id
-                    WHERE tt.title LIKE %(prefix)s
-                    GROUP BY tt.id, tt.title, tt.created_at, tt.created_by_id, uu.last_name, uu.first_name, {wes_name}, wes.state_type
-                )
-                SELECT task_id, title, created_at, 
-                        created_by_id, created_by,
-                        state, state_type,
-                        factory_code, task_type, task_detail, estimated_completion_date, result
-                FROM daily_movement
-                WHERE EXTRACT(YEAR FROM created_at) = %(year)s
-                    AND EXTRACT(MONTH FROM created_at) = %(month)s
-                    AND (%(created_by_id_list)s::text[] IS NULL OR created_by_id::text = ANY(%(created_by_id_list)s))
-                ORDER BY created_at
-            """, params)
+                    WHERE EXTRACT(YEAR FROM COALESCE(dm.actual_date, tt.created_at::date)) = %(year)s
+                        AND EXTRACT(MONTH FROM COALESCE(dm.actual_date, tt.created_at::date)) = %(month)s
+                        AND (%(created_by_id_list)s::text[] IS NULL OR tt.created_by_id::text = ANY(%(created_by_id_list)s))
+                    ORDER BY created_at
+                """, params)
             
-            columns = [col[0] for col in cursor.description]
-            results = [dict(zip(columns, row)) for row in cursor.fetchall()]
+                columns = [col[0] for col in cursor.description]
+                results = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            return results
+
+        results = cached_report('daily_movement', {
+            'year': str(year), 'month': str(month),
+            'created_by_id': sorted(created_by_id_list) if created_by_id_list else None,
+            'fields': sorted(only) if only else None,
+        }, ['DM'], run)
 
         return Response(results, status=status.HTTP_200_OK)
     
@@ -865,45 +1107,34 @@ class CustomerEntryView(APIView):
     def get(self, request):
         wes_name = get_localized_column('wes.name')
         
-        dm_prefix = 'CE%'
-        params = {
-            'prefix': dm_prefix,
-        }
-        with connection.cursor() as cursor:
-            cursor.execute(f"""
-                WITH customer_entry AS (
+        only = parse_fields_param(request, CUSTOMER_ENTRY_PIVOT)
+        pivot_sql, params = CUSTOMER_ENTRY_PIVOT.sql(only=only)
+        pivot_columns = ''.join(f", ce.{alias}" for alias in CUSTOMER_ENTRY_PIVOT.aliases(only))
+        def run():
+            with connection.cursor() as cursor:
+                cursor.execute(f"""
+                    WITH customer_entry AS ({pivot_sql})
                     SELECT
                         tt.id task_id,
                         tt.title,
                         tt.created_at as created_at,
-                        CONCAT(uu.last_name,' ', uu.first_name) AS created_by,
                         tt.created_by_id,
+                        CONCAT(uu.last_name,' ', uu.first_name) AS created_by,
                         {wes_name} AS state,
-                        wes.state_type AS state_type,
-                        MAX(CASE WHEN ppf.name = 'Customer of Boss' THEN ttd.value END) AS customer_of_boss,
-                        MAX(CASE WHEN ppf.name = 'Name of customer' THEN ttd.value END) AS factory_code,
-                        MAX(CASE WHEN ppf.name = 'Note' THEN ttd.value END) AS note,
-                        MAX(CASE WHEN ppf.name = 'Licence plate' THEN ttd.value END) AS license_plate,
-                        MAX(CASE WHEN ppf.name = 'Driver name' THEN ttd.value END) AS drive_name,
-                        MAX(CASE WHEN ppf.name = 'Date' THEN ttd.value END) as scheduled_date,
-                        MAX(CASE WHEN ppf.name = 'Time' THEN ttd.value END) AS scheduled_time
-                    FROM task_task tt
+                        wes.state_type AS state_type{pivot_columns}
+                    FROM customer_entry ce
+                        JOIN task_task tt ON ce.task_id = tt.id
                         JOIN workflow_engine_state wes ON tt.state_id = wes.id
                         JOIN user_user uu ON tt.created_by_id = uu.id
-                        JOIN task_taskdata ttd ON tt.id = ttd.task_id
-                        JOIN process_processfield ppf ON ttd.field_id = ppf.id
-                    WHERE tt.title LIKE %(prefix)s
-                    GROUP BY tt.id, tt.title, tt.created_at, tt.created_by_id, uu.last_name, uu.first_name, {wes_name}, wes.state_type
-                    )
-                    SELECT task_id, title, created_at, 
-                        created_by_id, created_by,
-                        state, state_type,
-                        customer_of_boss, factory_code, note, license_plate, drive_name, scheduled_date, scheduled_time
-                    FROM customer_entry
                     ORDER BY created_at
-            """, params)
+                """, params)
             
-            columns = [col[0] for col in cursor.description]
-            results = [dict(zip(columns, row)) for row in cursor.fetchall()]
+                columns = [col[0] for col in cursor.description]
+                results = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            return results
+
+        results = cached_report(
+            'customer_entry', {'fields': sorted(only) if only else None}, ['CE'], run
+        )
 
         return Response(results, status=status.HTTP_200_OK)
\ No newline at end of file
@@ -2,6 +2,7 @@
 from pathlib import Path
 from dotenv import load_dotenv
 from datetime import timedelta
+from celery.schedules import crontab
 from firebase_admin import initialize_app
 
 load_dotenv()
@@ -223,6 +224,15 @@ def gettext_noop(s):
     "DELETE_INACTIVE_DEVICES": False,
 }
 
+# Push dispatch: transport class, retries of transient FCM errors and delivery log retention.
+# Set NOTIFICATION_TRANSPORT=task.notifications.StandInTransport with FCM_STANDIN_URL to use a local FCM stand-in
+NOTIFICATION_TRANSPORT = os.getenv("NOTIFICATION_TRANSPORT", "task.notifications.FirebaseTransport")
+FCM_STANDIN_URL = os.getenv("FCM_STANDIN_URL", "http://localhost:9099")
+NOTIFICATION_MAX_ATTEMPTS = 4
+NOTIFICATION_RETRY_BASE_DELAY = 5  # seconds, doubled on each retry
+NOTIFICATION_DELIVERY_RETENTION = 30  # days
+NOTIFICATION_COALESCE_WINDOW = int(os.getenv("NOTIFICATION_COALESCE_WINDOW", 30))  # seconds task events are buffered per user
+
 CACHES = {
     "default": {
         "BACKEND": "django_redis.cache.RedisCache",
@@ -236,4 +246,49 @@ def gettext_noop(s):
 CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL")
 CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND")
 
+CELERY_BEAT_SCHEDULE = {
+    'cleanup-upload-sessions': {
+        'task': 'task.tasks.cleanup_upload_sessions',
+        'schedule': 60 * 60,
+    },
+    'reconcile-task-counters': {
+        'task': 'task.tasks.reconcile_task_counters',
+        'schedule': 15 * 60,
+    },
+    'cleanup-notification-deliveries': {
+        'task': 'task.tasks.cleanup_notification_deliveries',
+        'schedule': 24 * 60 * 60,
+    },
+    'send-notification-digests': {
+        'task': 'task.tasks.send_notification_digests',
+        'schedule': crontab(minute=0),
+    },
+    'relay-outbox-events': {
+        'task': 'task.tasks.relay_outbox_events',
+        'schedule': 2,
+    },
+    'cleanup-outbox-events': {
+        'task': 'task.tasks.cleanup_outbox_events',
+        'schedule': 24 * 60 * 60,
+    },
+}
+
+# Chunked uploads: partial files live outside MEDIA_ROOT until completed
+UPLOAD_SESSION_DIR = os.getenv("UPLOAD_SESSION_DIR", os.path.join(BASE_DIR, 'upload_sessions'))
+UPLOAD_SESSION_TTL = 24 * 60 * 60  # seconds of inactivity before a session is discarded
+UPLOAD_CHUNK_MAX_SIZE = 10 * 1024 * 1024
+
+# Transactional outbox: workflow events are relayed to subscribers by a beat task
+OUTBOX_BATCH_SIZE = 200
+OUTBOX_RELAY_MAX_BATCHES = 10  # per relay run
+OUTBOX_MAX_ATTEMPTS = 10
+OUTBOX_RETRY_BASE_DELAY = 5  # seconds, doubled on each retry
+OUTBOX_RETRY_MAX_DELAY = 60 * 60  # seconds
+OUTBOX_RETENTION = 7  # days relayed events are kept
+
+# Raw-SQL report results, invalidated by per-process data versions; the timeout
+# bounds staleness from tables that are not versioned (users, departments)
+REPORT_CACHE_TIMEOUT = 10 * 60
+REPORT_CACHE_LOCK_WAIT = 10  # seconds a request waits for a concurrent computation
+
 DOMAIN_URL = os.getenv("DOMAIN_URL")
\ No newline at end of file
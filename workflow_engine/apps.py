@@ -4,3 +4,6 @@
 class WorkflowEngineConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'workflow_engine'
+
+    def ready(self):
+        import workflow_engine.signals
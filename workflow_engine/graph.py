@@ -0,0 +1,107 @@
+import logging
+import threading
+import uuid
+from django.core.cache import cache
+from redis.exceptions import RedisError
+from .models import ActionTransition
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'workflow_graph:version:{process_id}'
+GRAPH_KEY = 'workflow_graph:{process_id}:{version}'
+GRAPH_TIMEOUT = 60 * 60 * 24
+
+
+class WorkflowGraph:
+    """
+    Compiled transition graph of one Process.
+
+    Maps (state, action) to the transition taken and state to the set of
+    actions leaving it, so workflow checks are dict lookups instead of joins
+    over Transition/ActionTransition.
+
+    Graphs are kept per worker process and shared through Redis under a
+    version token per process. The token is replaced with a fresh one on
+    every Transition/ActionTransition change, or when Redis has lost it; a
+    worker rebuilds or re-fetches its graph when the token moves.
+    """
+
+    _local = {}
+    _lock = threading.Lock()
+
+    def __init__(self, process_id, version, edges):
+        self.process_id = process_id
+        self.version = version
+        # (current_state_id, action_id) -> (transition_id, next_state_id)
+        self.edges = edges
+        self.actions_by_state = {}
+        for state_id, action_id in edges:
+            self.actions_by_state.setdefault(state_id, set()).add(action_id)
+
+    def next_transition(self, state_id, action_id):
+        """(transition_id, next_state_id) for the action from the state, or None"""
+        return self.edges.get((str(state_id), str(action_id)))
+
+    def actions_from(self, state_id):
+        """Ids of actions that can be taken from the state"""
+        return self.actions_by_state.get(str(state_id), set())
+
+    @classmethod
+    def for_process(cls, process_id):
+        process_id = str(process_id)
+        try:
+            version = cls._version(process_id)
+
+            graph = cls._local.get(process_id)
+            if graph is not None and graph.version == version:
+                return graph
+
+            graph_key = GRAPH_KEY.format(process_id=process_id, version=version)
+            edges = cache.get(graph_key)
+            if edges is None:
+                edges = cls._load_edges(process_id)
+                cache.set(graph_key, edges, GRAPH_TIMEOUT)
+        except RedisError as e:
+            # Without the version the local graph may be stale: build from the
+            # database and keep it out of the local cache
+            logger.warning(f"Workflow graph cache unavailable, loading process {process_id} - {str(e)}")
+            return cls(process_id, None, cls._load_edges(process_id))
+
+        graph = cls(process_id, version, edges)
+        with cls._lock:
+            cls._local[process_id] = graph
+        return graph
+
+    @classmethod
+    def invalidate(cls, process_id):
+        """Replace the process version token so every worker drops its compiled graph"""
+        process_id = str(process_id)
+        try:
+            cache.set(VERSION_KEY.format(process_id=process_id), uuid.uuid4().hex, None)
+        except RedisError as e:
+            # Runs after commit; other workers keep their graph until the token moves
+            logger.error(f"Workflow graph version bump failed for process {process_id} - {str(e)}")
+        with cls._lock:
+            cls._local.pop(process_id, None)
+
+    @staticmethod
+    def _version(process_id):
+        version_key = VERSION_KEY.format(process_id=process_id)
+        version = cache.get(version_key)
+        if version is None:
+            # A lost token is never recreated with a known value, so graphs
+            # cached under an earlier token cannot be picked up again
+            cache.add(version_key, uuid.uuid4().hex, None)
+            version = cache.get(version_key)
+        return version
+
+    @staticmethod
+    def _load_edges(process_id):
+        rows = ActionTransition.objects.filter(
+            transition__process_id=process_id
+        ).values_list('transition__current_state_id', 'action_id', 'transition_id', 'transition__next_state_id')
+
+        return {
+            (str(current_state_id), str(action_id)): (str(transition_id), str(next_state_id))
+            for current_state_id, action_id, transition_id, next_state_id in rows
+        }
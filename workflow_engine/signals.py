@@ -0,0 +1,29 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .graph import WorkflowGraph
+from .models import ActionTransition, Transition
+
+
+def _invalidate_on_commit(process_id):
+    transaction.on_commit(lambda: WorkflowGraph.invalidate(process_id))
+
+
+@receiver(post_save, sender=Transition)
+@receiver(post_delete, sender=Transition)
+def invalidate_graph_on_transition_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    _invalidate_on_commit(instance.process_id)
+
+
+@receiver(post_save, sender=ActionTransition)
+@receiver(post_delete, sender=ActionTransition)
+def invalidate_graph_on_action_transition_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    process_id = Transition.objects.filter(
+        pk=instance.transition_id
+    ).values_list('process_id', flat=True).first()
+    if process_id:
+        _invalidate_on_commit(process_id)
@@ -1,3 +1,59 @@
+from unittest import mock
 from django.test import TestCase
+from redis.exceptions import RedisError
+from process.models import Action, ActionType, Process
+from .graph import WorkflowGraph, cache
+from .models import ActionTransition, State, StateType, Transition
 
-# Create your tests here.
+
+class WorkflowGraphTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.process = Process.objects.create(name='Sample request', version='1', prefix='SR', is_active=True)
+        cls.start = State.objects.create(name='Start', state_type=StateType.START)
+        cls.closed = State.objects.create(name='Closed', state_type=StateType.CLOSED)
+        cls.approve = Action.objects.create(
+            name='Approve', description='', action_type=ActionType.APPROVE, process=cls.process
+        )
+        cls.transition = Transition.objects.create(
+            process=cls.process, current_state=cls.start, next_state=cls.closed
+        )
+        ActionTransition.objects.create(action=cls.approve, transition=cls.transition)
+
+    def tearDown(self):
+        WorkflowGraph._local.pop(str(self.process.id), None)
+
+    def test_graph_maps_state_and_action_to_transition(self):
+        graph = WorkflowGraph.for_process(self.process.id)
+
+        self.assertEqual(
+            graph.next_transition(self.start.id, self.approve.id), (str(self.transition.id), str(self.closed.id))
+        )
+        self.assertEqual(graph.actions_from(self.start.id), {str(self.approve.id)})
+        self.assertIs(WorkflowGraph.for_process(self.process.id), graph)
+
+    def test_invalidate_replaces_the_version(self):
+        graph = WorkflowGraph.for_process(self.process.id)
+        WorkflowGraph.invalidate(self.process.id)
+
+        rebuilt = WorkflowGraph.for_process(self.process.id)
+        self.assertIsNot(rebuilt, graph)
+        self.assertNotEqual(rebuilt.version, graph.version)
+
+    def test_redis_errors_load_from_the_database(self):
+        with mock.patch.object(cache, 'get', side_effect=RedisError("down")), \
+                self.assertLogs('workflow_engine.graph', 'WARNING'):
+            graph = WorkflowGraph.for_process(self.process.id)
+
+        self.assertIsNone(graph.version)
+        self.assertEqual(graph.actions_from(self.start.id), {str(self.approve.id)})
+        self.assertNotIn(str(self.process.id), WorkflowGraph._local)
+
+    def test_redis_errors_do_not_fail_invalidate(self):
+        WorkflowGraph.for_process(self.process.id)
+
+        with mock.patch.object(cache, 'set', side_effect=RedisError("down")), \
+                self.assertLogs('workflow_engine.graph', 'ERROR'):
+            WorkflowGraph.invalidate(self.process.id)
+
+        self.assertNotIn(str(self.process.id), WorkflowGraph._local)